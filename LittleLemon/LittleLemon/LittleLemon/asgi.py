@@ -2,6 +2,9 @@
 ASGI config for LittleLemon project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving through it enables the async read views (LITTLELEMON_ASYNC_READS), e.g.
+
+    uvicorn LittleLemon.asgi:application --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -12,5 +15,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LittleLemon.settings')
+os.environ.setdefault('LITTLELEMON_ASYNC_READS', '1')
+
+from LittleLemonAPI.startup import skip_unused_imports, warm_up  # noqa: E402
 
+skip_unused_imports()
 application = get_asgi_application()
+warm_up()
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LittleLemonAPI.middleware.InstrumentationMiddleware',
+    'LittleLemonAPI.middleware.ReadReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +57,32 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# LITTLELEMON_API_ONLY=1 serves the token-authenticated JSON API and nothing
+# else: no admin, sessions, CSRF, messages, static files, templates or
+# browsable API. Workers start faster and use less memory; see
+# `manage.py bench_startup` and LittleLemonAPI/startup.py.
+LITTLELEMON_API_ONLY = os.environ.get('LITTLELEMON_API_ONLY') == '1'
+if LITTLELEMON_API_ONLY:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS if app not in (
+            'django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages', 'django.contrib.staticfiles',
+        )
+    ]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE if middleware not in (
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+            'django.middleware.clickjacking.XFrameOptionsMiddleware',
+        )
+    ]
+
+# Fill the URL resolver, serializer and model field caches when wsgi.py or
+# asgi.py builds the application, so a preloading server forks workers that
+# already have them; see LittleLemonAPI/startup.py.
+LITTLELEMON_WARM_UP = os.environ.get('LITTLELEMON_WARM_UP', '1') == '1'
+
 ROOT_URLCONF = 'LittleLemon.urls'
 
 TEMPLATES = [
@@ -71,19 +101,113 @@ TEMPLATES = [
     },
 ]
 
+if LITTLELEMON_API_ONLY:
+    TEMPLATES = []
+
 WSGI_APPLICATION = 'LittleLemon.wsgi.application'
 
+# Request instrumentation: set a threshold (ms) to dump cProfile output for slow requests.
+LITTLELEMON_PROFILE_THRESHOLD_MS = float(os.environ['LITTLELEMON_PROFILE_THRESHOLD_MS']) if os.environ.get('LITTLELEMON_PROFILE_THRESHOLD_MS') else None
+LITTLELEMON_PROFILE_SAMPLE_RATE = float(os.environ.get('LITTLELEMON_PROFILE_SAMPLE_RATE', '1.0'))
+# /metrics wants 'Authorization: Bearer <token>'; without a token only logged-in staff can read it.
+LITTLELEMON_METRICS_TOKEN = os.environ.get('LITTLELEMON_METRICS_TOKEN')
+
+# Serve the hot read endpoints from async views; LittleLemon/asgi.py turns this on.
+LITTLELEMON_ASYNC_READS = os.environ.get('LITTLELEMON_ASYNC_READS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# LITTLELEMON_DB_PROFILE picks how connections are opened. 'production' is for
+# several worker processes writing to one SQLite file:
+# - WAL lets readers run alongside the writer.
+# - synchronous=NORMAL syncs at checkpoints instead of every commit. That is
+#   still safe in WAL mode.
+# - IMMEDIATE transactions take the write lock at BEGIN, so they queue on the
+#   busy timeout. A deferred transaction that reads and then writes fails with
+#   "database is locked" instead of waiting.
+# - Connections are kept for CONN_MAX_AGE seconds and health-checked before
+#   reuse.
+
+LITTLELEMON_DB_PROFILES = {
+    'development': {},
+    'production': {
+        'OPTIONS': {
+            'timeout': float(os.environ.get('LITTLELEMON_DB_BUSY_TIMEOUT', '20')),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        },
+        'CONN_MAX_AGE': int(os.environ.get('LITTLELEMON_DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+LITTLELEMON_DB_PROFILE = os.environ.get('LITTLELEMON_DB_PROFILE', 'development')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('LITTLELEMON_DB_PATH', BASE_DIR / 'db.sqlite3'),
+        **LITTLELEMON_DB_PROFILES[LITTLELEMON_DB_PROFILE],
     }
 }
 
+# Point LITTLELEMON_DB_REPLICA at a replicated copy of the database (e.g. kept
+# up to date by Litestream) to serve the read-only catalog, report and export
+# endpoints from it; see LittleLemonAPI/routers.py. Everything else, and every
+# write, stays on 'default'.
+LITTLELEMON_READ_REPLICA = None
+if os.environ.get('LITTLELEMON_DB_REPLICA'):
+    LITTLELEMON_READ_REPLICA = 'replica'
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['LITTLELEMON_DB_REPLICA'],
+        'OPTIONS': {'init_command': 'PRAGMA query_only=ON'},
+        'CONN_MAX_AGE': DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'CONN_HEALTH_CHECKS': DATABASES['default'].get('CONN_HEALTH_CHECKS', False),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['LittleLemonAPI.routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per process. Point LITTLELEMON_CACHE_DIR at a shared directory
+# so every worker sees the same catalog version and cached responses. Without
+# one, each worker's catalog version expires after this many seconds, so menu
+# writes made in other workers (prices included) reach it within that time.
+LITTLELEMON_LOCAL_CATALOG_VERSION_TTL = 5
+# Likewise, cached user roles expire after this many seconds, so a user removed
+# from Manager or DeliveryCrew loses those rights in every worker within it.
+LITTLELEMON_LOCAL_ROLE_CACHE_TIMEOUT = 5
+
+if os.environ.get('LITTLELEMON_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['LITTLELEMON_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Throttle counters go to this cache alias, or to a SQLite file shared by all
+# workers when LITTLELEMON_THROTTLE_DB is set.
+LITTLELEMON_THROTTLE_CACHE = 'default'
+LITTLELEMON_THROTTLE_DB = os.environ.get('LITTLELEMON_THROTTLE_DB')
+
+# Background jobs (LittleLemonAPI/jobs.py) are run by `manage.py run_jobs`.
+# LITTLELEMON_JOBS_EAGER runs them in-process after each commit instead, for a
+# development server without a worker. LITTLELEMON_AUTO_ASSIGN hands every new
+# order to the delivery crew from a job.
+LITTLELEMON_JOBS_EAGER = os.environ.get('LITTLELEMON_JOBS_EAGER') == '1'
+LITTLELEMON_AUTO_ASSIGN = os.environ.get('LITTLELEMON_AUTO_ASSIGN') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,21 +252,31 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Fixed-window counters; see LittleLemonAPI/throttling.py
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'LittleLemonAPI.throttling.AnonRateThrottle',
+        'LittleLemonAPI.throttling.UserRateThrottle',
+        'LittleLemonAPI.throttling.ScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
         'user': '1000/day',
+        'cart': '120/min',
+        'orders': '60/min',
     },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    # orjson and msgpack are optional; see LittleLemonAPI/renderers.py
+    'DEFAULT_RENDERER_CLASSES': [
+        'LittleLemonAPI.renderers.FastJSONRenderer',
+        *(['LittleLemonAPI.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        *([] if LITTLELEMON_API_ONLY else ['rest_framework.renderers.BrowsableAPIRenderer']),
+    ],
 }
 
 DJOSER = {
@@ -14,9 +14,10 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 from django.http import JsonResponse
+from LittleLemonAPI.metrics import metrics_view
 
 def root_view(request):
     return JsonResponse({
@@ -33,9 +34,14 @@ def root_view(request):
 
 urlpatterns = [
     path('', root_view),
-    path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include('LittleLemonAPI.urls')),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
 
+# Not installed in the API-only mode (LITTLELEMON_API_ONLY)
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.insert(1, path('admin/', admin.site.urls))
+
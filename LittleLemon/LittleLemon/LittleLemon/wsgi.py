@@ -2,6 +2,10 @@
 WSGI config for LittleLemon project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Building it also warms the application's caches (LittleLemonAPI/startup.py),
+so load it once in the master and fork the workers from there, e.g.
+
+    gunicorn --preload --workers 4 LittleLemon.wsgi
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
@@ -13,4 +17,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LittleLemon.settings')
 
+from LittleLemonAPI.startup import skip_unused_imports, warm_up  # noqa: E402
+
+skip_unused_imports()
 application = get_wsgi_application()
+warm_up()
@@ -0,0 +1,290 @@
+"""
+Daily sales rollups.
+
+Order updates and order deletes apply their deltas to the rollup tables in
+the same transaction as the order write. A new order is counted by an
+'analytics.checkout' background job (see jobs.py), which keeps the upserts
+off the checkout request; the deltas are plain additions, so they come out
+the same whichever order they land in. Reports read one row per day (and
+per crew member, menu item or category) instead of scanning orders. Each
+table costs one upsert per write however many lines the order has.
+`rebuild()` recomputes a date range from the live and archived orders.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from .models import (
+    MenuItem, Order, Order_Item, ArchivedOrder, ArchivedOrderItem,
+    DailySales, DailyCrewSales, DailyMenuItemSales, DailyCategorySales
+)
+
+ORDER_DATE = Order._meta.get_field('date')
+ORDER_STATUS = Order._meta.get_field('status')
+
+# Backends with INSERT ... ON CONFLICT (...) DO UPDATE
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+
+def apply_deltas(model, key_field, deltas, **fixed):
+    """Add `deltas` ({key: {field: amount}}) to the rows of `model` matching `fixed`, creating missing rows."""
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return
+    if connection.vendor in UPSERT_VENDORS:
+        upsert_rows(model, [*fixed, key_field], [([*fixed.values(), key], changes) for key, changes in deltas.items()])
+    else:
+        locked_update_deltas(model, key_field, deltas, fixed)
+
+
+def apply_daily_deltas(model, key_field, deltas):
+    """apply_deltas for {(date, key): {field: amount}} spanning several days."""
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return
+    if connection.vendor in UPSERT_VENDORS:
+        upsert_rows(model, ['date', key_field], [(list(key), changes) for key, changes in deltas.items()])
+        return
+    by_day = defaultdict(dict)
+    for (day, key), changes in deltas.items():
+        by_day[day][key] = changes
+    for day, day_deltas in by_day.items():
+        locked_update_deltas(model, key_field, day_deltas, {'date': day})
+
+
+def upsert_rows(model, keys, rows):
+    # One statement per table: insert each delta as a new row or add it to the existing one.
+    meta = model._meta
+    quote = connection.ops.quote_name
+    counters = [field.attname for field in meta.concrete_fields if not field.primary_key and field.attname not in keys]
+    fields = [meta.get_field(name) for name in keys + counters]
+    columns = [field.column for field in fields]
+    table = quote(meta.db_table)
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    params = []
+    for key_values, changes in rows:
+        values = [*key_values, *[changes.get(name, 0) for name in counters]]
+        params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+    updates = ', '.join(
+        f'{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}'
+        for column in columns[len(keys):]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(quote(column) for column in columns)}) '
+            f'VALUES {", ".join([placeholders] * len(rows))} '
+            f'ON CONFLICT ({", ".join(quote(column) for column in columns[:len(keys)])}) DO UPDATE SET {updates}',
+            params
+        )
+
+
+def locked_update_deltas(model, key_field, deltas, fixed):
+    # Portable path: create missing rows (ignoring ones a concurrent writer just
+    # created), then lock, adjust and write every row in one bulk_update.
+    lookup = {**fixed, f'{key_field}__in': list(deltas)}
+    rows = list(model.objects.select_for_update().filter(**lookup))
+    if len(rows) < len(deltas):
+        found = {getattr(row, key_field) for row in rows}
+        model.objects.bulk_create(
+            [model(**fixed, **{key_field: key}) for key in deltas if key not in found],
+            ignore_conflicts=True
+        )
+        rows = list(model.objects.select_for_update().filter(**lookup))
+
+    fields = set()
+    for row in rows:
+        for field, amount in deltas[getattr(row, key_field)].items():
+            setattr(row, field, getattr(row, field) + amount)
+            fields.add(field)
+    model.objects.bulk_update(rows, sorted(fields))
+
+
+def apply_lines(day, lines, sign=1):
+    """Add (menuitem_id, quantity, price) lines to the menu item and category rollups."""
+    categories = dict(MenuItem.objects.filter(id__in={line[0] for line in lines}).values_list('id', 'category_id'))
+    by_item = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
+    by_category = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')})
+    for menuitem_id, quantity, price in lines:
+        if menuitem_id not in categories:
+            continue  # deleted since the order was placed, and its rollup rows with it
+        for bucket in (by_item[menuitem_id], by_category[categories[menuitem_id]]):
+            bucket['quantity'] += sign * quantity
+            bucket['revenue'] += sign * price
+    apply_deltas(DailyMenuItemSales, 'menuitem_id', by_item, date=day)
+    apply_deltas(DailyCategorySales, 'category_id', by_category, date=day)
+
+
+def record_checkout(order_date, total, lines):
+    """Count a new order; `lines` are its (menuitem_id, quantity, price) rows."""
+    day = ORDER_DATE.to_python(order_date)
+    apply_deltas(DailySales, 'date', {day: {
+        'order_count': 1,
+        'item_count': sum(line[1] for line in lines),
+        'revenue': total,
+    }})
+    apply_lines(day, lines)
+
+
+def count_checkout_job(payload):
+    """Handler of the 'analytics.checkout' job that checkout_cart enqueues."""
+    lines = [(menuitem_id, quantity, Decimal(price)) for menuitem_id, quantity, price in payload['lines']]
+    record_checkout(payload['date'], Decimal(payload['total']), lines)
+
+
+def crew_deltas(crew_id, delivered, total, sign):
+    if crew_id is None:
+        return {}
+    return {crew_id: {'order_count': sign, 'delivered_count': sign * int(delivered), 'revenue': sign * total}}
+
+
+def record_order_change(order, previous_crew_id, previous_status):
+    """Move an order between crew members and delivered states after an update."""
+    day = ORDER_DATE.to_python(order.date)
+    status = ORDER_STATUS.to_python(order.status)
+    previous_status = ORDER_STATUS.to_python(previous_status)
+    if order.delivery_crew_id == previous_crew_id and status == previous_status:
+        return
+
+    apply_deltas(DailySales, 'date', {day: {'delivered_count': int(status) - int(previous_status)}})
+    deltas = defaultdict(lambda: {'order_count': 0, 'delivered_count': 0, 'revenue': Decimal('0')})
+    for changes in (crew_deltas(previous_crew_id, previous_status, order.total, -1),
+                    crew_deltas(order.delivery_crew_id, status, order.total, 1)):
+        for crew_id, values in changes.items():
+            for field, amount in values.items():
+                deltas[crew_id][field] += amount
+    apply_deltas(DailyCrewSales, 'crew_id', deltas, date=day)
+
+
+def record_order_removed(order):
+    """Take an order back out of the rollups; call before deleting it."""
+    day = ORDER_DATE.to_python(order.date)
+    status = ORDER_STATUS.to_python(order.status)
+    lines = list(Order_Item.objects.filter(order=order).values_list('menuitem_id', 'quantity', 'price'))
+    apply_deltas(DailySales, 'date', {day: {
+        'order_count': -1,
+        'delivered_count': -int(status),
+        'item_count': -sum(line[1] for line in lines),
+        'revenue': -order.total,
+    }})
+    apply_deltas(DailyCrewSales, 'crew_id', crew_deltas(order.delivery_crew_id, status, order.total, -1), date=day)
+    apply_lines(day, lines, sign=-1)
+
+
+def date_range(queryset, field, date_from=None, date_to=None):
+    if date_from is not None:
+        queryset = queryset.filter(**{f'{field}__gte': date_from})
+    if date_to is not None:
+        queryset = queryset.filter(**{f'{field}__lte': date_to})
+    return queryset
+
+
+@transaction.atomic
+def rebuild(date_from=None, date_to=None):
+    """Recompute every rollup row in the date range from live and archived orders; returns the day count."""
+    for model in (DailySales, DailyCrewSales, DailyMenuItemSales, DailyCategorySales):
+        date_range(model.objects.all(), 'date', date_from, date_to).delete()
+
+    days = defaultdict(lambda: {'order_count': 0, 'delivered_count': 0, 'item_count': 0, 'revenue': Decimal('0')})
+    crews = defaultdict(lambda: {'order_count': 0, 'delivered_count': 0, 'revenue': Decimal('0')})
+    lines_by = {
+        'menuitem': defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')}),
+        'menuitem__category': defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0')}),
+    }
+    # Archived orders keep counting: the rollups cover every order ever taken.
+    for order_model, line_model in ((Order, Order_Item), (ArchivedOrder, ArchivedOrderItem)):
+        orders = date_range(order_model.objects.all(), 'date', date_from, date_to)
+        lines = date_range(line_model.objects.all(), 'order__date', date_from, date_to)
+
+        for row in orders.values('date').annotate(
+            orders=Count('id'), delivered=Count('id', filter=Q(status=True)), revenue=Sum('total')
+        ).order_by():
+            add_totals(days[row['date']], order_count=row['orders'], delivered_count=row['delivered'],
+                       revenue=row['revenue'])
+        for row in lines.values('order__date').annotate(quantity=Sum('quantity')).order_by():
+            add_totals(days[row['order__date']], item_count=row['quantity'])
+
+        for row in orders.filter(delivery_crew__isnull=False).values('date', 'delivery_crew').annotate(
+            orders=Count('id'), delivered=Count('id', filter=Q(status=True)), revenue=Sum('total')
+        ).order_by():
+            add_totals(crews[row['date'], row['delivery_crew']], order_count=row['orders'],
+                       delivered_count=row['delivered'], revenue=row['revenue'])
+
+        for column, totals in lines_by.items():
+            for row in lines.values('order__date', column).annotate(
+                quantity=Sum('quantity'), revenue=Sum('price')
+            ).order_by():
+                add_totals(totals[row['order__date'], row[column]], quantity=row['quantity'], revenue=row['revenue'])
+
+    DailySales.objects.bulk_create([DailySales(date=day, **values) for day, values in days.items()], batch_size=500)
+    DailyCrewSales.objects.bulk_create([
+        DailyCrewSales(date=day, crew_id=crew_id, **values) for (day, crew_id), values in crews.items()
+    ], batch_size=500)
+    for model, key_field, column in ((DailyMenuItemSales, 'menuitem_id', 'menuitem'),
+                                     (DailyCategorySales, 'category_id', 'menuitem__category')):
+        model.objects.bulk_create([
+            model(date=day, **{key_field: key}, **values) for (day, key), values in lines_by[column].items()
+        ], batch_size=500)
+    return len(days)
+
+
+def add_totals(totals, **amounts):
+    for field, amount in amounts.items():
+        totals[field] += amount
+
+
+def money(value):
+    return f'{value or 0:.2f}'
+
+
+def daily_revenue(date_from=None, date_to=None):
+    rows = date_range(DailySales.objects.all(), 'date', date_from, date_to).order_by('date')
+    return [
+        {
+            'date': row.date.isoformat(), 'orders': row.order_count, 'delivered': row.delivered_count,
+            'items': row.item_count, 'revenue': money(row.revenue),
+        }
+        for row in rows
+    ]
+
+
+def crew_report(date_from=None, date_to=None):
+    rows = date_range(DailyCrewSales.objects.all(), 'date', date_from, date_to).values(
+        'crew', 'crew__username'
+    ).annotate(
+        orders=Sum('order_count'), delivered=Sum('delivered_count'), revenue=Sum('revenue')
+    ).order_by('-orders', 'crew')
+    return [
+        {
+            'crew': row['crew'], 'username': row['crew__username'], 'orders': row['orders'],
+            'delivered': row['delivered'], 'revenue': money(row['revenue']),
+        }
+        for row in rows
+    ]
+
+
+def top_menu_items(date_from=None, date_to=None, limit=10):
+    rows = date_range(DailyMenuItemSales.objects.all(), 'date', date_from, date_to).values(
+        'menuitem', 'menuitem__title'
+    ).annotate(quantity=Sum('quantity'), revenue=Sum('revenue')).order_by('-quantity', 'menuitem')[:limit]
+    return [
+        {
+            'menuitem': row['menuitem'], 'title': row['menuitem__title'],
+            'quantity': row['quantity'], 'revenue': money(row['revenue']),
+        }
+        for row in rows
+    ]
+
+
+def category_mix(date_from=None, date_to=None):
+    rows = list(date_range(DailyCategorySales.objects.all(), 'date', date_from, date_to).values(
+        'category', 'category__title'
+    ).annotate(quantity=Sum('quantity'), revenue=Sum('revenue')).order_by('-revenue', 'category'))
+    total = sum((row['revenue'] for row in rows), Decimal('0'))
+    return [
+        {
+            'category': row['category'], 'title': row['category__title'], 'quantity': row['quantity'],
+            'revenue': money(row['revenue']),
+            'share': round(float(row['revenue'] / total), 4) if total else 0.0,
+        }
+        for row in rows
+    ]
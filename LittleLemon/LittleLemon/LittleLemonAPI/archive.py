@@ -0,0 +1,89 @@
+"""
+Order archival.
+
+Delivered orders older than LITTLELEMON_ARCHIVE_AFTER_DAYS (90 by default)
+move with their items from Order and Order_Item into ArchivedOrder and
+ArchivedOrderItem, one batch per transaction. They keep their ids, so a
+customer's order link keeps working: order detail reads fall back to the
+archive, read-only.
+
+This keeps the live tables, and the indexes behind order lists, the crew
+filter and order lookups, sized to the recent and open orders instead of the
+whole history. The daily sales rollups are not touched, and
+analytics.rebuild() reads both the live and the archived orders.
+"""
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import transaction
+from .fastpath import all_fields, value_columns, render_rows
+from .models import Order, Order_Item, ArchivedOrder, ArchivedOrderItem
+from .serializers import OrderSerializer, OrderItemSerializer
+
+ORDER_COLUMNS = ('id', 'user_id', 'delivery_crew_id', 'status', 'total', 'date')
+ITEM_COLUMNS = ('id', 'order_id', 'menuitem_id', 'quantity', 'unit_price', 'price')
+
+
+def archive_after_days():
+    return getattr(settings, 'LITTLELEMON_ARCHIVE_AFTER_DAYS', 90)
+
+
+def archive_cutoff(older_than_days=None, today=None):
+    days = archive_after_days() if older_than_days is None else older_than_days
+    return (today or date.today()) - timedelta(days=days)
+
+
+def archive_orders(older_than_days=None, batch_size=500, limit=None, today=None):
+    """Move delivered orders dated before the cutoff into the archive; returns the number moved."""
+    cutoff = archive_cutoff(older_than_days, today)
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        with transaction.atomic():
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(status=True, date__lt=cutoff)
+                .order_by('id')
+                .values_list(*ORDER_COLUMNS)[:size]
+            )
+            if not orders:
+                break
+            ids = [row[0] for row in orders]
+            items = list(Order_Item.objects.filter(order_id__in=ids).values_list(*ITEM_COLUMNS))
+            ArchivedOrder.objects.bulk_create([ArchivedOrder(**dict(zip(ORDER_COLUMNS, row))) for row in orders])
+            ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**dict(zip(ITEM_COLUMNS, row))) for row in items])
+            # Cascades to the items; change feed events keep pointing at the id.
+            Order.objects.filter(id__in=ids).delete()
+        moved += len(orders)
+        if len(orders) < size:
+            break
+    return moved
+
+
+def archived_order_queries(order_id):
+    order_fields = all_fields(OrderSerializer)
+    item_fields = all_fields(OrderItemSerializer)
+    order = ArchivedOrder.objects.filter(id=order_id).values(*value_columns(OrderSerializer, order_fields))
+    items = ArchivedOrderItem.objects.filter(order_id=order_id).order_by('id').values(
+        *value_columns(OrderItemSerializer, item_fields)
+    )
+    return order, items
+
+
+def render_archived_order(order_rows, item_rows):
+    """Shape an archived order like OrderSerializer, or return None if there is none."""
+    if not order_rows:
+        return None
+    items = render_rows(OrderItemSerializer, all_fields(OrderItemSerializer), item_rows)
+    return render_rows(OrderSerializer, all_fields(OrderSerializer), order_rows, {'orderitem_set': lambda _: items})[0]
+
+
+def archived_order(order_id):
+    order, items = archived_order_queries(order_id)
+    order_rows = list(order)
+    return render_archived_order(order_rows, list(items) if order_rows else [])
+
+
+async def aarchived_order(order_id):
+    order, items = archived_order_queries(order_id)
+    order_rows = [row async for row in order]
+    return render_archived_order(order_rows, [row async for row in items] if order_rows else [])
@@ -0,0 +1,138 @@
+"""
+Automatic delivery-crew assignment.
+
+Unassigned open orders (no delivery crew, status False) are handed out oldest
+first to whichever DeliveryCrew member has the fewest open orders. The loads
+live in a min-heap that is built once from a single aggregate query and
+updated in place as orders are handed out, so each assignment is O(log crew)
+with no further queries. Orders are read and written one batch at a time,
+with a single UPDATE per batch.
+"""
+import heapq
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from .analytics import apply_daily_deltas
+from .changefeed import record_assignment_events
+from .models import Order, DailyCrewSales
+from .roles import DELIVERY_CREW
+
+
+class CrewLoad:
+    """Min-heap of (open orders, crew id); ties go to the lower user id."""
+
+    def __init__(self, loads):
+        self.heap = [(count, crew_id) for crew_id, count in loads.items()]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def lightest(self):
+        return self.heap[0]
+
+    def take(self):
+        """Give one more order to the least loaded member and return their id."""
+        count, crew_id = self.heap[0]
+        heapq.heapreplace(self.heap, (count + 1, crew_id))
+        return crew_id
+
+    def give_back(self, crew_id):
+        """Undo a take() whose order could not be assigned after all."""
+        self.heap = [(count - 1 if member == crew_id else count, member) for count, member in self.heap]
+        heapq.heapify(self.heap)
+
+    def loads(self):
+        return {crew_id: count for count, crew_id in self.heap}
+
+
+def current_loads():
+    crew_ids = list(User.objects.filter(groups__name=DELIVERY_CREW, is_active=True).values_list('id', flat=True))
+    loads = dict.fromkeys(crew_ids, 0)
+    open_orders = Order.objects.filter(delivery_crew_id__in=crew_ids, status=False).values('delivery_crew')
+    for row in open_orders.annotate(count=Count('id')).order_by():
+        loads[row['delivery_crew']] = row['count']
+    return CrewLoad(loads)
+
+
+def assign_orders(batch_size=500, max_open=None, limit=None):
+    """
+    Assign unassigned open orders and return (orders assigned, final CrewLoad).
+
+    `max_open` stops handing out orders once everyone has that many open;
+    `limit` caps the number of orders assigned in this run.
+    """
+    crew = current_loads()
+    assigned = 0
+    while len(crew) and (limit is None or assigned < limit):
+        if max_open is not None and crew.lightest()[0] >= max_open:
+            break
+        size = batch_size if limit is None else min(batch_size, limit - assigned)
+        with transaction.atomic():
+            # Locked so a concurrent manual assignment is not overwritten
+            orders = list(
+                Order.objects.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+                .filter(delivery_crew__isnull=True, status=False)
+                .order_by('date', 'id')
+                .only('id', 'date', 'total', 'user', 'status')[:size]
+            )
+            batch = []
+            for order in orders:
+                if max_open is not None and crew.lightest()[0] >= max_open:
+                    break
+                order.delivery_crew_id = crew.take()
+                batch.append(order)
+            if not batch:
+                break
+            written = write_assignments(batch)
+            written_ids = {order.pk for order in written}
+            for order in batch:
+                if order.pk not in written_ids:
+                    crew.give_back(order.delivery_crew_id)
+            record_assignments(written)
+            record_assignment_events(written)
+        assigned += len(written)
+        if len(orders) < size:
+            break
+    return assigned, crew
+
+
+def assign_orders_job(payload):
+    """Handler of the 'assignment.assign' job enqueued at checkout when LITTLELEMON_AUTO_ASSIGN is on."""
+    assign_orders(max_open=getattr(settings, 'LITTLELEMON_AUTO_ASSIGN_MAX_OPEN', None))
+
+
+def write_assignments(orders):
+    """Write the planned crew of each order still unassigned and open; return the orders written."""
+    # One UPDATE per batch, like bulk_update, but with one CASE branch per crew
+    # member instead of one per order, which keeps the statement cheap to build.
+    by_crew = defaultdict(list)
+    for order in orders:
+        by_crew[order.delivery_crew_id].append(order.pk)
+    # select_for_update does nothing on SQLite, so the UPDATE itself skips
+    # orders assigned (e.g. by hand) or closed since they were read.
+    written = Order.objects.filter(
+        id__in=[order.pk for order in orders], delivery_crew__isnull=True, status=False
+    ).update(delivery_crew_id=Case(
+        *[When(id__in=ids, then=Value(crew_id)) for crew_id, ids in by_crew.items()],
+        output_field=IntegerField()
+    ))
+    if written == len(orders):
+        return orders
+    crews = dict(Order.objects.filter(id__in=[order.pk for order in orders]).values_list('id', 'delivery_crew_id'))
+    # An order assigned by hand to the very member planned for it can't be told
+    # apart from one written here, and counts as written.
+    return [order for order in orders if crews.get(order.pk) == order.delivery_crew_id]
+
+
+def record_assignments(orders):
+    # The same rollup change OrderDetailView.patch makes per order, in one upsert.
+    deltas = defaultdict(lambda: {'order_count': 0, 'revenue': Decimal('0')})
+    for order in orders:
+        changes = deltas[order.date, order.delivery_crew_id]
+        changes['order_count'] += 1
+        changes['revenue'] += order.total
+    apply_daily_deltas(DailyCrewSales, 'crew_id', deltas)
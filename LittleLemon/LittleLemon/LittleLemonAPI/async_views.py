@@ -0,0 +1,232 @@
+"""
+Async-native versions of the hot read endpoints, used when the app is served
+over ASGI (see LittleLemon/asgi.py and LITTLELEMON_ASYNC_READS).
+
+Each view answers GET itself with the async ORM and hands every other method
+to the regular DRF view, so writes keep a single implementation.
+"""
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse, HttpResponseNotAllowed, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .archive import aarchived_order
+from .authentication import CachedTokenAuthentication
+from .catalog import (
+    CATALOG_RESPONSE_TIMEOUT, catalog_cache, catalog_not_modified,
+    catalog_response_keys, get_catalog_version
+)
+from .changefeed import (
+    visible_events, parse_changes_params, parse_cursor, changes_query, latest_query,
+    changes_response, changes_poll_interval, event_payload
+)
+from .fastpath import all_fields, requested_fields, value_columns, render_rows
+from .menu_snapshot import amenu_snapshot
+from .models import MenuItem, Category, Cart, Order
+from .roles import aget_roles, MANAGER, DELIVERY_CREW
+from .serializers import MenuItemSerializer, CategorySerializer, CartSerializer, OrderSerializer
+
+
+def check_throttles(request, view_class=None):
+    # The DRF view's throttles and scope, so both paths share one allowance.
+    for throttle_class in getattr(view_class, 'throttle_classes', api_settings.DEFAULT_THROTTLE_CLASSES):
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view_class):
+            raise exceptions.Throttled(throttle.wait())
+
+
+def async_reads(async_get, sync_view):
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            if sync_view is None:
+                return HttpResponseNotAllowed(['GET', 'HEAD'])
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        try:
+            result = await CachedTokenAuthentication().aauthenticate(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = result
+            await sync_to_async(check_throttles)(request, getattr(sync_view, 'view_class', None))
+            return await async_get(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response['WWW-Authenticate'] = CachedTokenAuthentication.keyword
+            return response
+        except Http404 as exc:
+            return JsonResponse({'detail': str(exc)}, status=404)
+    return view
+
+
+async def paginate(request, queryset, serializer_class):
+    # Same page shape and links as DRF's PageNumberPagination, rows as FastListMixin renders them.
+    fields = requested_fields(request, serializer_class)
+    queryset = queryset.values(*value_columns(serializer_class, fields))
+    page_size = api_settings.PAGE_SIZE
+    try:
+        page = int(request.GET.get('page', 1))
+        if page < 1:
+            raise ValueError
+    except ValueError:
+        raise Http404("Invalid page.")
+
+    count = await queryset.acount()
+    start = (page - 1) * page_size
+    if start and start >= count:
+        raise Http404("Invalid page.")
+    rows = [row async for row in queryset[start:start + page_size]]
+
+    url = request.build_absolute_uri()
+    next_link = replace_query_param(url, 'page', page + 1) if start + page_size < count else None
+    if page == 1:
+        previous_link = None
+    elif page == 2:
+        previous_link = remove_query_param(url, 'page')
+    else:
+        previous_link = replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': render_rows(serializer_class, fields, rows),
+    }
+
+
+async def cached_catalog_list(request, name, build):
+    # Shares cache entries and ETags with CatalogCacheMixin on the sync views.
+    version, modified = await sync_to_async(get_catalog_version)()
+    key, etag = catalog_response_keys(name, request.META.get('QUERY_STRING', ''), version)
+    headers = {'ETag': etag, 'Last-Modified': http_date(modified)}
+    if catalog_not_modified(request, etag, modified):
+        response = HttpResponseNotModified()
+    else:
+        cache = catalog_cache()
+        data = await cache.aget(key)
+        if data is None:
+            data = await build()
+            await cache.aset(key, data, CATALOG_RESPONSE_TIMEOUT)
+        response = JsonResponse(data)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+async def menu_item_list(request):
+    async def build():
+        items = MenuItem.objects.order_by('id')
+        for term in request.GET.get('search', '').replace(',', ' ').split():
+            items = items.filter(category__title__icontains=term)
+        ordering = [
+            field.strip() for field in request.GET.get('ordering', '').split(',')
+            if field.strip().lstrip('-') == 'price'
+        ]
+        if ordering:
+            items = items.order_by(*ordering)
+        return await paginate(request, items, MenuItemSerializer)
+    return await cached_catalog_list(request, 'MenuItemViewSet', build)
+
+
+async def menu_item_detail(request, pk):
+    snapshot = await amenu_snapshot()
+    if snapshot is not None:
+        record = snapshot.by_id.get(pk)
+        if record is None:
+            raise Http404("No MenuItem matches the given query.")
+        return JsonResponse(render_rows(MenuItemSerializer, all_fields(MenuItemSerializer), [record])[0])
+    try:
+        item = await MenuItem.objects.aget(pk=pk)
+    except MenuItem.DoesNotExist:
+        raise Http404("No MenuItem matches the given query.")
+    return JsonResponse(MenuItemSerializer(item).data)
+
+
+async def category_list(request):
+    async def build():
+        return await paginate(request, Category.objects.order_by('id'), CategorySerializer)
+    return await cached_catalog_list(request, 'CategoryViewSet', build)
+
+
+async def cart_items(request):
+    items = [item async for item in Cart.objects.filter(user=request.user)]
+    return JsonResponse(CartSerializer(items, many=True).data, safe=False)
+
+
+async def order_detail(request, order_id):
+    try:
+        order = await Order.objects.prefetch_related('order_item_set').aget(id=order_id)
+        owner_id, data = order.user_id, None
+    except Order.DoesNotExist:
+        data = await aarchived_order(order_id)
+        if data is None:
+            raise Http404("No Order matches the given query.")
+        owner_id = data['user']
+    if owner_id != request.user.pk and not (await aget_roles(request.user)) & {MANAGER, DELIVERY_CREW}:
+        raise exceptions.PermissionDenied("You do not have permission to view this order.")
+    return JsonResponse(data if data is not None else OrderSerializer(order).data)
+
+
+async def latest_cursor():
+    latest = [pk async for pk in latest_query()]
+    return latest[0] if latest else 0
+
+
+async def order_changes(request):
+    # Same contract as OrderChangesView, but a long poll only parks a coroutine.
+    since, wait = parse_changes_params(request.GET)
+    if since is None:
+        return JsonResponse({'changes': [], 'cursor': str(await latest_cursor()), 'more': False})
+    events = visible_events(request.user, await aget_roles(request.user))
+    deadline = time.monotonic() + wait
+    while True:
+        rows = [row async for row in changes_query(events, since)]
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            break
+        await asyncio.sleep(min(changes_poll_interval(), remaining))
+    return JsonResponse(changes_response(rows, since))
+
+
+SSE_HEARTBEAT = 15
+
+
+async def order_change_stream(request):
+    """
+    Server-Sent Events: one `order` event per change, with the cursor as the
+    event id so a reconnecting EventSource resumes via Last-Event-ID.
+    """
+    since, _ = parse_changes_params(request.GET)
+    last_event_id = parse_cursor(request.headers.get('Last-Event-ID'), 'Last-Event-ID')
+    if last_event_id is not None:
+        since = last_event_id
+    if since is None:
+        since = await latest_cursor()
+    events = visible_events(request.user, await aget_roles(request.user))
+
+    async def stream():
+        cursor = since
+        quiet_since = time.monotonic()
+        yield 'retry: 2000\n\n'
+        while True:
+            rows = [row async for row in changes_query(events, cursor)]
+            for row in rows:
+                payload = event_payload(row)
+                cursor = row['id']
+                yield f"id: {cursor}\nevent: order\ndata: {json.dumps(payload)}\n\n"
+            if rows:
+                quiet_since = time.monotonic()
+                continue
+            if time.monotonic() - quiet_since >= SSE_HEARTBEAT:
+                quiet_since = time.monotonic()
+                yield ': keep-alive\n\n'
+            await asyncio.sleep(changes_poll_interval())
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
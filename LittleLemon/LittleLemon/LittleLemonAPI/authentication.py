@@ -0,0 +1,142 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+TOKEN_LRU_SIZE = getattr(settings, 'LITTLELEMON_TOKEN_LRU_SIZE', 2048)
+TOKEN_LRU_TTL = getattr(settings, 'LITTLELEMON_TOKEN_LRU_TTL', 15)
+TOKEN_SHARED_CACHE = getattr(settings, 'LITTLELEMON_TOKEN_SHARED_CACHE', None)
+TOKEN_SHARED_TTL = getattr(settings, 'LITTLELEMON_TOKEN_SHARED_TTL', 300)
+
+
+class LRUCache:
+    """A small thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+token_lru = LRUCache(TOKEN_LRU_SIZE, TOKEN_LRU_TTL)
+
+
+def token_cache_key(key):
+    # Never put raw tokens into cache keys.
+    return 'littlelemon:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(keys):
+    cache_keys = [token_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        token_lru.discard(cache_key)
+    if TOKEN_SHARED_CACHE and cache_keys:
+        caches[TOKEN_SHARED_CACHE].delete_many(cache_keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication that skips the token/user join.
+
+    Lookups go to an in-process LRU first, then to the optional shared cache
+    named by LITTLELEMON_TOKEN_SHARED_CACHE, and only then to the database.
+    Logout, token changes and user saves (including deactivation) clear both
+    layers in the process that made the change. Other processes can keep
+    serving their LRU entry for up to LITTLELEMON_TOKEN_LRU_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = token_lru.get(cache_key)
+        if cached is None and TOKEN_SHARED_CACHE:
+            cached = caches[TOKEN_SHARED_CACHE].get(cache_key)
+            if cached is not None:
+                token_lru.set(cache_key, cached)
+
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cached = (user, token)
+            token_lru.set(cache_key, cached)
+            if TOKEN_SHARED_CACHE:
+                caches[TOKEN_SHARED_CACHE].set(cache_key, cached, TOKEN_SHARED_TTL)
+
+        return self.check_cached(cached)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of authenticate() for the ASGI read views."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        cache_key = token_cache_key(key)
+        cached = token_lru.get(cache_key)
+        if cached is None and TOKEN_SHARED_CACHE:
+            cached = await caches[TOKEN_SHARED_CACHE].aget(cache_key)
+            if cached is not None:
+                token_lru.set(cache_key, cached)
+
+        if cached is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            cached = (token.user, token)
+            token_lru.set(cache_key, cached)
+            if TOKEN_SHARED_CACHE:
+                await caches[TOKEN_SHARED_CACHE].aset(cache_key, cached, TOKEN_SHARED_TTL)
+
+        return self.check_cached(cached)
+
+    def check_cached(self, cached):
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        # Hand each request its own copy so per-request state set on the user
+        # (such as memoized roles) never leaks into the shared entry.
+        return (copy.copy(user), token)
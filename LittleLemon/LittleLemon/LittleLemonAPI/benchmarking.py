@@ -0,0 +1,131 @@
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+from .analytics import rebuild as rebuild_analytics
+from .cart import upsert_cart_items
+from .models import Category, MenuItem, Order, Order_Item
+from .roles import MANAGER, DELIVERY_CREW
+from .search import rebuild_index
+
+
+@contextmanager
+def scratch_database():
+    # Benchmarks run against a throwaway test database so they never touch db.sqlite3.
+    old_name = connection.settings_dict['NAME']
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat=1):
+    """Run func `repeat` times and return (timings in ms, queries of the last run)."""
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = len(ctx.captured_queries)
+    return timings, queries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings):
+    return {
+        'mean': statistics.fmean(timings) if timings else 0.0,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+    }
+
+
+class Dataset:
+    """Handles on the seeded rows that benchmark scenarios need."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def seed_dataset(categories=10, menu_items=2000, customers=50, managers=3, crew=10,
+                 orders=2000, items_per_order=3, cart_items=5):
+    """Populate the (scratch) database with a synthetic dataset through the real models."""
+    manager_group, _ = Group.objects.get_or_create(name=MANAGER)
+    crew_group, _ = Group.objects.get_or_create(name=DELIVERY_CREW)
+
+    category_rows = Category.objects.bulk_create([
+        Category(slug=f'category-{i}', title=f'Category {i}') for i in range(categories)
+    ])
+    item_rows = MenuItem.objects.bulk_create([
+        MenuItem(
+            title=f'Menu item {i}',
+            price=Decimal(5 + i % 20) + Decimal('0.50'),
+            featured=i % 10 == 0,
+            category=category_rows[i % categories],
+        )
+        for i in range(menu_items)
+    ])
+    # bulk_create skips the signals that keep the search index in sync
+    rebuild_index()
+
+    admin = User.objects.create_superuser(username='bench-admin', password='bench')
+    customer_rows = [User.objects.create_user(username=f'bench-customer-{i}') for i in range(customers)]
+    manager_rows = [User.objects.create_user(username=f'bench-manager-{i}') for i in range(managers)]
+    crew_rows = [User.objects.create_user(username=f'bench-crew-{i}') for i in range(crew)]
+    manager_group.user_set.add(*manager_rows)
+    crew_group.user_set.add(*crew_rows)
+    tokens = {
+        user.pk: Token.objects.create(user=user).key
+        for user in [admin] + customer_rows + manager_rows + crew_rows
+    }
+
+    today = date.today()
+    order_lines = [
+        [item_rows[(n * items_per_order + k) % menu_items] for k in range(items_per_order)]
+        for n in range(orders)
+    ]
+    order_rows = Order.objects.bulk_create([
+        Order(
+            user=customer_rows[n % customers],
+            delivery_crew=crew_rows[n % crew] if n % 3 else None,
+            status=n % 4 == 0,
+            total=sum(item.price for item in lines),
+            date=today - timedelta(days=n % 365),
+        )
+        for n, lines in enumerate(order_lines)
+    ], batch_size=1000)
+    Order_Item.objects.bulk_create([
+        Order_Item(order=order, menuitem=item, quantity=1, unit_price=item.price, price=item.price)
+        for order, lines in zip(order_rows, order_lines)
+        for item in lines
+    ], batch_size=1000)
+    # Same for the sales rollups
+    rebuild_analytics()
+
+    for n, customer in enumerate(customer_rows):
+        upsert_cart_items(customer, {
+            item_rows[(n + k) % menu_items]: 1 for k in range(cart_items)
+        })
+
+    return Dataset(
+        admin=admin, customers=customer_rows, managers=manager_rows, crew=crew_rows,
+        categories=category_rows, menu_items=item_rows, orders=order_rows, tokens=tokens,
+    )
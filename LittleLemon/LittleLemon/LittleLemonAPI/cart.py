@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from .menu_snapshot import menu_snapshot
+from .models import MenuItem, Cart, CartSummary
+
+# Set while cart.py itself writes Cart rows and keeps the summary in step, so
+# the model signals only handle writes from elsewhere (admin, cascades).
+_summary_managed = ContextVar('cart_summary_managed', default=False)
+
+
+@contextmanager
+def managed_cart_writes():
+    token = _summary_managed.set(True)
+    try:
+        yield
+    finally:
+        _summary_managed.reset(token)
+
+
+def cart_writes_are_managed():
+    return _summary_managed.get()
+
+
+def lock_cart(user):
+    """
+    Lock the user's cart for the rest of the transaction.
+
+    The summary row doubles as the per-user cart lock. Bumping its version is
+    the first statement of every cart write: on PostgreSQL that locks the row,
+    and on SQLite a write is what takes the database write lock. A deferred
+    SQLite transaction that read the cart first could not upgrade once another
+    writer had committed, and would fail with "database is locked".
+    """
+    if not CartSummary.objects.filter(user=user).update(version=F('version') + 1):
+        CartSummary.objects.get_or_create(user=user)
+
+
+def refresh_cart_summary(user_id):
+    totals = Cart.objects.filter(user_id=user_id).aggregate(item_count=Sum('quantity'), subtotal=Sum('price'))
+    CartSummary.objects.update_or_create(user_id=user_id, defaults={
+        'item_count': totals['item_count'] or 0,
+        'subtotal': totals['subtotal'] or Decimal('0'),
+    })
+
+
+def adjust_cart_summary(user_id, quantity, price):
+    # A plain UPDATE: if the summary is already gone (user deletion) nothing happens.
+    CartSummary.objects.filter(user_id=user_id).update(
+        item_count=F('item_count') + quantity,
+        subtotal=F('subtotal') + price,
+        last_modified=timezone.now(),
+    )
+
+
+def subtract_from_cart_summary(user_id, quantity, price):
+    adjust_cart_summary(user_id, -quantity, -price)
+
+
+def reset_cart_summary(user):
+    CartSummary.objects.filter(user=user).update(item_count=0, subtotal=Decimal('0'), last_modified=timezone.now())
+
+
+def clear_cart(user):
+    with transaction.atomic(), managed_cart_writes():
+        lock_cart(user)
+        Cart.objects.filter(user=user).delete()
+        reset_cart_summary(user)
+
+
+def resolve_menu_items(references):
+    """
+    Map each menu item reference (a pk or a title, as a string) to its MenuItem.
+
+    References are looked up in the menu snapshot (MenuRecords) or, for a
+    menu too large to snapshot, with a single query. References that do not
+    match anything are left out of the returned dict.
+    """
+    snapshot = menu_snapshot()
+    if snapshot is not None:
+        resolved = {}
+        for ref in references:
+            item = snapshot.by_id.get(int(ref)) if ref.isdecimal() else snapshot.by_title.get(ref)
+            if item is not None:
+                resolved[ref] = item
+        return resolved
+
+    # isdecimal(), not isdigit(): int() rejects digits like '²'.
+    ids = {int(ref) for ref in references if ref.isdecimal()}
+    titles = {ref for ref in references if not ref.isdecimal()}
+    if not ids and not titles:
+        return {}
+
+    by_id = {}
+    by_title = {}
+    # In id order, so a duplicated title resolves to the oldest item, as in the snapshot.
+    for item in MenuItem.objects.filter(Q(pk__in=ids) | Q(title__in=titles)).only('id', 'title', 'price').order_by('id'):
+        by_id[item.pk] = item
+        by_title.setdefault(item.title, item)
+
+    resolved = {}
+    for ref in references:
+        item = by_id.get(int(ref)) if ref.isdecimal() else by_title.get(ref)
+        if item is not None:
+            resolved[ref] = item
+    return resolved
+
+
+def upsert_cart_items(user, quantities):
+    """
+    Insert or update the user's cart rows in one statement.
+
+    `quantities` maps MenuItem (or MenuRecord) to quantity; an item already in the cart has its
+    quantity and prices replaced instead of tripping the unique constraint.
+    The cart summary is moved by the difference against the replaced rows.
+    """
+    rows = [
+        Cart(
+            user=user,
+            menuitem_id=item.pk,
+            quantity=quantity,
+            unit_price=item.price,
+            price=item.price * quantity
+        )
+        for item, quantity in quantities.items()
+    ]
+    with transaction.atomic(), managed_cart_writes():
+        lock_cart(user)
+        replaced = Cart.objects.filter(user=user, menuitem_id__in=[item.pk for item in quantities]).aggregate(
+            item_count=Sum('quantity'), subtotal=Sum('price')
+        )
+        Cart.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['menuitem', 'user'],
+            update_fields=['quantity', 'unit_price', 'price'],
+        )
+        adjust_cart_summary(
+            user.pk,
+            sum(row.quantity for row in rows) - (replaced['item_count'] or 0),
+            sum(row.price for row in rows) - (replaced['subtotal'] or Decimal('0')),
+        )
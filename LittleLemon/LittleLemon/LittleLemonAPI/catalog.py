@@ -0,0 +1,92 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'littlelemon:catalog:version'
+CATALOG_MODIFIED_KEY = 'littlelemon:catalog:modified'
+CATALOG_RESPONSE_TIMEOUT = getattr(settings, 'LITTLELEMON_CATALOG_RESPONSE_TIMEOUT', 60 * 60 * 24)
+
+
+def catalog_cache():
+    return caches[getattr(settings, 'LITTLELEMON_CATALOG_CACHE', 'default')]
+
+
+def catalog_version_timeout():
+    """
+    How long the version stays cached: for good in a shared cache. A per-process
+    cache can't see other workers' bumps, so there the version expires after
+    LITTLELEMON_LOCAL_CATALOG_VERSION_TTL seconds and is started afresh, which
+    bounds how long a worker serves (and prices from) a stale catalog.
+    """
+    if isinstance(catalog_cache(), LocMemCache):
+        return getattr(settings, 'LITTLELEMON_LOCAL_CATALOG_VERSION_TTL', 5)
+    return None
+
+
+def get_catalog_version():
+    """Return (version, last modified unix time) for the menu and category catalog."""
+    cache = catalog_cache()
+    values = cache.get_many([CATALOG_VERSION_KEY, CATALOG_MODIFIED_KEY])
+    if CATALOG_VERSION_KEY not in values or CATALOG_MODIFIED_KEY not in values:
+        # Start from the clock rather than 1 so a cold cache can never reuse
+        # a version number that older cached responses were stored under.
+        now = time.time()
+        timeout = catalog_version_timeout()
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout)
+        cache.add(CATALOG_MODIFIED_KEY, int(now), timeout)
+        values = cache.get_many([CATALOG_VERSION_KEY, CATALOG_MODIFIED_KEY])
+    return values[CATALOG_VERSION_KEY], values[CATALOG_MODIFIED_KEY]
+
+
+def bump_catalog_version():
+    cache = catalog_cache()
+    timeout = catalog_version_timeout()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout)
+    cache.set(CATALOG_MODIFIED_KEY, int(time.time()), timeout)
+
+
+def catalog_response_keys(name, query, version):
+    """Return (cache key, ETag) for one cached catalog list response."""
+    digest = hashlib.md5(f'{name}?{query}'.encode()).hexdigest()
+    return f'littlelemon:catalog:response:{version}:{digest}', quote_etag(f'{version}-{digest[:16]}')
+
+
+def catalog_not_modified(request, etag, modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and modified <= if_modified_since
+
+
+class CatalogCacheMixin:
+    """
+    Serve list responses from a cache keyed by catalog version and query string.
+
+    Any catalog write bumps the version, so old entries are never read again and
+    simply age out. Responses carry an ETag and Last-Modified for conditional GETs.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version, modified = get_catalog_version()
+        query = request.META.get('QUERY_STRING', '')
+        key, etag = catalog_response_keys(type(self).__name__, query, version)
+        headers = {'ETag': etag, 'Last-Modified': http_date(modified)}
+
+        if catalog_not_modified(request, etag, modified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache = catalog_cache()
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, CATALOG_RESPONSE_TIMEOUT)
+        return Response(data, headers=headers)
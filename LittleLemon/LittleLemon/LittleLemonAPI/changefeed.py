@@ -0,0 +1,119 @@
+"""
+Order change feed.
+
+Order writes append an OrderEvent in the same transaction. Clients read
+`GET orders/changes?since=<cursor>` and get back only the events after their
+cursor that they may see, plus the cursor to send next time. With `wait=<s>`
+the request is held open (long poll) until an event arrives or the wait ends.
+Under ASGI the same feed is also available as Server-Sent Events.
+"""
+import math
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from .models import OrderEvent
+from .roles import MANAGER, DELIVERY_CREW
+
+EVENT_FIELDS = ('id', 'order_id', 'kind', 'status', 'delivery_crew_id', 'created')
+
+# The largest id a 64-bit primary key can hold; a bigger cursor overflows the query.
+MAX_CURSOR = 2 ** 63 - 1
+
+
+def changes_page_size():
+    return getattr(settings, 'LITTLELEMON_CHANGES_PAGE_SIZE', 200)
+
+
+def changes_max_wait():
+    return getattr(settings, 'LITTLELEMON_CHANGES_MAX_WAIT', 25)
+
+
+def changes_poll_interval():
+    return getattr(settings, 'LITTLELEMON_CHANGES_POLL_INTERVAL', 0.5)
+
+
+def record_event(order, kind, previous_crew_id=None):
+    OrderEvent.objects.create(
+        order_id=order.pk, kind=kind, user_id=order.user_id, delivery_crew_id=order.delivery_crew_id,
+        previous_crew_id=previous_crew_id, status=order.status,
+    )
+
+
+def record_update(order, previous_crew_id, previous_status):
+    status_field = OrderEvent._meta.get_field('status')
+    crew_changed = order.delivery_crew_id != previous_crew_id
+    if crew_changed or status_field.to_python(order.status) != status_field.to_python(previous_status):
+        record_event(order, OrderEvent.UPDATED, previous_crew_id if crew_changed else None)
+
+
+def record_assignment_events(orders):
+    OrderEvent.objects.bulk_create([
+        OrderEvent(
+            order_id=order.pk, kind=OrderEvent.UPDATED, user_id=order.user_id,
+            delivery_crew_id=order.delivery_crew_id, status=order.status,
+        )
+        for order in orders
+    ])
+
+
+def visible_events(user, roles):
+    """Managers see every event, crew members their past and present deliveries, customers their own orders."""
+    events = OrderEvent.objects.all()
+    if MANAGER in roles:
+        return events
+    if DELIVERY_CREW in roles:
+        return events.filter(Q(delivery_crew=user) | Q(previous_crew=user) | Q(user=user))
+    return events.filter(user=user)
+
+
+def parse_cursor(value, name='since'):
+    """Return the cursor in `value`, or None if it is empty."""
+    if value in (None, ''):
+        return None
+    # isdecimal(), not isdigit(): int() rejects digits like '²'.
+    if not value.isdecimal() or int(value) > MAX_CURSOR:
+        raise ValidationError({name: "Expected a cursor returned by this endpoint."})
+    return int(value)
+
+
+def parse_changes_params(params):
+    """Return (since or None, wait seconds) from the query string."""
+    since = parse_cursor(params.get('since'))
+    try:
+        wait = float(params.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    # NaN would slip past the cap below and hold the request open indefinitely.
+    if not math.isfinite(wait):
+        raise ValidationError({"wait": "Expected a number of seconds."})
+    return since, min(max(wait, 0), changes_max_wait())
+
+
+def changes_query(events, since):
+    return events.filter(id__gt=since).order_by('id').values(*EVENT_FIELDS)[:changes_page_size() + 1]
+
+
+def latest_query():
+    # Where a new client starts: after everything recorded so far.
+    return OrderEvent.objects.order_by('-id').values_list('id', flat=True)[:1]
+
+
+def event_payload(row):
+    return {
+        'cursor': str(row['id']),
+        'order': row['order_id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'delivery_crew': row['delivery_crew_id'],
+        'at': row['created'].isoformat(),
+    }
+
+
+def changes_response(rows, since):
+    more = len(rows) > changes_page_size()
+    rows = rows[:changes_page_size()]
+    return {
+        'changes': [event_payload(row) for row in rows],
+        'cursor': str(rows[-1]['id'] if rows else since),
+        'more': more,
+    }
@@ -0,0 +1,67 @@
+import logging
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Subquery
+from .cart import lock_cart, managed_cart_writes, reset_cart_summary
+from .changefeed import record_event
+from .jobs import enqueue
+from .models import Cart, CartSummary, Order, Order_Item, OrderEvent
+
+logger = logging.getLogger(__name__)
+
+
+class EmptyCartError(Exception):
+    pass
+
+
+@transaction.atomic
+def checkout_cart(user, order_date):
+    # Nothing can change the cart from here until the order is committed and
+    # the cart emptied, so no item can slip in between the sum and the delete.
+    lock_cart(user)
+
+    # Only pull the columns the order needs, so the query count stays the
+    # same however big the cart is. The summary's subtotal rides along on
+    # every row rather than costing a query of its own.
+    cart_rows = list(
+        Cart.objects.filter(user=user).values_list(
+            'menuitem_id', 'quantity', 'unit_price', 'price',
+            Subquery(CartSummary.objects.filter(user=user).values('subtotal')),
+        )
+    )
+    if not cart_rows:
+        raise EmptyCartError()
+
+    # The order total is the summary's subtotal: every cart write updates it
+    # under the same lock, so it can't drift from the rows. DEBUG still checks.
+    # SQLite hands the subquery's decimal back unquantized.
+    total = cart_rows[0][4].quantize(Decimal('0.01'))
+    if settings.DEBUG:
+        rows_total = sum(row[3] for row in cart_rows)
+        if total != rows_total:
+            logger.error("Cart summary of user %s says %s, its rows add up to %s", user.pk, total, rows_total)
+    order = Order.objects.create(user=user, total=total, date=order_date)
+    Order_Item.objects.bulk_create([
+        Order_Item(
+            order=order,
+            menuitem_id=menuitem_id,
+            quantity=quantity,
+            unit_price=unit_price,
+            price=price
+        )
+        for menuitem_id, quantity, unit_price, price, _ in cart_rows
+    ])
+    record_event(order, OrderEvent.CREATED)
+    # Committed with the order, run after the response
+    enqueue('analytics.checkout', {
+        'date': order.date,
+        'total': total,
+        'lines': [(menuitem_id, quantity, price) for menuitem_id, quantity, _, price, _ in cart_rows],
+    })
+    if getattr(settings, 'LITTLELEMON_AUTO_ASSIGN', False):
+        enqueue('assignment.assign', {'order': order.id})
+    with managed_cart_writes():
+        Cart.objects.filter(user=user).delete()
+    reset_cart_summary(user)
+    return order
@@ -0,0 +1,98 @@
+"""
+Streaming order export.
+
+Orders and their items are read with two `.iterator(chunk_size=...)` queries
+sorted the same way (date, order id) and merged as they stream, so only one
+chunk of each is held in memory however many orders match. Rows are shaped
+like the orders API (NDJSON, one order per line) or flattened to one line
+per order item (CSV).
+"""
+import csv
+from django.conf import settings
+from .fastpath import all_fields, value_columns, render_rows
+from .models import Order, Order_Item, ArchivedOrder, ArchivedOrderItem
+from .renderers import FastJSONRenderer
+from .serializers import OrderSerializer, OrderItemSerializer
+
+CSV_COLUMNS = [
+    'order_id', 'date', 'user', 'delivery_crew', 'status', 'total',
+    'menuitem', 'quantity', 'unit_price', 'price',
+]
+
+
+def export_chunk_size():
+    return getattr(settings, 'LITTLELEMON_EXPORT_CHUNK_SIZE', 2000)
+
+
+def filter_by_date(queryset, prefix, date_from=None, date_to=None):
+    if date_from is not None:
+        queryset = queryset.filter(**{f'{prefix}date__gte': date_from})
+    if date_to is not None:
+        queryset = queryset.filter(**{f'{prefix}date__lte': date_to})
+    return queryset
+
+
+def iter_orders(date_from=None, date_to=None, chunk_size=None, archived=False):
+    """
+    Yield orders in (date, id) order, each rendered like OrderSerializer with its items.
+
+    `archived` reads the archive (see archive.py) instead of the live orders.
+    """
+    chunk_size = chunk_size or export_chunk_size()
+    order_fields = all_fields(OrderSerializer)
+    item_fields = all_fields(OrderItemSerializer)
+    order_model, item_model = (ArchivedOrder, ArchivedOrderItem) if archived else (Order, Order_Item)
+
+    orders = filter_by_date(order_model.objects.all(), '', date_from, date_to).order_by('date', 'id').values(
+        *value_columns(OrderSerializer, order_fields)
+    ).iterator(chunk_size=chunk_size)
+    items = filter_by_date(item_model.objects.all(), 'order__', date_from, date_to).order_by(
+        'order__date', 'order_id', 'id'
+    ).values(*value_columns(OrderItemSerializer, item_fields, ['order__date'])).iterator(chunk_size=chunk_size)
+
+    pending = next(items, None)
+    for row in orders:
+        order_items = []
+        # Items arrive in the same (date, order id) order, so a matching run starts at `pending`.
+        # Items sorting before this order belong to one the order query didn't return, e.g.
+        # archived or deleted between the two queries; they are dropped.
+        while pending is not None and (pending['order__date'], pending['order']) < (row['date'], row['id']):
+            pending = next(items, None)
+        while pending is not None and pending['order'] == row['id']:
+            order_items.append(pending)
+            pending = next(items, None)
+        rendered = render_rows(OrderItemSerializer, item_fields, order_items)
+        yield render_rows(OrderSerializer, order_fields, [row], {'orderitem_set': lambda _: rendered})[0]
+
+
+def ndjson_lines(orders):
+    renderer = FastJSONRenderer()
+    for order in orders:
+        yield renderer.render(order) + b'\n'
+
+
+class Echo:
+    """File-like object whose write() hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(orders):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for order in orders:
+        head = [
+            order['id'], order['date'], order['user'], order['delivery_crew'],
+            order['status'], order['total'],
+        ]
+        if not order['orderitem_set']:
+            yield writer.writerow(head + [''] * 4)
+        for item in order['orderitem_set']:
+            yield writer.writerow(head + [item['menuitem'], item['quantity'], item['unit_price'], item['price']])
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+    'csv': ('text/csv', csv_lines),
+}
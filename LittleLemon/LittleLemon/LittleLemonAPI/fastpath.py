@@ -0,0 +1,89 @@
+"""
+Read-only list serialization straight from `.values()` rows.
+
+The output matches the ModelSerializer for the same rows, but no serializer or
+model instance is built per row: each field is either copied as-is or passed
+through the DRF field's own to_representation (decimals and dates). Nested
+serializers are filled in by the caller, usually from one batched query.
+`?fields=id,title` narrows both the SELECT and the output.
+"""
+from functools import lru_cache
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+FORMATTED_FIELDS = (serializers.DecimalField, serializers.DateField, serializers.DateTimeField)
+
+
+@lru_cache(maxsize=None)
+def serializer_layout(serializer_class):
+    """Return ((name, column, formatter), ...) in serializer order; column is None for nested serializers."""
+    layout = []
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, serializers.BaseSerializer):
+            layout.append((name, None, None))
+            continue
+        formatter = field.to_representation if isinstance(field, FORMATTED_FIELDS) else None
+        layout.append((name, field.source, formatter))
+    return tuple(layout)
+
+
+def all_fields(serializer_class):
+    return [name for name, _, _ in serializer_layout(serializer_class)]
+
+
+def requested_fields(request, serializer_class):
+    """Field names from `?fields=`, in serializer order; every field when absent."""
+    available = all_fields(serializer_class)
+    params = getattr(request, 'query_params', request.GET)
+    value = params.get('fields')
+    if not value:
+        return available
+    wanted = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = wanted - set(available)
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+    return [name for name in available if name in wanted]
+
+
+def value_columns(serializer_class, fields, required=()):
+    """Columns to pass to `.values()` for `fields`, plus any the caller needs for itself."""
+    columns = [column for name, column, _ in serializer_layout(serializer_class) if name in fields and column]
+    return columns + [column for column in required if column not in columns]
+
+
+def render_rows(serializer_class, fields, rows, nested=None):
+    """
+    Build serializer-shaped dicts from `.values()` rows.
+
+    `nested` maps a nested serializer's field name to a callable taking the row
+    and returning that field's already-rendered value.
+    """
+    nested = nested or {}
+    layout = [entry for entry in serializer_layout(serializer_class) if entry[0] in fields]
+    output = []
+    for row in rows:
+        item = {}
+        for name, column, formatter in layout:
+            if column is None:
+                if name in nested:
+                    item[name] = nested[name](row)
+                continue
+            value = row[column]
+            item[name] = formatter(value) if formatter is not None and value is not None else value
+        output.append(item)
+    return output
+
+
+class FastListMixin:
+    """List action for ModelViewSets that renders `.values()` rows instead of serializer instances."""
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fields = requested_fields(request, serializer_class)
+        rows = self.filter_queryset(self.get_queryset()).values(*value_columns(serializer_class, fields))
+        page = self.paginate_queryset(rows)
+        data = render_rows(serializer_class, fields, page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
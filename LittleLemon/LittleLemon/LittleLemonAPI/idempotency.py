@@ -0,0 +1,90 @@
+"""
+Idempotency keys for POST requests.
+
+A client that sends `Idempotency-Key: <unique string>` with a request may
+retry it with the same key (after a timeout, say). The first request runs
+and its response is stored. A retry gets the stored response again, with an
+`Idempotent-Replayed: true` header, and nothing runs twice.
+
+The key is claimed by inserting its row in the same transaction as the work,
+and the response is saved before that transaction commits. A retry that
+arrives while the first request is still running waits on the row (on the
+unique index in PostgreSQL, on the write lock in SQLite) and then replays
+the committed response. If the first request failed, its transaction rolled
+back, so the key was never claimed and the retry runs afresh.
+
+Keys are scoped to the user. A key that comes back with a different method,
+path or body is rejected with 422. Stored responses expire after
+LITTLELEMON_IDEMPOTENCY_TTL seconds (24 hours by default); `manage.py
+purge_idempotency_keys` deletes the expired rows.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request."""
+
+
+def idempotency_ttl():
+    return getattr(settings, 'LITTLELEMON_IDEMPOTENCY_TTL', 24 * 60 * 60)
+
+
+def idempotency_key(request):
+    """Return the request's Idempotency-Key, or None if it has none."""
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({HEADER: f"Expected 1 to {MAX_KEY_LENGTH} characters."})
+    return key
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Claim `key` for a new request and return None, or return the IdempotencyKey
+    holding the response to an earlier request with the same key.
+
+    Call inside the transaction that does the work, then save_response().
+    """
+    expires = timezone.now() + timedelta(seconds=idempotency_ttl())
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(user=user, key=key, fingerprint=fingerprint, expires=expires)
+        return None
+    except IntegrityError:
+        record = IdempotencyKey.objects.get(user=user, key=key)
+    if record.expires <= timezone.now():
+        # An expired key is free again; reuse its row.
+        record.fingerprint, record.status_code, record.response, record.expires = fingerprint, None, None, expires
+        record.save()
+        return None
+    if record.fingerprint != fingerprint:
+        raise IdempotencyKeyReused()
+    return record
+
+
+def save_response(user, key, response):
+    IdempotencyKey.objects.filter(user=user, key=key).update(status_code=response.status_code, response=response.data)
+
+
+def purge_expired_keys():
+    deleted, _ = IdempotencyKey.objects.filter(expires__lte=timezone.now()).delete()
+    return deleted
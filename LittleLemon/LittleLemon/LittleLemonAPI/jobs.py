@@ -0,0 +1,194 @@
+"""
+Background jobs in a database table.
+
+Work that doesn't have to happen before the response, like the sales rollups
+for a new order, is enqueued as a Job row and run by `manage.py run_jobs`.
+No broker is needed. `enqueue()` writes the row in the caller's transaction.
+Workers therefore see the job at the same commit as the order it belongs
+to, a rollback takes the job with it, and nothing can be lost between
+commit and enqueue.
+
+A worker claims due jobs with a single UPDATE. The UPDATE stamps them with a
+lease and pushes `run_at` out by the visibility timeout
+(LITTLELEMON_JOB_VISIBILITY_TIMEOUT, 60 s). A job whose worker died becomes
+due again once that time has passed. A handler runs in a transaction together
+with the DELETE that acknowledges its job. If the lease ran out and another
+worker took the job over, the acknowledgement finds nothing to delete, and
+this run's writes are rolled back. Each job's effects are applied once.
+
+A failed job is retried with exponential backoff (LITTLELEMON_JOB_BACKOFF
+seconds, doubling, capped at LITTLELEMON_JOB_MAX_BACKOFF). After
+LITTLELEMON_JOB_MAX_ATTEMPTS tries it is marked failed and left in the table
+with its last error.
+
+With LITTLELEMON_JOBS_EAGER, jobs run in-process right after the enqueuing
+transaction commits, so a development server needs no worker.
+"""
+import logging
+import threading
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .metrics import JobRegistry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {
+    'analytics.checkout': 'LittleLemonAPI.analytics.count_checkout_job',
+    'assignment.assign': 'LittleLemonAPI.assignment.assign_orders_job',
+}
+
+
+class LeaseExpired(Exception):
+    """Another worker claimed the job after its visibility timeout ran out."""
+
+
+def visibility_timeout():
+    return getattr(settings, 'LITTLELEMON_JOB_VISIBILITY_TIMEOUT', 60)
+
+
+def max_attempts():
+    return getattr(settings, 'LITTLELEMON_JOB_MAX_ATTEMPTS', 5)
+
+
+def backoff(attempts):
+    base = getattr(settings, 'LITTLELEMON_JOB_BACKOFF', 2)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'LITTLELEMON_JOB_MAX_BACKOFF', 300))
+
+
+def enqueue(job_type, payload, delay=0):
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type '{job_type}'.")
+    job = Job.objects.create(type=job_type, payload=payload, run_at=timezone.now() + timedelta(seconds=delay))
+    if getattr(settings, 'LITTLELEMON_JOBS_EAGER', False) and not delay:
+        transaction.on_commit(lambda: run_due_jobs(ids=[job.id]))
+    return job
+
+
+def claim_jobs(limit, ids=None):
+    """Lease up to `limit` due jobs to this caller and return them."""
+    now = timezone.now()
+    lease = uuid.uuid4().hex
+    due = Job.objects.filter(failed=False, run_at__lte=now)
+    if ids is not None:
+        due = due.filter(id__in=ids)
+    # The due condition is repeated on the UPDATE itself, so a job another
+    # worker claimed in the meantime is skipped rather than claimed twice.
+    claimed = due.filter(id__in=Subquery(due.order_by('run_at', 'id').values('id')[:limit])).update(
+        lease=lease, run_at=now + timedelta(seconds=visibility_timeout()), attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(lease=lease).order_by('run_at', 'id'))
+
+
+def run_job(job, stats=None):
+    """Run a claimed job; returns 'done', 'retry', 'failed' or 'expired'."""
+    started = time.perf_counter()
+    waited = (timezone.now() - job.created).total_seconds()
+    try:
+        handler = import_string(JOB_HANDLERS[job.type])
+        with transaction.atomic():
+            handler(job.payload)
+            if not Job.objects.filter(id=job.id, lease=job.lease).delete()[0]:
+                raise LeaseExpired()
+        outcome = 'done'
+    except LeaseExpired:
+        outcome = 'expired'
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.type, job.attempts)
+        outcome = 'failed' if job.attempts >= max_attempts() else 'retry'
+        changes = {'failed': True} if outcome == 'failed' else {
+            'run_at': timezone.now() + timedelta(seconds=backoff(job.attempts))
+        }
+        try:
+            Job.objects.filter(id=job.id, lease=job.lease).update(lease='', last_error=traceback.format_exc(), **changes)
+        except DatabaseError:
+            # Left as it is, the job comes back when its visibility timeout runs out.
+            logger.exception("Could not record the failure of job %s", job.id)
+    if stats is not None:
+        stats.record(job.type, outcome, waited, time.perf_counter() - started)
+    return outcome
+
+
+def run_pooled_job(job, stats):
+    try:
+        return run_job(job, stats)
+    finally:
+        # Pool threads keep their own connections; treat each job like a request.
+        close_old_connections()
+
+
+def run_due_jobs(limit=100, ids=None, stats=None):
+    """Run due jobs one at a time in this thread until none are left; returns how many ran."""
+    ran = 0
+    while ran < limit:
+        jobs = claim_jobs(min(10, limit - ran), ids)
+        if not jobs:
+            break
+        for job in jobs:
+            run_job(job, stats)
+        ran += len(jobs)
+    return ran
+
+
+class JobStats:
+    """Per-type outcomes and timings (ms) of one worker's jobs, for its report and its metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+        self.waits = defaultdict(list)
+        self.runs = defaultdict(list)
+        self.registry = JobRegistry()
+
+    def record(self, job_type, outcome, waited, duration):
+        with self.lock:
+            self.outcomes[job_type][outcome] += 1
+            if outcome == 'done':
+                self.waits[job_type].append(waited * 1000)
+                self.runs[job_type].append(duration * 1000)
+            self.registry.record(job_type, outcome, waited, duration)
+
+
+def run_worker(threads=4, poll_interval=1.0, burst=False, stats=None, on_idle=None):
+    """
+    Claim due jobs and run them on a pool of `threads` threads.
+
+    Only as many jobs are claimed as there are idle threads, so no claimed job
+    waits out its visibility timeout in a local backlog. With `burst`, return
+    once no job is due and none is running; otherwise poll every
+    `poll_interval` seconds until interrupted. `on_idle` is called whenever
+    the worker waits.
+    """
+    stats = stats or JobStats()
+    with ThreadPoolExecutor(threads, thread_name_prefix='job') as pool:
+        running = set()
+        while True:
+            try:
+                jobs = claim_jobs(threads - len(running)) if len(running) < threads else []
+            except DatabaseError:
+                logger.exception("Could not claim jobs")
+                jobs = []
+            running.update(pool.submit(run_pooled_job, job, stats) for job in jobs)
+            if jobs:
+                continue
+            if not running and burst:
+                return stats
+            if on_idle is not None:
+                on_idle()
+            if running:
+                done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            else:
+                time.sleep(poll_interval)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from LittleLemonAPI.archive import archive_after_days, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered orders older than --older-than-days (LITTLELEMON_ARCHIVE_AFTER_DAYS by default) "
+        "with their items into the archive tables, one batch per transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, help="Archive at most this many orders in this run.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        days = archive_after_days() if options['older_than_days'] is None else options['older_than_days']
+        if days < 0:
+            raise CommandError("--older-than-days can't be negative.")
+        moved = archive_orders(days, options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} delivered orders dated before {archive_cutoff(days).isoformat()}."
+        ))
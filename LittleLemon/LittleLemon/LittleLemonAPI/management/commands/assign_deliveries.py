@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from LittleLemonAPI.assignment import assign_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Assign unassigned open orders to the delivery crew member with the fewest open orders. "
+        "Runs once, or every --interval seconds as a periodic job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-open', type=int, help="Leave orders unassigned once everyone has this many open.")
+        parser.add_argument('--limit', type=int, help="Assign at most this many orders per run.")
+        parser.add_argument('--interval', type=float, help="Repeat every this many seconds until interrupted.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        while True:
+            assigned, crew = assign_orders(options['batch_size'], options['max_open'], options['limit'])
+            if not len(crew):
+                self.stderr.write("The delivery crew group has no active members.")
+            else:
+                loads = crew.loads().values()
+                self.stdout.write(
+                    f"Assigned {assigned} orders across {len(crew)} crew members "
+                    f"(open orders per member: {min(loads)}-{max(loads)})."
+                )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
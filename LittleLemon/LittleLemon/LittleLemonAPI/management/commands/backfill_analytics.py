@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from LittleLemonAPI.analytics import rebuild
+from LittleLemonAPI.management.commands.export_orders import date_argument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups from live and archived orders, for all dates or a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date_argument)
+        parser.add_argument('--date-to', type=date_argument)
+
+    def handle(self, *args, **options):
+        days = rebuild(options['date_from'], options['date_to'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {days} days."))
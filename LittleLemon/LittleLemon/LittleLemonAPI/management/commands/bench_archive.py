@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from LittleLemonAPI.archive import archive_orders
+from LittleLemonAPI.benchmarking import scratch_database, measure, summarize
+from LittleLemonAPI.models import Category, MenuItem, Order, Order_Item
+from LittleLemonAPI.roles import MANAGER
+
+LIVE_TABLES = (Order._meta.db_table, Order_Item._meta.db_table)
+
+
+def live_storage():
+    """Bytes used by the live order tables and by their indexes (SQLite dbstat)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT m.type, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name '
+            f'WHERE m.tbl_name IN ({", ".join(["%s"] * len(LIVE_TABLES))}) GROUP BY m.type',
+            LIVE_TABLES
+        )
+        sizes = dict(cursor.fetchall())
+    return sizes.get('table', 0), sizes.get('index', 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Grow the order history at a constant number of orders per day and compare live table and "
+        "index sizes and order list/detail latency with and without archiving delivered orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', default='30,120,480')
+        parser.add_argument('--orders-per-day', type=int, default=60)
+        parser.add_argument('--keep-days', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=30, help="Keep below the 60/min 'orders' throttle.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Table sizes are read from SQLite's dbstat.")
+        self.stdout.write(
+            f"{'days':>6} {'mode':>9} {'live orders':>12} {'table KB':>9} {'index KB':>9} "
+            f"{'list ms':>8} {'crew ms':>8} {'detail ms':>9}"
+        )
+        for days in [int(value) for value in options['history_days'].split(',')]:
+            with scratch_database():
+                self.seed(days, options['orders_per_day'])
+                self.report(days, 'all live', options['repeat'])
+                archive_orders(options['keep_days'], batch_size=1000)
+                connection.cursor().execute('VACUUM')
+                self.report(days, 'archived', options['repeat'])
+
+    def seed(self, days, per_day):
+        category = Category.objects.create(slug='bench', title='Bench')
+        items = MenuItem.objects.bulk_create([
+            MenuItem(title=f'Item {i}', price=Decimal('4.50'), featured=False, category=category) for i in range(50)
+        ])
+        customers = User.objects.bulk_create([User(username=f'customer-{i}') for i in range(50)])
+        crew = User.objects.bulk_create([User(username=f'crew-{i}') for i in range(10)])
+        self.crew = crew[0]
+        self.manager = User.objects.create(username='manager')
+        self.manager.groups.create(name=MANAGER)
+        today = date.today()
+        orders = Order.objects.bulk_create([
+            # Everything but the last two days has been delivered.
+            Order(user=customers[n % 50], delivery_crew=crew[n % 10], status=day >= 2,
+                  total=Decimal('9.00'), date=today - timedelta(days=day))
+            for day in range(days) for n in range(per_day)
+        ], batch_size=1000)
+        Order_Item.objects.bulk_create([
+            Order_Item(order=order, menuitem=items[(order.pk + k) % 50], quantity=1,
+                       unit_price=Decimal('4.50'), price=Decimal('4.50'))
+            for order in orders for k in range(2)
+        ], batch_size=1000)
+        self.recent = orders[0]
+
+    def report(self, days, mode, repeat):
+        table, index = live_storage()
+        timings = {}
+        for label, user, path in (
+            ('list', self.manager, '/api/orders'),
+            ('crew', self.crew, '/api/orders?status=false'),
+            ('detail', self.manager, f'/api/orders/{self.recent.pk}'),
+        ):
+            cache.clear()  # each measurement stays under the 'orders' throttle on its own
+            client = Client(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+            run, _ = measure(lambda: client.get(path), repeat)
+            timings[label] = summarize(run)['p50']
+        self.stdout.write(
+            f"{days:>6} {mode:>9} {Order.objects.count():>12} {table / 1024:>9.0f} {index / 1024:>9.0f} "
+            f"{timings['list']:>8.2f} {timings['crew']:>8.2f} {timings['detail']:>9.2f}"
+        )
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework.authtoken.models import Token
+from LittleLemonAPI import async_views
+from LittleLemonAPI.benchmarking import scratch_database, summarize
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.views import MenuItemViewSet
+
+
+class Command(BaseCommand):
+    help = "Load-test menu item detail reads through the WSGI (threaded) and ASGI (async) paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        total = options['requests']
+        with scratch_database():
+            category = Category.objects.create(slug='bench', title='Bench')
+            items = MenuItem.objects.bulk_create([
+                MenuItem(title=f'Item {i}', price=Decimal('2.50'), featured=False, category=category)
+                for i in range(100)
+            ])
+            token = Token.objects.create(user=User.objects.create_user(username='bench-customer'))
+            header = f'Token {token.key}'
+            pks = [item.pk for item in items]
+
+            self.report('wsgi', concurrency, total, *self.run_wsgi(concurrency, total, header, pks))
+            self.report('asgi', concurrency, total, *self.run_asgi(concurrency, total, header, pks))
+
+    def run_wsgi(self, concurrency, total, header, pks):
+        factory = RequestFactory()
+        view = MenuItemViewSet.as_view({'get': 'retrieve'}, throttle_classes=[])
+        peak_threads = threading.active_count()
+
+        def one(i):
+            nonlocal peak_threads
+            start = time.perf_counter()
+            view(factory.get('/', HTTP_AUTHORIZATION=header), pk=pks[i % len(pks)]).render()
+            peak_threads = max(peak_threads, threading.active_count())
+            return (time.perf_counter() - start) * 1000
+
+        def close_connection(_):
+            connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(one, range(total)))
+            list(pool.map(close_connection, range(concurrency)))
+        return timings, time.perf_counter() - start, peak_threads
+
+    def run_asgi(self, concurrency, total, header, pks):
+        factory = AsyncRequestFactory()
+        view = async_views.async_reads(async_views.menu_item_detail, None)
+        peak_threads = threading.active_count()
+        timings = []
+
+        async def worker(offset):
+            nonlocal peak_threads
+            for i in range(offset, total, concurrency):
+                start = time.perf_counter()
+                await view(factory.get('/', headers={'Authorization': header}), pk=pks[i % len(pks)])
+                timings.append((time.perf_counter() - start) * 1000)
+                peak_threads = max(peak_threads, threading.active_count())
+
+        async def main():
+            await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        return timings, time.perf_counter() - start, peak_threads
+
+    def report(self, label, concurrency, total, timings, elapsed, peak_threads):
+        stats = summarize(timings)
+        self.stdout.write(
+            f"{label}: {total / elapsed:8.0f} req/s at concurrency {concurrency}, "
+            f"p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms, peak threads {peak_threads}"
+        )
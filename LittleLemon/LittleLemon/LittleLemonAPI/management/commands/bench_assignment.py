@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from LittleLemonAPI.analytics import record_order_change
+from LittleLemonAPI.assignment import assign_orders, current_loads
+from LittleLemonAPI.benchmarking import scratch_database, seed_dataset, measure
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.roles import is_delivery_crew
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a backlog of unassigned orders and compare heap-based batch assignment "
+        "with one manager-style assignment per order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=12000,
+                            help="Orders to seed; about a quarter are left open and unassigned.")
+        parser.add_argument('--crew', type=int, default=40)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--manual-sample', type=int, default=300)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed_dataset(menu_items=200, orders=options['orders'], crew=options['crew'], cart_items=0)
+            self.report_loads("Before")
+            pending = list(
+                Order.objects.filter(delivery_crew__isnull=True, status=False).order_by('date', 'id')
+                .values_list('id', flat=True)
+            )
+
+            # What a manager does today: one PATCH-equivalent per order, round-robin.
+            sample = pending[:options['manual_sample']]
+            crew_ids = sorted(current_loads().loads())
+
+            def assign_by_hand():
+                for n, order_id in enumerate(sample):
+                    with transaction.atomic():
+                        order = Order.objects.select_for_update().get(pk=order_id)
+                        crew_user = User.objects.get(id=crew_ids[n % len(crew_ids)])
+                        if is_delivery_crew(crew_user):
+                            order.delivery_crew = crew_user
+                            order.save()
+                            record_order_change(order, None, False)
+
+            timings, queries = measure(assign_by_hand)
+            self.stdout.write(
+                f"By hand: {len(sample)} orders in {timings[0]:.0f} ms "
+                f"({timings[0] / max(len(sample), 1):.2f} ms and {queries / max(len(sample), 1):.1f} queries per order)"
+            )
+            Order.objects.filter(id__in=sample).update(delivery_crew=None)
+
+            timings, queries = measure(lambda: assign_orders(options['batch_size']))
+            assigned = Order.objects.filter(id__in=pending).exclude(delivery_crew=None).count()
+            self.stdout.write(
+                f"Engine:  {assigned} orders in {timings[0]:.0f} ms "
+                f"({timings[0] / max(assigned, 1):.3f} ms per order, {queries} queries in total)"
+            )
+            self.report_loads("After")
+
+    def report_loads(self, label):
+        loads = list(current_loads().loads().values())
+        self.stdout.write(f"{label}: open orders per crew member {min(loads)}-{max(loads)}")
@@ -0,0 +1,39 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+from LittleLemonAPI.authentication import CachedTokenAuthentication, token_lru
+from LittleLemonAPI.benchmarking import scratch_database, measure
+from LittleLemonAPI.views import CartView
+
+
+class Command(BaseCommand):
+    help = "Compare requests/second of stock and cached token authentication on GET cart/menu-items."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        factory = APIRequestFactory()
+        with scratch_database():
+            user = User.objects.create_user(username='bench-customer')
+            token = Token.objects.create(user=user)
+            header = f'Token {token.key}'
+
+            for label, auth_class in (('stock', TokenAuthentication), ('cached', CachedTokenAuthentication)):
+                token_lru.clear()
+                view = CartView.as_view(authentication_classes=[auth_class], throttle_classes=[])
+
+                def run():
+                    for _ in range(count):
+                        view(factory.get('/api/cart/menu-items', HTTP_AUTHORIZATION=header))
+
+                start = time.perf_counter()
+                _, queries = measure(run)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:>7}: {count / elapsed:8.0f} req/s, {queries / count:.2f} queries/request"
+                )
@@ -0,0 +1,63 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from LittleLemonAPI.benchmarking import scratch_database, measure, summarize
+from LittleLemonAPI.cart import upsert_cart_items, managed_cart_writes
+from LittleLemonAPI.checkout import checkout_cart
+from LittleLemonAPI.models import Category, MenuItem, Cart, CartSummary, Order, Order_Item
+
+
+def row_by_row_checkout(user, order_date):
+    # The pre-bulk checkout, kept here only as the comparison baseline.
+    with transaction.atomic():
+        cart_items = Cart.objects.filter(user=user)
+        total = sum(item.price for item in cart_items)
+        order = Order.objects.create(user=user, total=total, date=order_date)
+        for item in cart_items:
+            Order_Item.objects.create(
+                order=order,
+                menuitem=item.menuitem,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                price=item.price
+            )
+        with managed_cart_writes():
+            cart_items.delete()
+        CartSummary.objects.filter(user=user).update(item_count=0, subtotal=0)
+
+
+class Command(BaseCommand):
+    help = "Benchmark checkout across cart sizes on a scratch database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,10,20,40,100')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        with scratch_database():
+            category = Category.objects.create(slug='bench', title='Bench')
+            items = MenuItem.objects.bulk_create([
+                MenuItem(title=f'Item {i}', price=Decimal('2.50'), featured=False, category=category)
+                for i in range(max(sizes))
+            ])
+            user = User.objects.create_user(username='bench-customer')
+
+            def fill_cart(size):
+                upsert_cart_items(user, {item: 2 for item in items[:size]})
+
+            self.stdout.write(f"{'size':>6} {'path':>10} {'queries':>8} {'p50 ms':>8} {'p95 ms':>8}")
+            for size in sizes:
+                for label, func in (('row', row_by_row_checkout), ('bulk', checkout_cart)):
+                    timings = []
+                    queries = 0
+                    for _ in range(options['repeat']):
+                        fill_cart(size)
+                        run_timings, queries = measure(lambda: func(user, date.today()))
+                        timings.extend(run_timings)
+                    stats = summarize(timings)
+                    self.stdout.write(
+                        f"{size:>6} {label:>10} {queries:>8} {stats['p50']:>8.2f} {stats['p95']:>8.2f}"
+                    )
@@ -0,0 +1,120 @@
+import multiprocessing
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from LittleLemonAPI.benchmarking import summarize
+from LittleLemonAPI.cart import upsert_cart_items
+from LittleLemonAPI.checkout import checkout_cart
+from LittleLemonAPI.models import Category, MenuItem
+
+CART_SIZE = 5
+
+
+@contextmanager
+def scratch_file(path, profile):
+    # Point 'default' at a fresh file opened with the profile's options, for this
+    # process and the writers it forks; db.sqlite3 is never opened.
+    connections.close_all()
+    saved = dict(connection.settings_dict)
+    connection.settings_dict.update(
+        NAME=str(path), OPTIONS=profile.get('OPTIONS', {}),
+        CONN_MAX_AGE=profile.get('CONN_MAX_AGE', 0),
+        CONN_HEALTH_CHECKS=profile.get('CONN_HEALTH_CHECKS', False),
+    )
+    try:
+        call_command('migrate', verbosity=0)
+        yield
+    finally:
+        connections.close_all()
+        connection.settings_dict.clear()
+        connection.settings_dict.update(saved)
+
+
+def seed(writers):
+    category = Category.objects.create(slug='bench', title='Bench')
+    MenuItem.objects.bulk_create([
+        MenuItem(title=f'Item {i}', price=Decimal('2.50'), featured=False, category=category)
+        for i in range(CART_SIZE)
+    ])
+    User.objects.bulk_create([User(username=f'writer-{i}') for i in range(writers)])
+
+
+def writer(args):
+    # Runs in a forked child; it opens its own connection to the scratch file.
+    username, checkouts, start_at = args
+    connections.close_all()
+    user = User.objects.get(username=username)
+    items = list(MenuItem.objects.order_by('id')[:CART_SIZE])
+    ok, locked, timings = 0, 0, []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for i in range(checkouts):
+        started = time.perf_counter()
+        try:
+            upsert_cart_items(user, {item: 1 for item in items})
+            checkout_cart(user, date(2024, 1, 1) + timedelta(days=i % 30))
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            locked += 1
+        else:
+            ok += 1
+            timings.append((time.perf_counter() - started) * 1000)
+    connections.close_all()
+    return ok, locked, timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent checkouts from N writer processes against a scratch SQLite file "
+        "under each database profile (LITTLELEMON_DB_PROFILES)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', default='1,2,4,8')
+        parser.add_argument('--checkouts', type=int, default=50, help="Checkouts per writer process.")
+        parser.add_argument('--profiles', default=','.join(settings.LITTLELEMON_DB_PROFILES))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark drives SQLite files; the default database is not SQLite.")
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("Writer processes are forked; this platform can't fork.")
+        writers = [int(count) for count in options['writers'].split(',')]
+        profiles = options['profiles'].split(',')
+        unknown = set(profiles) - set(settings.LITTLELEMON_DB_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        self.stdout.write(
+            f"{'profile':>12} {'writers':>8} {'checkouts/s':>12} {'ok':>6} {'locked':>7} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        with tempfile.TemporaryDirectory() as scratch:
+            for profile in profiles:
+                for count in writers:
+                    path = Path(scratch) / f'{profile}-{count}.sqlite3'
+                    with scratch_file(path, settings.LITTLELEMON_DB_PROFILES[profile]):
+                        seed(count)
+                        self.run(profile, count, options['checkouts'])
+
+    def run(self, profile, count, checkouts):
+        connections.close_all()
+        start_at = time.time() + 0.5
+        context = multiprocessing.get_context('fork')
+        with context.Pool(count) as pool:
+            results = pool.map(writer, [(f'writer-{i}', checkouts, start_at) for i in range(count)])
+        elapsed = time.time() - start_at
+        ok = sum(result[0] for result in results)
+        locked = sum(result[1] for result in results)
+        stats = summarize([timing for result in results for timing in result[2]])
+        self.stdout.write(
+            f"{profile:>12} {count:>8} {ok / elapsed:>12.0f} {ok:>6} {locked:>7} {stats['p50']:>8.2f} {stats['p95']:>8.2f}"
+        )
@@ -0,0 +1,63 @@
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from LittleLemonAPI.benchmarking import summarize
+from LittleLemonAPI.cart import upsert_cart_items
+from LittleLemonAPI.checkout import checkout_cart
+from LittleLemonAPI.models import Job, MenuItem
+from LittleLemonAPI.roles import DELIVERY_CREW
+from .bench_db_concurrency import CART_SIZE, scratch_file, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Time checkout with its post-checkout work (rollups, crew assignment) run inline after commit "
+        "against enqueued as jobs, then drain the queue with run_jobs on a scratch SQLite file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--profile', default='production', choices=list(settings.LITTLELEMON_DB_PROFILES))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark drives SQLite files; the default database is not SQLite.")
+        profile = settings.LITTLELEMON_DB_PROFILES[options['profile']]
+        with tempfile.TemporaryDirectory() as scratch, override_settings(LITTLELEMON_AUTO_ASSIGN=True):
+            self.stdout.write(f"{'post-checkout work':>20} {'p50 ms':>8} {'p95 ms':>8}")
+            for label, eager in (('inline', True), ('queued', False)):
+                with scratch_file(Path(scratch) / f'{label}.sqlite3', profile):
+                    user = self.seed()
+                    with override_settings(LITTLELEMON_JOBS_EAGER=eager):
+                        stats = summarize(self.checkouts(user, options['checkouts']))
+                    self.stdout.write(f"{label:>20} {stats['p50']:>8.2f} {stats['p95']:>8.2f}")
+                    if not eager:
+                        self.stdout.write(f"\nDraining {Job.objects.count()} jobs on {options['threads']} threads:")
+                        call_command(
+                            'run_jobs', '--burst', '--threads', str(options['threads']), '--poll-interval', '0.01',
+                            stdout=self.stdout
+                        )
+
+    def seed(self):
+        seed(1)
+        crew = Group.objects.create(name=DELIVERY_CREW)
+        crew.user_set.add(*User.objects.bulk_create([User(username=f'crew-{i}') for i in range(3)]))
+        return User.objects.get(username='writer-0')
+
+    def checkouts(self, user, count):
+        items = list(MenuItem.objects.order_by('id')[:CART_SIZE])
+        timings = []
+        for _ in range(count):
+            upsert_cart_items(user, {item: 1 for item in items})
+            start = time.perf_counter()
+            checkout_cart(user, date(2025, 1, 1))
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,73 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from LittleLemonAPI.benchmarking import scratch_database, seed_dataset
+from LittleLemonAPI.fastpath import all_fields, value_columns, render_rows
+from LittleLemonAPI.models import MenuItem, Order, Order_Item
+from LittleLemonAPI.renderers import FastJSONRenderer, MessagePackRenderer, orjson, msgpack
+from LittleLemonAPI.serializers import MenuItemSerializer, OrderSerializer, OrderItemSerializer
+
+
+def cpu_ms_per_thousand(func, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000 / rows * 1000
+
+
+def fast_orders(orders):
+    fields = all_fields(OrderSerializer)
+    items = {order['id']: [] for order in orders}
+    item_fields = all_fields(OrderItemSerializer)
+    item_rows = Order_Item.objects.filter(order_id__in=items).order_by('id').values(
+        *value_columns(OrderItemSerializer, item_fields)
+    )
+    for item in render_rows(OrderItemSerializer, item_fields, item_rows):
+        items[item['order']].append(item)
+    return render_rows(OrderSerializer, fields, orders, {'orderitem_set': lambda row: items[row['id']]})
+
+
+class Command(BaseCommand):
+    help = "Report CPU time per 1,000 rows for serializer and .values() list rendering and for each encoder."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with scratch_database():
+            seed_dataset(menu_items=rows, orders=rows, customers=10, cart_items=0)
+
+            menu_columns = value_columns(MenuItemSerializer, all_fields(MenuItemSerializer))
+            order_columns = value_columns(OrderSerializer, all_fields(OrderSerializer))
+            cases = [
+                ('menu items, serializer', lambda: MenuItemSerializer(MenuItem.objects.order_by('id'), many=True).data),
+                ('menu items, values', lambda: render_rows(
+                    MenuItemSerializer, all_fields(MenuItemSerializer),
+                    MenuItem.objects.order_by('id').values(*menu_columns)
+                )),
+                ('orders, serializer', lambda: OrderSerializer(Order.objects.order_by('id').prefetch_related(
+                    Prefetch('order_item_set', queryset=Order_Item.objects.order_by('id'))
+                ), many=True).data),
+                ('orders, values', lambda: fast_orders(list(Order.objects.order_by('id').values(*order_columns)))),
+            ]
+            self.stdout.write(f"Fetch and serialize, CPU ms per 1,000 rows (best of {repeat}):")
+            for label, func in cases:
+                self.stdout.write(f"  {label:<24} {cpu_ms_per_thousand(func, rows, repeat):8.2f}")
+
+            data = fast_orders(list(Order.objects.order_by('id').values(*order_columns)))
+            encoders = [('json (DRF)', JSONRenderer())]
+            if orjson is not None:
+                encoders.append(('orjson', FastJSONRenderer()))
+            if msgpack is not None:
+                encoders.append(('msgpack', MessagePackRenderer()))
+            self.stdout.write(f"Encode {rows} orders, CPU ms per 1,000 rows and bytes per row:")
+            for label, renderer in encoders:
+                size = len(renderer.render(data))
+                per_thousand = cpu_ms_per_thousand(lambda: renderer.render(data), rows, repeat)
+                self.stdout.write(f"  {label:<24} {per_thousand:8.2f} {size / rows:8.1f}")
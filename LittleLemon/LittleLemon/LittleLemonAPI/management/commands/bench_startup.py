@@ -0,0 +1,190 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.authtoken.models import Token
+from .bench_db_concurrency import scratch_file, seed
+
+MODES = (('full', '0'), ('api-only', '1'))
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+# Run in a fresh interpreter: loads LittleLemon.wsgi like a preloading server
+# and sends GET /api/menu-items straight to the WSGI callable. With a count of
+# forks, it forks that many workers one after the other instead, each sending
+# its first request; prints one JSON line [status, ms] per response.
+WORKER = '''
+import io, json, os, sys, time
+from LittleLemon.wsgi import application
+
+def first_response():
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/menu-items', 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': 'Token ' + os.environ['BENCH_TOKEN'], 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    started = time.perf_counter()
+    statuses = []
+    b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    return statuses[0], (time.perf_counter() - started) * 1000
+
+forks = int(sys.argv[1])
+if not forks:
+    print(json.dumps(first_response()), flush=True)
+for _ in range(forks):
+    read, write = os.pipe()
+    started = time.perf_counter()
+    if not os.fork():
+        os.close(read)
+        os.write(write, json.dumps(first_response()).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        status, _ = json.loads(pipe.read())
+    os.wait()
+    print(json.dumps([status, (time.perf_counter() - started) * 1000]), flush=True)
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile what LittleLemon.wsgi and manage.py spend importing, per INSTALLED_APPS entry, in the full "
+        "and the API-only (LITTLELEMON_API_ONLY) settings; then time the first response of a cold process and "
+        "of workers forked from a preloaded master, with and without warm-up (LITTLELEMON_WARM_UP)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; medians are reported.")
+        parser.add_argument('--top', type=int, default=12, help="Rows of the import table.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark serves from a scratch SQLite file; the default database is not SQLite.")
+        if not hasattr(os, 'fork'):
+            raise CommandError("Workers are forked from a preloaded master; this platform can't fork.")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive.")
+        self.repeat = options['repeat']
+        self.profile_imports(options['top'])
+        with tempfile.TemporaryDirectory() as scratch:
+            path = Path(scratch) / 'startup.sqlite3'
+            with scratch_file(path, settings.LITTLELEMON_DB_PROFILES['production']):
+                seed(1)
+                token = Token.objects.create(user=User.objects.get(username='writer-0')).key
+            self.stdout.write('')
+            self.time_first_response(path, token)
+
+    def env(self, api_only, warm_up='1', **extra):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='LittleLemon.settings',
+                   LITTLELEMON_API_ONLY=api_only, LITTLELEMON_WARM_UP=warm_up, **extra)
+        env.pop('LITTLELEMON_DB_REPLICA', None)
+        return env
+
+    def run(self, argv, env):
+        result = subprocess.run(
+            [sys.executable, *argv], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=300
+        )
+        if result.returncode:
+            raise CommandError(f"{' '.join(argv)} failed:\n{result.stderr[-2000:]}")
+        return result
+
+    def group(self, module):
+        # The longest INSTALLED_APPS entry the module belongs to, so
+        # rest_framework.authtoken is told apart from rest_framework.
+        owners = [app for app in settings.INSTALLED_APPS if module == app or module.startswith(f'{app}.')]
+        if owners:
+            return max(owners, key=len)
+        if module.startswith('django.'):
+            return 'django (core)'
+        return module.partition('.')[0]
+
+    def import_profile(self, argv, api_only):
+        """Median wall time, import time and per-group import time (all ms) of `repeat` runs."""
+        walls, totals, groups = [], [], defaultdict(list)
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            result = self.run(['-X', 'importtime', *argv], self.env(api_only))
+            walls.append((time.perf_counter() - started) * 1000)
+            by_group = defaultdict(float)
+            for line in result.stderr.splitlines():
+                match = IMPORTTIME_LINE.match(line)
+                if match:
+                    by_group[self.group(match[4])] += int(match[1]) / 1000
+            totals.append(sum(by_group.values()))
+            for name, ms in by_group.items():
+                groups[name].append(ms)
+        # A group missing from a run imported nothing in it.
+        return statistics.median(walls), statistics.median(totals), {
+            name: statistics.median(values + [0.0] * (self.repeat - len(values))) for name, values in groups.items()
+        }
+
+    def profile_imports(self, top):
+        columns = {}
+        for target, argv in (('wsgi', ['-c', 'import LittleLemon.wsgi']), ('check', ['manage.py', 'check'])):
+            for mode, api_only in MODES:
+                columns[f'{target} {mode}'] = self.import_profile(argv, api_only)
+
+        self.stdout.write(f"Import time (ms, median of {self.repeat}), by INSTALLED_APPS entry or top-level package:")
+        self.stdout.write(f"{'':<28}" + ''.join(f"{label:>16}" for label in columns))
+        self.stdout.write(f"{'process wall time':<28}" + ''.join(f"{wall:>16.1f}" for wall, _, _ in columns.values()))
+        self.stdout.write(f"{'all imports':<28}" + ''.join(f"{total:>16.1f}" for _, total, _ in columns.values()))
+        full = columns['wsgi full'][2]
+        apps = list(settings.INSTALLED_APPS)
+        others = sorted((name for name in full if name not in apps), key=full.get, reverse=True)[:top]
+        for name in apps + others:
+            self.stdout.write(
+                f"{name:<28}" + ''.join(f"{groups.get(name, 0.0):>16.1f}" for _, _, groups in columns.values())
+            )
+
+    def first_responses(self, forks, env):
+        """
+        (since process start, request) timings in ms of `repeat` first responses: from
+        cold processes, or with `forks` from workers forked by one preloaded master.
+        """
+        timings = []
+        runs = [0] * self.repeat if not forks else [self.repeat]
+        for count in runs:
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, '-c', WORKER, str(count)], cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            for line in process.stdout:
+                status, ms = json.loads(line)
+                if not status.startswith('200'):
+                    process.kill()
+                    raise CommandError(f"GET /api/menu-items answered {status}: {process.stderr.read()[-2000:]}")
+                timings.append(((time.perf_counter() - started) * 1000, ms))
+            if process.wait(timeout=300):
+                raise CommandError(f"The worker failed:\n{process.stderr.read()[-2000:]}")
+        return timings
+
+    def time_first_response(self, path, token):
+        self.stdout.write(f"Time to first response, GET /api/menu-items (ms, median of {self.repeat}):")
+        self.stdout.write(
+            f"{'settings':>10} {'warm-up':>8} {'cold start':>11} {'cold request':>13} {'forked worker':>14}"
+        )
+        for mode, api_only in MODES:
+            for warm_up in ('0', '1'):
+                env = self.env(api_only, warm_up, LITTLELEMON_DB_PATH=str(path), BENCH_TOKEN=token)
+                cold = self.first_responses(0, env)
+                forked = self.first_responses(self.repeat, env)
+                self.stdout.write(
+                    f"{mode:>10} {'on' if warm_up == '1' else 'off':>8} "
+                    f"{statistics.median(start for start, _ in cold):>11.1f} "
+                    f"{statistics.median(request for _, request in cold):>13.1f} "
+                    f"{statistics.median(request for _, request in forked):>14.1f}"
+                )
+        connections.close_all()
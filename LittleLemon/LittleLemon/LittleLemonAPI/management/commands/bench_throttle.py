@@ -0,0 +1,51 @@
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework import throttling
+from LittleLemonAPI.benchmarking import summarize
+from LittleLemonAPI.throttling import UserRateThrottle
+
+
+class Command(BaseCommand):
+    help = (
+        "Time throttle checks for one busy client: DRF's timestamp-history throttle against the "
+        "fixed-window counters in the cache and in a shared SQLite file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=20000)
+        parser.add_argument('--buckets', type=int, default=5, help="Report the cost in this many slices of the run.")
+
+    def handle(self, *args, **options):
+        rate = f"{options['checks']}/day"  # high enough that every check is allowed and recorded
+        request = SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=1))
+        history = type('HistoryThrottle', (throttling.UserRateThrottle,), {
+            'rate': rate, 'cache': LocMemCache('bench-throttle', {}),
+        })
+        fixed = type('FixedWindowThrottle', (UserRateThrottle,), {'rate': rate})
+
+        self.stdout.write(
+            f"{'backend':>16} " + ' '.join(f"{f'slice {n + 1} us':>12}" for n in range(options['buckets']))
+        )
+        self.report('drf history', history, request, options)
+        with override_settings(LITTLELEMON_THROTTLE_CACHE='bench-throttle', CACHES={
+            'bench-throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+        }):
+            self.report('fixed (cache)', fixed, request, options)
+        with tempfile.TemporaryDirectory() as scratch:
+            with override_settings(LITTLELEMON_THROTTLE_DB=str(Path(scratch) / 'throttle.sqlite3')):
+                self.report('fixed (sqlite)', fixed, request, options)
+
+    def report(self, label, throttle_class, request, options):
+        timings = []
+        for _ in range(options['checks']):
+            start = time.perf_counter()
+            throttle_class().allow_request(request, None)
+            timings.append((time.perf_counter() - start) * 1e6)
+        size = len(timings) // options['buckets']
+        medians = [summarize(timings[n * size:(n + 1) * size])['p50'] for n in range(options['buckets'])]
+        self.stdout.write(f"{label:>16} " + ' '.join(f'{median:>12.1f}' for median in medians))
@@ -0,0 +1,224 @@
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from LittleLemonAPI import urls as api_urls
+from LittleLemonAPI.benchmarking import scratch_database, seed_dataset, summarize
+from LittleLemonAPI.cart import upsert_cart_items
+from LittleLemonAPI.models import MenuItem
+from LittleLemonAPI.roles import MANAGER, DELIVERY_CREW
+
+# Query counts are the same on every machine and are checked in; timings only
+# mean something on the machine that took them, so they stay local (git-ignored).
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmark_baseline.json'
+DEFAULT_TIMINGS = Path(__file__).resolve().parents[2] / 'benchmark_timings.json'
+
+
+class Scenario:
+    def __init__(self, route, method, user, kwargs=None, body=None, setup=None, expect=200, label=None,
+                 query=None):
+        self.route = route
+        self.query = query
+        self.label = label
+        self.method = method
+        self.user = user
+        self.kwargs = kwargs or (lambda i: {})
+        self.body = body
+        self.setup = setup
+        self.expect = expect
+
+    @property
+    def name(self):
+        name = f'{self.method.upper()} {self.route}'
+        return f'{name} ({self.label})' if self.label else name
+
+
+def build_scenarios(data):
+    customer, other_customer, new_manager, new_crew = data.customers[:4]
+    manager = data.managers[0]
+    crew = data.crew[0]
+    items = data.menu_items
+    own_order = next(order for order in data.orders if order.user_id == customer.pk)
+    manager_group = Group.objects.get(name=MANAGER)
+    crew_group = Group.objects.get(name=DELIVERY_CREW)
+    MenuItem.objects.filter(pk=items[0].pk).update(item_of_the_day=True)
+
+    return [
+        Scenario('menuitem-list', 'get', customer),
+        Scenario('menuitem-list', 'post', data.admin, expect=201, body=lambda i: {
+            'title': f'Bench special {i}', 'price': '9.99', 'featured': False, 'category': data.categories[0].pk,
+        }),
+        Scenario('menuitem-detail', 'get', customer, kwargs=lambda i: {'pk': items[i % len(items)].pk}),
+        Scenario('menuitem-detail', 'patch', manager, kwargs=lambda i: {'pk': items[0].pk},
+                 body=lambda i: {'price': f'{5 + i % 10}.00'}),
+        Scenario('menuitem-import', 'post', data.admin, body=lambda i: [
+            {'id': item.pk, 'price': f'{5 + (i + n) % 20}.50'} for n, item in enumerate(items[100:300])
+        ]),
+        Scenario('menuitem-search', 'get', customer, query=lambda i: {
+            'q': f'menu item {i % 50}', 'price_max': '20', 'featured': 'false',
+        }),
+        Scenario('menuitem-typeahead', 'get', customer, query=lambda i: {'q': f'categ {i % 10}'}),
+        Scenario('category-list', 'get', customer),
+        Scenario('category-detail', 'get', customer, kwargs=lambda i: {'pk': data.categories[0].pk}),
+        Scenario('manager-users', 'get', data.admin),
+        Scenario('manager-user-detail', 'delete', data.admin, kwargs=lambda i: {'user_id': new_manager.pk},
+                 setup=lambda i: manager_group.user_set.add(new_manager)),
+        Scenario('delivery-crew-users', 'get', manager),
+        Scenario('delivery-crew-user-detail', 'delete', manager, kwargs=lambda i: {'user_id': new_crew.pk},
+                 setup=lambda i: crew_group.user_set.add(new_crew)),
+        Scenario('item-of-the-day', 'get', customer),
+        Scenario('set-item-of-the-day', 'post', manager, kwargs=lambda i: {'item_id': items[i % 2 + 1].pk}),
+        Scenario('cart-items', 'get', customer),
+        Scenario('cart-items', 'post', customer, expect=201,
+                 body=lambda i: {'menuitem': items[i % 20].pk, 'quantity': 1 + i % 3}),
+        Scenario('cart-items-bulk', 'post', other_customer, body=lambda i: [
+            {'menuitem': items[k].title, 'quantity': 1 + i % 3} for k in range(15)
+        ]),
+        Scenario('cart-summary', 'get', customer),
+        Scenario('cart-orders', 'get', customer),
+        Scenario('cart-orders', 'post', other_customer, expect=201,
+                 setup=lambda i: upsert_cart_items(other_customer, {item: 1 for item in items[:20]})),
+        Scenario('cart-order-detail', 'get', customer, kwargs=lambda i: {'order_id': own_order.pk}),
+        Scenario('orders', 'get', manager, label='manager'),
+        Scenario('orders', 'get', crew, label='delivery crew'),
+        Scenario('order-export', 'get', manager, kwargs=lambda i: {'fmt': ('ndjson', 'csv')[i % 2]},
+                 query=lambda i: {'date_from': data.orders[30].date.isoformat()}),
+        Scenario('order-changes', 'get', crew, query=lambda i: {'since': 0}),
+        Scenario('order-detail', 'get', manager, kwargs=lambda i: {'order_id': data.orders[i % 100].pk}),
+        Scenario('order-detail', 'patch', manager, kwargs=lambda i: {'order_id': data.orders[i % 100].pk},
+                 body=lambda i: {'status': i % 2 == 0}),
+        Scenario('report-daily-revenue', 'get', manager, query=lambda i: {'date_from': data.orders[90].date}),
+        Scenario('report-delivery-crew', 'get', manager),
+        Scenario('report-top-items', 'get', manager, query=lambda i: {'limit': 20}),
+        Scenario('report-category-mix', 'get', manager),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset on a scratch database, drive every API route and report "
+        "latency percentiles, requests/second and query counts. Fails when a scenario "
+        "makes more queries than the checked-in baseline, or is slower than the timings "
+        "this machine recorded with --update-baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--menu-items', type=int, default=2000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--customers', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--only', help="Run only scenarios whose name contains this text.")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Query counts per scenario.")
+        parser.add_argument('--timings', default=str(DEFAULT_TIMINGS), help="p95 per scenario, on this machine.")
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Write the query counts and this machine's timings instead of comparing.")
+        parser.add_argument('--tolerance', type=float, default=2.0,
+                            help="Allowed p95 slowdown factor against the baseline.")
+        parser.add_argument('--min-delta', type=float, default=2.0,
+                            help="Ignore p95 slowdowns smaller than this many milliseconds.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] > 900:
+            # The cache is cleared per scenario, but one scenario must stay under the user throttle.
+            raise CommandError("--repeat must stay below the 1000/day user throttle rate.")
+        with scratch_database():
+            data = seed_dataset(
+                categories=options['categories'], menu_items=options['menu_items'],
+                customers=options['customers'], orders=options['orders'],
+            )
+            scenarios = build_scenarios(data)
+            self.check_coverage(scenarios)
+            if options['only']:
+                scenarios = [s for s in scenarios if options['only'] in s.name]
+
+            results = {}
+            self.stdout.write(f"{'scenario':<40} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+            for scenario in scenarios:
+                results[scenario.name] = result = self.run_scenario(scenario, data, options['repeat'])
+                self.stdout.write(
+                    f"{scenario.name:<40} {result['rps']:>8.0f} {result['p50']:>8.2f} "
+                    f"{result['p95']:>8.2f} {result['p99']:>8.2f} {result['queries']:>8}"
+                )
+
+        baseline_path, timings_path = Path(options['baseline']), Path(options['timings'])
+        if options['update_baseline']:
+            if options['only']:
+                # Keep the counts of the scenarios that didn't run.
+                results = {**self.load(baseline_path), **results}
+            queries = {name: {'queries': result['queries']} for name, result in results.items()}
+            timings = {name: {'p95': result['p95']} for name, result in results.items() if 'p95' in result}
+            baseline_path.write_text(json.dumps(queries, indent=2, sort_keys=True) + '\n')
+            timings_path.write_text(json.dumps({**self.load(timings_path), **timings}, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f"Query counts written to {baseline_path}, timings to {timings_path}")
+        else:
+            self.compare(results, self.load(baseline_path), self.load(timings_path), options)
+
+    def load(self, path):
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def check_coverage(self, scenarios):
+        covered = {scenario.route for scenario in scenarios}
+        missing = [p.name for p in api_urls.urlpatterns if p.name not in covered]
+        if missing:
+            raise CommandError(f"No benchmark scenario for routes: {', '.join(missing)}")
+
+    def run_scenario(self, scenario, data, repeat):
+        # Throttle history and cached responses start empty for every scenario.
+        cache.clear()
+        client = Client(HTTP_AUTHORIZATION=f'Token {data.tokens[scenario.user.pk]}')
+        timings = []
+        queries = 0
+        for i in range(repeat):
+            if scenario.setup:
+                scenario.setup(i)
+            path = reverse(scenario.route, kwargs=scenario.kwargs(i))
+            if scenario.query:
+                path += '?' + urlencode(scenario.query(i))
+            request = getattr(client, scenario.method)
+            body = scenario.body(i) if scenario.body else None
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                if body is None:
+                    response = request(path)
+                else:
+                    response = request(path, json.dumps(body), content_type='application/json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != scenario.expect:
+                raise CommandError(
+                    f"{scenario.name} returned {response.status_code}, expected {scenario.expect}: "
+                    f"{response.content[:200]!r}"
+                )
+            # The most any run took, so the cold first run's cache misses count too.
+            queries = max(queries, len(ctx.captured_queries))
+
+        result = summarize(timings)
+        result['rps'] = len(timings) / (sum(timings) / 1000)
+        result['queries'] = queries
+        return result
+
+    def compare(self, results, baseline, timings, options):
+        """Fail on more queries than `baseline`, or a p95 past the tolerance of `timings`."""
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is not None and result['queries'] > expected['queries']:
+                regressions.append(f"{name}: {result['queries']} queries (baseline {expected['queries']})")
+            expected = timings.get(name)
+            if expected is None:
+                continue
+            limit = expected['p95'] * options['tolerance']
+            if result['p95'] > limit and result['p95'] - expected['p95'] > options['min_delta']:
+                regressions.append(f"{name}: p95 {result['p95']:.2f} ms (baseline {expected['p95']:.2f} ms)")
+        if regressions:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
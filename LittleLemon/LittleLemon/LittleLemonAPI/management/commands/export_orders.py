@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from LittleLemonAPI.export import EXPORT_FORMATS, iter_orders
+
+
+def date_argument(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Stream orders with their items as NDJSON or CSV, holding one chunk of rows in memory at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--date-from', type=date_argument)
+        parser.add_argument('--date-to', type=date_argument)
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--archived', action='store_true', help="Export archived orders instead of live ones.")
+        parser.add_argument('--output', help="File to write to; defaults to stdout.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        _, write_lines = EXPORT_FORMATS[options['format']]
+        orders = iter_orders(options['date_from'], options['date_to'], options['chunk_size'], options['archived'])
+        if not options['output']:
+            for line in write_lines(orders):
+                self.stdout.write(line.decode() if isinstance(line, bytes) else line, ending='')
+            return
+        with open(options['output'], 'wb') as output:
+            for line in write_lines(orders):
+                output.write(line if isinstance(line, bytes) else line.encode())
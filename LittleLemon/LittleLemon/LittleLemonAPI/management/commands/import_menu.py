@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from LittleLemonAPI.menu_import import csv_rows, payload_rows, import_menu
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update menu items from a CSV or JSON file in batched bulk writes. "
+        "Rows match existing items by id or title; invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report without writing.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in ('csv', 'json'):
+            raise CommandError("Pass --format csv or --format json.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        text = path.read_text(encoding='utf-8-sig')
+        try:
+            rows = csv_rows(text) if fmt == 'csv' else payload_rows(json.loads(text))
+        except (ValueError, ValidationError) as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+
+        report = import_menu(rows, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        for error in report.as_dict()['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        prefix = "Dry run: " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}created {len(report.created)}, updated {len(report.updated)}, "
+            f"unchanged {report.unchanged}, rejected {len(report.errors)} rows."
+        ))
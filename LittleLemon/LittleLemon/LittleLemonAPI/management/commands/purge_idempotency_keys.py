@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from LittleLemonAPI.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses that have expired (LITTLELEMON_IDEMPOTENCY_TTL)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Deleted {purge_expired_keys()} expired idempotency keys."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from LittleLemonAPI.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the menu full-text search index from the MenuItem and Category tables."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write("This database has no FTS index; search uses ORM lookups.")
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} menu items."))
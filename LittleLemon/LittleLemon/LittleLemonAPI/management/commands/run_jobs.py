@@ -0,0 +1,69 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from LittleLemonAPI.benchmarking import summarize
+from LittleLemonAPI.jobs import JobStats, run_worker
+from LittleLemonAPI.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs (LittleLemonAPI/jobs.py) on a thread pool, reporting per-type throughput "
+        "and latency every --report-every seconds and on exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+        parser.add_argument('--report-every', type=float, default=60.0)
+        parser.add_argument('--metrics-file', help="Also write Prometheus metrics here (textfile collector).")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1:
+            raise CommandError("--threads must be positive.")
+        self.options = options
+        self.stats = JobStats()
+        self.started = self.reported = time.perf_counter()
+        try:
+            run_worker(options['threads'], options['poll_interval'], options['burst'], self.stats, self.on_idle)
+        except KeyboardInterrupt:
+            pass
+        self.report()
+
+    def on_idle(self):
+        if time.perf_counter() - self.reported >= self.options['report_every']:
+            self.report()
+
+    def report(self):
+        self.reported = time.perf_counter()
+        elapsed = self.reported - self.started
+        self.stdout.write(
+            f"{'job type':<22} {'done':>7} {'retried':>8} {'failed':>7} {'jobs/s':>8} "
+            f"{'wait p50':>9} {'wait p95':>9} {'run p50':>8} {'run p95':>8} {'queued':>7} {'dead':>5}"
+        )
+        queued = {
+            row['type']: row for row in Job.objects.values('type').annotate(
+                queued=Count('id', filter=Q(failed=False)), dead=Count('id', filter=Q(failed=True))
+            ).order_by()
+        }
+        with self.stats.lock:
+            outcomes = {job_type: dict(counts) for job_type, counts in self.stats.outcomes.items()}
+            waits = {job_type: summarize(values) for job_type, values in self.stats.waits.items()}
+            runs = {job_type: summarize(values) for job_type, values in self.stats.runs.items()}
+        for job_type in sorted(set(outcomes) | set(queued)):
+            counts = outcomes.get(job_type, {})
+            wait, run = waits.get(job_type, summarize([])), runs.get(job_type, summarize([]))
+            depth = queued.get(job_type, {'queued': 0, 'dead': 0})
+            self.stdout.write(
+                f"{job_type:<22} {counts.get('done', 0):>7} {counts.get('retry', 0):>8} "
+                f"{counts.get('failed', 0) + counts.get('expired', 0):>7} {counts.get('done', 0) / elapsed:>8.1f} "
+                f"{wait['p50']:>9.1f} {wait['p95']:>9.1f} {run['p50']:>8.1f} {run['p95']:>8.1f} "
+                f"{depth['queued']:>7} {depth['dead']:>5}"
+            )
+        if self.options['metrics_file']:
+            path = self.options['metrics_file']
+            with open(f'{path}.tmp', 'w') as metrics:
+                metrics.write(self.stats.registry.render())
+            os.replace(f'{path}.tmp', path)
@@ -0,0 +1,162 @@
+import multiprocessing
+import tempfile
+import time
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+from LittleLemonAPI.models import Category, MenuItem, Cart, CartSummary, Order, Order_Item
+from LittleLemonAPI.views import CartView, OrderListCreateView
+from .bench_db_concurrency import scratch_file
+
+
+def send(view, request, user):
+    """Send the request, resending it while the database is locked, like a client retrying on a timeout."""
+    resent = 0
+    while True:
+        force_authenticate(request, user)
+        try:
+            return view(request), resent
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            resent += 1
+
+
+def adder(args):
+    # Runs in a forked child: adds each of its menu items to the cart once.
+    username, item_ids, start_at = args
+    connections.close_all()
+    user = User.objects.get(username=username)
+    view = CartView.as_view(throttle_classes=[])
+    factory = APIRequestFactory()
+    resent = 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for item_id in item_ids:
+        request = factory.post('/api/cart/menu-items', {'menuitem': str(item_id), 'quantity': 1}, format='json')
+        response, retries = send(view, request, user)
+        if response.status_code != 201:
+            raise RuntimeError(f"Adding {item_id} failed: {response.status_code} {response.data}")
+        resent += retries
+    connections.close_all()
+    return 'adder', username, resent, []
+
+
+def checkout_client(args):
+    # Runs in a forked child: sends the user's checkouts, one Idempotency-Key each.
+    # Several of these run per user with the same keys, so every checkout is
+    # also retried concurrently.
+    username, checkouts, start_at = args
+    connections.close_all()
+    user = User.objects.get(username=username)
+    view = OrderListCreateView.as_view(throttle_classes=[])
+    factory = APIRequestFactory()
+    resent, results = 0, []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for i in range(checkouts):
+        key = f'{username}-{i}'
+        request = factory.post('/api/cart/orders', {'date': '2025-01-01'}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        response, retries = send(view, request, user)
+        results.append((key, response.status_code, response.data.get('order_id')))
+        resent += retries
+        time.sleep(0.02)  # spread the checkouts over the adders' run
+    connections.close_all()
+    return 'checkout', username, resent, results
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress POST cart/orders from forked processes against a scratch SQLite file: per user, one "
+        "process keeps adding items while several send the same Idempotency-Keys for checkout. Fails "
+        "if a key created more than one order, or if an item went missing or was ordered twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument('--clients', type=int, default=3, help="Checkout processes per user, sharing its keys.")
+        parser.add_argument('--checkouts', type=int, default=20, help="Idempotency keys per user.")
+        parser.add_argument('--items', type=int, default=60, help="Items each user's adder puts in the cart.")
+        parser.add_argument('--profile', default='production', choices=list(settings.LITTLELEMON_DB_PROFILES))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This stress test drives SQLite files; the default database is not SQLite.")
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("Clients are forked processes; this platform can't fork.")
+        with tempfile.TemporaryDirectory() as scratch:
+            with scratch_file(Path(scratch) / 'stress.sqlite3', settings.LITTLELEMON_DB_PROFILES[options['profile']]):
+                users = self.seed(options['users'], options['items'])
+                start = time.time()
+                results = self.run(users, options)
+                elapsed = time.time() - start
+                problems = self.verify(users, options['items'], results)
+
+        requests = options['users'] * (options['items'] + options['clients'] * options['checkouts'])
+        resent = sum(result[2] for result in results)
+        orders = len({order_id for result in results for _, _, order_id in result[3] if order_id})
+        self.stdout.write(
+            f"{requests} requests from {len(results)} processes in {elapsed:.1f}s, "
+            f"{resent} resent after 'database is locked', {orders} orders"
+        )
+        if problems:
+            raise CommandError("\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("No duplicate orders and no lost items."))
+
+    def seed(self, users, items):
+        category = Category.objects.create(slug='stress', title='Stress')
+        MenuItem.objects.bulk_create([
+            MenuItem(title=f'Item {i}', price=Decimal('1.25'), featured=False, category=category)
+            for i in range(items)
+        ])
+        User.objects.bulk_create([User(username=f'user-{i}') for i in range(users)])
+        return [f'user-{i}' for i in range(users)]
+
+    def run(self, users, options):
+        item_ids = list(MenuItem.objects.order_by('id').values_list('id', flat=True))
+        connections.close_all()
+        start_at = time.time() + 0.5
+        jobs = [(adder, (username, item_ids, start_at)) for username in users] + [
+            (checkout_client, (username, options['checkouts'], start_at))
+            for username in users for _ in range(options['clients'])
+        ]
+        context = multiprocessing.get_context('fork')
+        with context.Pool(len(jobs)) as pool:
+            pending = [pool.apply_async(func, (args,)) for func, args in jobs]
+            return [result.get() for result in pending]
+
+    def verify(self, users, items, results):
+        problems = []
+        answers = defaultdict(set)
+        for kind, username, _, outcomes in results:
+            for key, status_code, order_id in outcomes:
+                answers[key].add((status_code, order_id))
+        for key, seen in sorted(answers.items()):
+            if len(seen) > 1:
+                problems.append(f"Key {key} got different responses: {sorted(seen, key=str)}")
+
+        for username in users:
+            user = User.objects.get(username=username)
+            returned = {order_id for key, seen in answers.items() if key.startswith(f'{username}-')
+                        for _, order_id in seen if order_id}
+            created = set(Order.objects.filter(user=user).values_list('id', flat=True))
+            if created != returned:
+                problems.append(f"{username}: orders {sorted(created - returned)} were never returned to a client")
+
+            ordered = list(Order_Item.objects.filter(order__user=user).values_list('menuitem_id', flat=True))
+            in_cart = list(Cart.objects.filter(user=user).values_list('menuitem_id', flat=True))
+            placed = ordered + in_cart
+            if len(placed) != len(set(placed)):
+                problems.append(f"{username}: {len(placed) - len(set(placed))} items were ordered twice")
+            if len(set(placed)) != items:
+                problems.append(f"{username}: {items - len(set(placed))} items were lost")
+
+            summary = CartSummary.objects.get(user=user)
+            if summary.item_count != len(in_cart):
+                problems.append(f"{username}: cart summary counts {summary.item_count} items, cart holds {len(in_cart)}")
+        return problems
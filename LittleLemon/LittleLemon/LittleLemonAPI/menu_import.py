@@ -0,0 +1,206 @@
+"""
+Bulk menu import and repricing.
+
+Rows (from CSV or JSON) carry `id` or `title` to match an existing item, plus
+any of `title`, `price`, `featured` and `category` (a category slug). Rows
+that match nothing create a new item and then need all four. Every row is
+validated up front; categories and existing items are each looked up in one
+query. Changes are written with bulk_create/bulk_update in batches, each in
+its own transaction. A batch the database rejects is retried row by row, so
+one bad row never takes the others down with it.
+"""
+import csv
+import io
+from django.db import transaction, DatabaseError
+from rest_framework import serializers
+from .catalog import bump_catalog_version
+from .models import Category, MenuItem
+from .search import index_menu_items
+
+IMPORT_FIELDS = ('title', 'price', 'featured', 'category')
+
+
+class MenuImportRowSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False, min_value=1)
+    title = serializers.CharField(required=False, max_length=255)
+    price = serializers.DecimalField(required=False, max_digits=6, decimal_places=2, min_value=0)
+    featured = serializers.BooleanField(required=False)
+    category = serializers.SlugField(required=False)
+
+    def to_internal_value(self, data):
+        # CSV cells are all strings; an empty cell means "leave unchanged".
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if value not in ('', None)}
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if 'id' not in attrs and 'title' not in attrs:
+            raise serializers.ValidationError("Each row needs an id or a title.")
+        return attrs
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.unchanged = 0
+        self.errors = []
+
+    def error(self, row, detail):
+        self.errors.append({'row': row, 'errors': detail})
+
+    def as_dict(self):
+        return {
+            'created': len(self.created),
+            'updated': len(self.updated),
+            'unchanged': self.unchanged,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+
+def csv_rows(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def payload_rows(payload):
+    """Rows from a decoded request body: a list of rows or {"items": [...]}."""
+    if isinstance(payload, dict):
+        payload = payload.get('items')
+    if not isinstance(payload, list):
+        raise serializers.ValidationError("Expected a list of rows or an object with an 'items' list.")
+    return payload
+
+
+def plan_import(rows, allow_create=True):
+    """
+    Validate `rows` and match them to items and categories.
+
+    Returns (changes, report): changes is a list of (row number, MenuItem,
+    changed field names, created), with rows numbered from 1.
+    """
+    report = ImportReport()
+    valid = []
+    for number, row in enumerate(rows, start=1):
+        serializer = MenuImportRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            report.error(number, serializer.errors)
+
+    slugs = {data['category'] for _, data in valid if 'category' in data}
+    categories = {}
+    for category in Category.objects.filter(slug__in=slugs).order_by('-id'):
+        categories[category.slug] = category  # the oldest category wins a duplicated slug
+
+    ids = {data['id'] for _, data in valid if 'id' in data}
+    titles = {data['title'] for _, data in valid if 'id' not in data}
+    by_id, by_title = {}, {}
+    for item in MenuItem.objects.select_related('category').filter(id__in=ids) | \
+            MenuItem.objects.select_related('category').filter(title__in=titles):
+        by_id[item.pk] = item
+        by_title.setdefault(item.title, []).append(item)
+
+    changes, seen = [], set()
+    for number, data in valid:
+        if 'category' in data and data['category'] not in categories:
+            report.error(number, {'category': [f"No category with slug '{data['category']}'."]})
+            continue
+
+        if 'id' in data:
+            item = by_id.get(data['id'])
+            if item is None:
+                report.error(number, {'id': ["No menu item with this id."]})
+                continue
+        else:
+            matches = by_title.get(data['title'], [])
+            if len(matches) > 1:
+                report.error(number, {'title': ["Several menu items have this title; use the id."]})
+                continue
+            item = matches[0] if matches else None
+
+        if item is not None and item.pk in seen:
+            report.error(number, {'non_field_errors': ["This menu item already appears in an earlier row."]})
+            continue
+
+        if item is None:
+            if ('new', data.get('title')) in seen:
+                report.error(number, {'title': ["A new menu item with this title appears in an earlier row."]})
+                continue
+            missing = [field for field in IMPORT_FIELDS if field not in data]
+            if missing:
+                report.error(number, {field: ["This field is required for a new menu item."] for field in missing})
+                continue
+            if not allow_create:
+                report.error(number, {'non_field_errors': ["Only admins can create menu items."]})
+                continue
+            seen.add(('new', data['title']))
+            item = MenuItem(title=data['title'], price=data['price'], featured=data['featured'],
+                            category=categories[data['category']])
+            changes.append((number, item, list(IMPORT_FIELDS), True))
+            continue
+
+        seen.add(item.pk)
+        changed = []
+        for field in IMPORT_FIELDS:
+            if field not in data:
+                continue
+            value = categories[data[field]] if field == 'category' else data[field]
+            current = item.category if field == 'category' else getattr(item, field)
+            if value != current:
+                setattr(item, field, value)
+                changed.append(field)
+        if changed:
+            changes.append((number, item, changed, False))
+        else:
+            report.unchanged += 1
+    return changes, report
+
+
+def write_batch(batch):
+    created = [item for _, item, _, is_new in batch if is_new]
+    updated = [item for _, item, _, is_new in batch if not is_new]
+    with transaction.atomic():
+        MenuItem.objects.bulk_create(created)
+        if updated:
+            fields = sorted({field for _, _, changed, is_new in batch if not is_new for field in changed})
+            MenuItem.objects.bulk_update(updated, fields)
+        # Bulk writes skip the model signals that keep search and catalog caches in step.
+        index_menu_items(created + updated)
+        transaction.on_commit(bump_catalog_version)
+
+
+def forget_rolled_back_insert(change):
+    _, item, _, is_new = change
+    if is_new:
+        item.pk = None
+        item._state.adding = True
+
+
+def apply_import(changes, report, batch_size=500):
+    for start in range(0, len(changes), batch_size):
+        batch = changes[start:start + batch_size]
+        try:
+            write_batch(batch)
+            written = batch
+        except DatabaseError:
+            written = []
+            for change in batch:
+                try:
+                    forget_rolled_back_insert(change)
+                    write_batch([change])
+                    written.append(change)
+                except DatabaseError as exc:
+                    forget_rolled_back_insert(change)
+                    report.error(change[0], {'non_field_errors': [str(exc)]})
+        for _, item, _, is_new in written:
+            (report.created if is_new else report.updated).append(item)
+    return report
+
+
+def import_menu(rows, batch_size=500, dry_run=False, allow_create=True):
+    changes, report = plan_import(rows, allow_create)
+    if dry_run:
+        for _, item, _, is_new in changes:
+            (report.created if is_new else report.updated).append(item)
+        return report
+    return apply_import(changes, report, batch_size)
@@ -0,0 +1,130 @@
+"""
+In-process menu snapshot.
+
+Menu item detail reads, the item of the day, cart pricing and title lookups
+read this snapshot instead of the database. The snapshot is an immutable set
+of MenuRecord objects indexed by id and by title. Every call checks the
+catalog version (one cache read). When a catalog write has bumped the
+version, the snapshot is rebuilt with one query and swapped in as a single
+reference, so a reader sees either the old snapshot or the new one.
+
+Each worker process holds its own copy, but the version lives in the shared
+catalog cache. For that to work across workers, set LITTLELEMON_CACHE_DIR, as
+for the cached catalog lists. With the default per-process cache, a worker
+sees its own writes at once and other workers' writes only when its version
+expires (LITTLELEMON_LOCAL_CATALOG_VERSION_TTL, 5 s; see catalog.py).
+
+Memory: a record costs about 300 bytes with its values and both index
+entries, plus about 50 bytes and the title's length for the title string.
+That comes to roughly 4 MB at the default cap of
+LITTLELEMON_MENU_SNAPSHOT_MAX_ITEMS = 10000 items. A menu larger than the cap
+is not snapshotted, and callers fall back to the database.
+"""
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+from .catalog import get_catalog_version
+from .models import MenuItem
+
+RECORD_FIELDS = ('id', 'title', 'price', 'featured', 'category', 'item_of_the_day')
+
+
+class MenuRecord:
+    """
+    A read-only menu item.
+
+    Attribute names match MenuItemSerializer's fields, and row[column] works, so
+    fastpath.render_rows can render records directly. `pk` and `price` let a
+    record stand in for a MenuItem when building cart rows.
+    """
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, values):
+        for name, value in zip(RECORD_FIELDS, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MenuRecord is read-only.")
+
+    def __delattr__(self, name):
+        raise AttributeError("MenuRecord is read-only.")
+
+    def __getitem__(self, column):
+        return getattr(self, column)
+
+    def __repr__(self):
+        return f'<MenuRecord {self.id}: {self.title}>'
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class MenuSnapshot:
+    __slots__ = ('version', 'by_id', 'by_title', 'item_of_the_day')
+
+    def __init__(self, version, records):
+        by_title = {}
+        item_of_the_day = None
+        for record in records:
+            by_title.setdefault(record.title, record)  # records come in id order: the oldest item wins a title
+            if record.item_of_the_day:
+                item_of_the_day = record
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'by_id', {record.id: record for record in records})
+        object.__setattr__(self, 'by_title', by_title)
+        object.__setattr__(self, 'item_of_the_day', item_of_the_day)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MenuSnapshot is read-only.")
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+def snapshot_max_items():
+    return getattr(settings, 'LITTLELEMON_MENU_SNAPSHOT_MAX_ITEMS', 10000)
+
+
+def snapshot_query():
+    # Always from the primary: a lagging replica would pin stale rows to the new version.
+    return MenuItem.objects.using(router.db_for_write(MenuItem)).order_by('id').values_list(*RECORD_FIELDS)[:snapshot_max_items() + 1]
+
+
+def build_snapshot(version, rows):
+    """Return the snapshot for `rows`, or None if the menu is over the size cap."""
+    if len(rows) > snapshot_max_items():
+        return None
+    return MenuSnapshot(version, [MenuRecord(row) for row in rows])
+
+
+# (catalog version, MenuSnapshot or None); replaced whole, never mutated.
+_current = (None, None)
+_rebuild_lock = threading.Lock()
+
+
+def menu_snapshot():
+    """Return the snapshot for the current catalog version, or None when the menu is too large to hold."""
+    global _current
+    # The version is read before the rows, so a write that lands during the
+    # rebuild is picked up by the next version check.
+    version, _ = get_catalog_version()
+    current_version, snapshot = _current
+    if current_version == version:
+        return snapshot
+    with _rebuild_lock:
+        if _current[0] != version:
+            _current = (version, build_snapshot(version, list(snapshot_query())))
+        return _current[1]
+
+
+async def amenu_snapshot():
+    global _current
+    version, _ = await sync_to_async(get_catalog_version)()
+    current_version, snapshot = _current
+    if current_version == version:
+        return snapshot
+    snapshot = build_snapshot(version, [row async for row in snapshot_query()])
+    _current = (version, snapshot)
+    return snapshot
@@ -0,0 +1,132 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+Each worker process keeps its own registry; scrape every worker (or sum them
+in Prometheus) to get totals for a multi-process deployment.
+"""
+import bisect
+import threading
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+JOB_WAIT_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{format_labels(labels, le=bound)}}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{format_labels(labels)}}} {total}')
+            lines.append(f'{self.name}_count{{{format_labels(labels)}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def inc(self, labels, value=1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{format_labels(labels)}}} {value}')
+        return lines
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + [(key, value) for key, value in extra.items()]
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in pairs
+    )
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter('littlelemon_requests_total', 'Requests by route, method and status.')
+        self.latency = Histogram('littlelemon_request_duration_seconds', 'Wall time per request.', LATENCY_BUCKETS)
+        self.db_time = Histogram('littlelemon_db_duration_seconds', 'Database time per request.', LATENCY_BUCKETS)
+        self.queries = Histogram('littlelemon_db_queries', 'Queries per request.', QUERY_BUCKETS)
+        self.duplicates = Counter(
+            'littlelemon_db_duplicate_queries_total',
+            'Queries whose SQL repeated earlier SQL in the same request (N+1 suspects).'
+        )
+
+    def record(self, route, method, status_code, duration, db_duration=None, query_count=0, duplicate_count=0):
+        """Record a request; `db_duration` is None when its queries weren't counted."""
+        labels = (('route', route), ('method', method))
+        with self.lock:
+            self.requests.inc(labels + (('status', status_code),))
+            self.latency.observe(labels, duration)
+            if db_duration is None:
+                return
+            self.db_time.observe(labels, db_duration)
+            self.queries.observe(labels, query_count)
+            if duplicate_count:
+                self.duplicates.inc(labels, duplicate_count)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.db_time, self.queries, self.duplicates):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class JobRegistry:
+    """Job counts and timings for one `run_jobs` worker; see its --metrics-file."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = Counter('littlelemon_jobs_total', 'Jobs run by type and outcome.')
+        self.wait = Histogram('littlelemon_job_wait_seconds', 'Time from enqueue to the start of the run.', JOB_WAIT_BUCKETS)
+        self.duration = Histogram('littlelemon_job_duration_seconds', 'Run time per job.', LATENCY_BUCKETS)
+
+    def record(self, job_type, outcome, waited, duration):
+        labels = (('type', job_type),)
+        with self.lock:
+            self.jobs.inc(labels + (('outcome', outcome),))
+            self.wait.observe(labels, waited)
+            self.duration.observe(labels, duration)
+
+    def render(self):
+        with self.lock:
+            lines = [line for metric in (self.jobs, self.wait, self.duration) for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    # Scrapers send LITTLELEMON_METRICS_TOKEN; without one set, only logged-in staff may look.
+    token = getattr(settings, 'LITTLELEMON_METRICS_TOKEN', None)
+    if token:
+        allowed = request.headers.get('Authorization') == f'Bearer {token}'
+    else:
+        allowed = getattr(getattr(request, 'user', None), 'is_staff', False)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
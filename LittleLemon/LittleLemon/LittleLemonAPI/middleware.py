@@ -0,0 +1,172 @@
+import cProfile
+import random
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+from .metrics import registry
+from .routers import REPLICA_ROUTES, replica_reads
+
+# cProfile can only be active once per interpreter on newer Pythons.
+_profiler_lock = threading.Lock()
+
+
+class QueryRecorder:
+    """execute_wrapper that times every query and spots repeated SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.seen = set()
+        self.duplicates = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            if sql in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(sql)
+
+
+class InstrumentationMiddleware:
+    """
+    Record wall time, DB time, query count and duplicate queries per route.
+
+    Results go to the /metrics registry and to a Server-Timing header. When
+    LITTLELEMON_PROFILE_THRESHOLD_MS is set, a sampled share of requests
+    (LITTLELEMON_PROFILE_SAMPLE_RATE) runs under cProfile and the profile is
+    written to LITTLELEMON_PROFILE_DIR if the request crossed the threshold.
+    Only the synchronous ORM is counted; under ASGI the middleware runs async,
+    so async views (long polls, event streams) do not pin a thread, and their
+    requests report wall time only: their queries run on other threads'
+    connections, out of reach of an execute_wrapper installed here, so no DB
+    metrics or Server-Timing db entry are published for them.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.profile_threshold = getattr(settings, 'LITTLELEMON_PROFILE_THRESHOLD_MS', None)
+        self.profile_sample_rate = getattr(settings, 'LITTLELEMON_PROFILE_SAMPLE_RATE', 1.0)
+        self.profile_dir = Path(getattr(settings, 'LITTLELEMON_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        profiler = None
+        if self.profile_threshold is not None and random.random() < self.profile_sample_rate:
+            if _profiler_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    _profiler_lock.release()
+        duration = time.perf_counter() - start
+        self.record(request, response, duration, recorder)
+
+        if profiler and duration * 1000 >= self.profile_threshold:
+            self.dump_profile(profiler, self.route(request), request.method)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def route(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return (match.url_name or match.view_name) if match else 'unmatched'
+
+    def record(self, request, response, duration, recorder=None):
+        route = self.route(request)
+        if recorder is None:
+            registry.record(route, request.method, response.status_code, duration)
+            response['Server-Timing'] = f'total;dur={duration * 1000:.1f}'
+            return
+        registry.record(
+            route, request.method, response.status_code,
+            duration, recorder.duration, recorder.count, recorder.duplicates
+        )
+        response['Server-Timing'] = (
+            f'total;dur={duration * 1000:.1f}, '
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries, {recorder.duplicates} duplicate"'
+        )
+
+    def dump_profile(self, profiler, route, method):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f'{route}-{method}-{time.strftime("%Y%m%d-%H%M%S")}-{random.randrange(10**6):06d}.prof'
+        profiler.dump_stats(path)
+
+
+def reads_from_replica(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    return match.url_name in REPLICA_ROUTES
+
+
+class ReadReplicaMiddleware:
+    """Route the reads of read-only endpoints to LITTLELEMON_READ_REPLICA; unused without one."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'LITTLELEMON_READ_REPLICA', None):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not reads_from_replica(request):
+            return self.get_response(request)
+        with replica_reads():
+            return self.stream_from_replica(self.get_response(request))
+
+    async def __acall__(self, request):
+        if not reads_from_replica(request):
+            return await self.get_response(request)
+        with replica_reads():
+            return self.stream_from_replica(await self.get_response(request))
+
+    def stream_from_replica(self, response):
+        # Streamed bodies (the order export) run their queries after the view returns.
+        if response.streaming and not response.is_async:
+            response.streaming_content = replica_stream(response.streaming_content)
+        return response
+
+
+def replica_stream(chunks):
+    with replica_reads():
+        yield from chunks
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+def keep_latest_item_of_the_day(apps, schema_editor):
+    # The old switch could leave several rows flagged; keep only the newest one.
+    MenuItem = apps.get_model('LittleLemonAPI', 'MenuItem')
+    latest = MenuItem.objects.filter(item_of_the_day=True).order_by('-id').first()
+    if latest is not None:
+        MenuItem.objects.filter(item_of_the_day=True).exclude(pk=latest.pk).update(item_of_the_day=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0002_menuitem_item_of_the_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_item_of_the_day, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='menuitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('item_of_the_day', True)), fields=('item_of_the_day',), name='single_item_of_the_day'),
+        ),
+    ]
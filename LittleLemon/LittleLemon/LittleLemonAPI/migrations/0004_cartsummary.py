@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_cart_summaries(apps, schema_editor):
+    Cart = apps.get_model('LittleLemonAPI', 'Cart')
+    CartSummary = apps.get_model('LittleLemonAPI', 'CartSummary')
+    totals = Cart.objects.values('user_id').annotate(item_count=Sum('quantity'), subtotal=Sum('price'))
+    CartSummary.objects.bulk_create([
+        CartSummary(user_id=row['user_id'], item_count=row['item_count'], subtotal=row['subtotal'])
+        for row in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0003_single_item_of_the_day'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cart_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('item_count', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('last_modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_cart_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases fall back to ORM lookups in search.py.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS littlelemon_menuitem_fts USING fts5("
+        "title, category, price UNINDEXED, featured UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO littlelemon_menuitem_fts (rowid, title, category, price, featured) "
+        "SELECT m.id, m.title, c.title, m.price, m.featured "
+        "FROM LittleLemonAPI_menuitem m JOIN LittleLemonAPI_category c ON c.id = m.category_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS littlelemon_menuitem_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0004_cartsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
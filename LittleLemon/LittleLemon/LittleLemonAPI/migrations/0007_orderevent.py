@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0006_analytics_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=16)),
+                ('status', models.BooleanField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('delivery_crew', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='LittleLemonAPI.order')),
+                ('previous_crew', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='LittleLemon_user_id_e1761e_idx'), models.Index(fields=['delivery_crew', 'id'], name='LittleLemon_deliver_9eef2d_idx'), models.Index(fields=['previous_crew', 'id'], name='LittleLemon_previou_de3ab5_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -12,6 +13,16 @@ class MenuItem(models.Model):
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
     item_of_the_day = models.BooleanField(default=False, db_index=True)
 
+    class Meta:
+        constraints = [
+            # At most one item of the day; the partial index also makes the lookup O(1).
+            models.UniqueConstraint(
+                fields=['item_of_the_day'],
+                condition=models.Q(item_of_the_day=True),
+                name='single_item_of_the_day',
+            ),
+        ]
+
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
@@ -22,6 +33,15 @@ class Cart(models.Model):
     class Meta:
         unique_together = ('menuitem', 'user')
 
+class CartSummary(models.Model):
+    # Running totals for a user's cart, kept in step with every Cart write.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='cart_summary')
+    item_count = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_modified = models.DateTimeField(auto_now=True)
+    # Bumped by every cart write; see cart.lock_cart.
+    version = models.PositiveIntegerField(default=0)
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     delivery_crew = models.ForeignKey(User, on_delete=models.CASCADE, related_name='delivery_crew', null=True)
@@ -37,4 +57,116 @@ class Order_Item(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2)
 
     class Meta:
-        unique_together = ('order', 'menuitem')
\ No newline at end of file
+        unique_together = ('order', 'menuitem')
+
+class OrderEvent(models.Model):
+    # Append-only change feed; the id is the cursor clients resume from. Events
+    # outlive their order, so the order link carries no database constraint.
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+    id = models.BigAutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    kind = models.CharField(max_length=16)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    delivery_crew = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    previous_crew = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    status = models.BooleanField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['delivery_crew', 'id']),
+            models.Index(fields=['previous_crew', 'id']),
+        ]
+
+# Daily sales rollups, maintained incrementally by analytics.py at checkout and
+# on order updates. `manage.py backfill_analytics` rebuilds them from orders.
+
+class DailySales(models.Model):
+    date = models.DateField(primary_key=True)
+    order_count = models.IntegerField(default=0)
+    delivered_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+class DailyCrewSales(models.Model):
+    date = models.DateField()
+    crew = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    order_count = models.IntegerField(default=0)
+    delivered_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'crew')
+
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'menuitem')
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'category')
+
+# Cold storage for delivered orders, filled by archive.py. Rows keep their
+# original ids and are read-only; only the primary keys and the lookups that
+# cascades and retrieval by order need are indexed. History outlives menu
+# items, so that link carries no database constraint.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    delivery_crew = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True, db_index=False)
+    status = models.BooleanField()
+    total = models.DecimalField(max_digits=6, decimal_places=2)
+    date = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE)
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    quantity = models.SmallIntegerField()
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+
+class IdempotencyKey(models.Model):
+    # The stored response to a POST sent with an Idempotency-Key header, replayed
+    # to retries until it expires; see idempotency.py.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+class Job(models.Model):
+    # A unit of background work, run by `manage.py run_jobs`; see jobs.py.
+    # `run_at` is when the job is next due: on claim it moves to the end of
+    # the visibility timeout, on failure to the end of the retry backoff.
+    type = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    lease = models.CharField(max_length=32, blank=True)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['failed', 'run_at'])]
@@ -0,0 +1,63 @@
+import base64
+from datetime import date
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class OrderKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (date, id), newest first.
+
+    The cursor holds the last (date, id) seen, so every page is a bounded index
+    range scan instead of an OFFSET that grows with the page number.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE or 5
+
+    def encode_cursor(self, order):
+        # Pages hold Order instances or `.values()` rows with date and id
+        if isinstance(order, dict):
+            order_date, pk = order['date'], order['id']
+        else:
+            order_date, pk = order.date, order.pk
+        raw = f"{order_date.isoformat()}:{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, value):
+        try:
+            raw = base64.urlsafe_b64decode(value.encode()).decode()
+            order_date, pk = raw.split(':')
+            return date.fromisoformat(order_date), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by('-date', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            last_date, last_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(date__lt=last_date) | Q(date=last_date, id__lt=last_id))
+
+        # Fetch one extra row to know whether another page exists.
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,16 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from .menu_import import csv_rows
+
+
+class CSVParser(BaseParser):
+    """Parse a text/csv body into a list of dicts keyed by the header row."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            return csv_rows(stream.read().decode(encoding))
+        except UnicodeDecodeError as exc:
+            raise ParseError(f"CSV parse error - {exc}")
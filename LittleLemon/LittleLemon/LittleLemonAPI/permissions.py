@@ -1,9 +1,10 @@
 from rest_framework.permissions import BasePermission
+from .roles import is_manager, is_delivery_crew
 
 class IsManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Manager').exists()
+        return is_manager(request.user)
 
 class IsDeliveryCrew(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='DeliveryCrew').exists()
\ No newline at end of file
+        return is_delivery_crew(request.user)
\ No newline at end of file
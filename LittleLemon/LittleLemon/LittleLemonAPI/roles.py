@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'DeliveryCrew'
+
+ROLE_CACHE_TIMEOUT = getattr(settings, 'LITTLELEMON_ROLE_CACHE_TIMEOUT', 300)
+
+
+def role_cache_timeout():
+    """
+    How long cached roles live. The group membership signals only clear the
+    cache of the process that made the change, so with a per-process cache a
+    user removed from a group keeps its rights in the other workers until
+    their entry expires: LITTLELEMON_LOCAL_ROLE_CACHE_TIMEOUT seconds (5)
+    rather than ROLE_CACHE_TIMEOUT, as for catalog.catalog_version_timeout().
+    """
+    if isinstance(caches['default'], LocMemCache):
+        return getattr(settings, 'LITTLELEMON_LOCAL_ROLE_CACHE_TIMEOUT', 5)
+    return ROLE_CACHE_TIMEOUT
+
+
+def role_cache_key(user_id):
+    return f'littlelemon:roles:{user_id}'
+
+
+def get_roles(user):
+    """
+    Return the set of group names for a user.
+
+    The result is memoized on the user object for the rest of the request and
+    stored in the cache between requests; group membership signals clear it.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_littlelemon_roles', None)
+    if roles is None:
+        key = role_cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(key, roles, role_cache_timeout())
+        user._littlelemon_roles = roles
+    return roles
+
+
+def is_manager(user):
+    return MANAGER in get_roles(user)
+
+
+def is_delivery_crew(user):
+    return DELIVERY_CREW in get_roles(user)
+
+
+def invalidate_roles(user_ids):
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids])
+
+
+async def aget_roles(user):
+    """Async counterpart of get_roles() for the ASGI read views."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_littlelemon_roles', None)
+    if roles is None:
+        key = role_cache_key(user.pk)
+        roles = await cache.aget(key)
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            await cache.aset(key, roles, role_cache_timeout())
+        user._littlelemon_roles = roles
+    return roles
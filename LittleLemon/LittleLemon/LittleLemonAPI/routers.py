@@ -0,0 +1,60 @@
+"""
+Read replica routing.
+
+Only requests that ReadReplicaMiddleware marks (GET/HEAD on REPLICA_ROUTES)
+read from the replica; everything else, and every write, uses 'default'. A
+replica lags the primary, so only endpoints that tolerate slightly stale data
+are listed: menu and category details, search, reports and the order export.
+Carts, orders and the change feed always read their own writes.
+
+The menu and category lists are left out on purpose. Their responses are
+cached under the catalog version (catalog.py) until the next catalog write,
+so rows read from a replica that hadn't caught up with that write would be
+served for as long as the version lasts, not merely until the replica catches
+up. The primary only sees the cache misses.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ROUTES = frozenset({
+    'menuitem-detail', 'menuitem-search', 'menuitem-typeahead', 'item-of-the-day',
+    'category-detail',
+    'order-export',
+    'report-daily-revenue', 'report-delivery-crew', 'report-top-items', 'report-category-mix',
+})
+
+_replica_reads = ContextVar('littlelemon_replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Send reads in this block (thread or task) to the replica, if one is configured."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+        replica = getattr(settings, 'LITTLELEMON_READ_REPLICA', None)
+        # A test run mirrors the replica onto the primary's test database.
+        if replica and connections[replica].settings_dict['NAME'] != connections['default'].settings_dict['NAME']:
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary.
+        return db == 'default'
@@ -0,0 +1,186 @@
+"""
+Full-text and faceted search over menu items.
+
+On SQLite the index is the FTS5 table created in migration 0005, holding one
+row per MenuItem (rowid = MenuItem.id) with its title, category title, price
+and featured flag. Signals keep it in sync; `manage.py rebuild_search_index`
+rebuilds it from scratch. Other databases fall back to ORM icontains lookups.
+"""
+import re
+from django.db import connection
+from django.db.models import Q, Count, Case, When, Value, CharField
+from .models import MenuItem, Category
+
+FTS_TABLE = 'littlelemon_menuitem_fts'
+
+# Upper bounds of the price facet buckets; the last bucket is open-ended.
+PRICE_BUCKETS = (5, 10, 20, 50)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(text, prefix=True):
+    """Turn free user text into a safe FTS5 query: every word must match, the last as a prefix."""
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_menu_items(items):
+    if not fts_available() or not items:
+        return
+    rows = [(item.pk, item.title, item.category.title, str(item.price), int(item.featured)) for item in items]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, category, price, featured) VALUES (%s, %s, %s, %s, %s)',
+            rows
+        )
+
+
+def remove_menu_items(ids):
+    if not fts_available() or not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+
+def rebuild_index():
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, category, price, featured) '
+            f'SELECT m.id, m.title, c.title, m.price, m.featured '
+            f'FROM {MenuItem._meta.db_table} m JOIN {Category._meta.db_table} c ON c.id = m.category_id'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def price_bucket_label(index):
+    low = PRICE_BUCKETS[index - 1] if index else 0
+    if index == len(PRICE_BUCKETS):
+        return f'{low}+'
+    return f'{low}-{PRICE_BUCKETS[index]}'
+
+
+def filter_clauses(price_min=None, price_max=None, featured=None):
+    clauses, params = [], []
+    if price_min is not None:
+        clauses.append('CAST(price AS REAL) >= %s')
+        params.append(float(price_min))
+    if price_max is not None:
+        clauses.append('CAST(price AS REAL) <= %s')
+        params.append(float(price_max))
+    if featured is not None:
+        clauses.append('featured = %s')
+        params.append(int(featured))
+    return clauses, params
+
+
+def search_menu(text, price_min=None, price_max=None, featured=None, limit=20):
+    """
+    Return (ids ranked by relevance, facets) for items matching `text`.
+
+    Facet counts apply every filter except their own, so a client can show how
+    many results each other choice would give.
+    """
+    if not fts_available():
+        return orm_search_menu(text, price_min, price_max, featured, limit)
+
+    expression = match_expression(text)
+    if expression is None:
+        return [], empty_facets()
+
+    def run(filters, select, tail='', extra=()):
+        clauses, params = filter_clauses(**filters)
+        where = ' AND '.join([f'{FTS_TABLE} MATCH %s'] + clauses)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {select} FROM {FTS_TABLE} WHERE {where} {tail}', [expression] + params + list(extra))
+            return cursor.fetchall()
+
+    all_filters = {'price_min': price_min, 'price_max': price_max, 'featured': featured}
+    # Title hits weigh more than category hits.
+    ranked = run(all_filters, 'rowid', f'ORDER BY bm25({FTS_TABLE}, 10.0, 2.0) LIMIT %s', [limit])
+    ids = [row[0] for row in ranked]
+
+    bucket_case = ' '.join(
+        f'WHEN CAST(price AS REAL) < {bound} THEN {index}' for index, bound in enumerate(PRICE_BUCKETS)
+    )
+    price_rows = run(
+        {'featured': featured},
+        f'CASE {bucket_case} ELSE {len(PRICE_BUCKETS)} END AS bucket, count(*)',
+        'GROUP BY bucket'
+    )
+    featured_rows = run({'price_min': price_min, 'price_max': price_max}, 'featured, count(*)', 'GROUP BY featured')
+
+    facets = empty_facets()
+    for bucket, count in price_rows:
+        facets['price'][price_bucket_label(bucket)] = count
+    for flag, count in featured_rows:
+        facets['featured']['true' if int(flag) else 'false'] = count
+    return ids, facets
+
+
+def typeahead(text, limit=10):
+    """Return up to `limit` (id, title) pairs whose title words start with the typed words."""
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    if not fts_available():
+        return list(MenuItem.objects.filter(title__istartswith=text.strip()).values_list('id', 'title')[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, title FROM {FTS_TABLE} WHERE title MATCH %s ORDER BY rank LIMIT %s',
+            [expression, limit]
+        )
+        return cursor.fetchall()
+
+
+def empty_facets():
+    return {
+        'price': {price_bucket_label(index): 0 for index in range(len(PRICE_BUCKETS) + 1)},
+        'featured': {'true': 0, 'false': 0},
+    }
+
+
+def orm_search_menu(text, price_min, price_max, featured, limit):
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return [], empty_facets()
+    items = MenuItem.objects.all()
+    for token in tokens:
+        items = items.filter(Q(title__icontains=token) | Q(category__title__icontains=token))
+
+    def filtered(queryset, skip):
+        if price_min is not None and skip != 'price':
+            queryset = queryset.filter(price__gte=price_min)
+        if price_max is not None and skip != 'price':
+            queryset = queryset.filter(price__lte=price_max)
+        if featured is not None and skip != 'featured':
+            queryset = queryset.filter(featured=featured)
+        return queryset
+
+    ids = list(filtered(items, None).order_by('id').values_list('id', flat=True)[:limit])
+    facets = empty_facets()
+    bucket = Case(
+        *[When(price__lt=bound, then=Value(price_bucket_label(index))) for index, bound in enumerate(PRICE_BUCKETS)],
+        default=Value(price_bucket_label(len(PRICE_BUCKETS))),
+        output_field=CharField(),
+    )
+    for row in filtered(items, 'price').annotate(bucket=bucket).values('bucket').annotate(count=Count('id')):
+        facets['price'][row['bucket']] = row['count']
+    for row in filtered(items, 'featured').values('featured').annotate(count=Count('id')):
+        facets['featured']['true' if row['featured'] else 'false'] = row['count']
+    return ids, facets
@@ -1,7 +1,11 @@
 from rest_framework import serializers
-from .models import MenuItem, Category, Cart, Order, Order_Item
+from .menu_snapshot import menu_snapshot
+from .models import MenuItem, Category, Cart, CartSummary, Order, Order_Item
 from django.contrib.auth.models import User, Group
 
+# The largest value of a 64-bit primary key; SQLite overflows on anything bigger.
+MAX_ID = 2 ** 63 - 1
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -22,20 +26,38 @@ class CartSerializer(serializers.ModelSerializer):
     def to_internal_value(self, data):
         # Convert string title to MenuItem PK
         if 'menuitem' in data and isinstance(data['menuitem'], str):
-            try:
-                item = MenuItem.objects.get(title=data['menuitem'])
-                data['menuitem'] = item.pk
-            except MenuItem.DoesNotExist:
+            snapshot = menu_snapshot()
+            if snapshot is not None:
+                item = snapshot.by_title.get(data['menuitem'])
+            else:
+                item = MenuItem.objects.filter(title=data['menuitem']).order_by('id').first()
+            if item is None:
                 raise serializers.ValidationError({"menuitem": "Menu item not found by title."})
+            data['menuitem'] = item.pk
         return super().to_internal_value(data)
 
+class CartBatchItemSerializer(serializers.Serializer):
+    menuitem = serializers.CharField()  # id or title
+    quantity = serializers.IntegerField(min_value=1, max_value=32767)
+
+    def validate_menuitem(self, value):
+        # Digits are read as an id (see cart.resolve_menu_items), so they must make one.
+        if value.isdigit() and (not value.isdecimal() or int(value) > MAX_ID):
+            raise serializers.ValidationError("Expected a menu item id or title.")
+        return value
+
+class CartSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CartSummary
+        fields = ['item_count', 'subtotal', 'last_modified']
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order_Item
         fields = '__all__'
 
 class OrderSerializer(serializers.ModelSerializer):
-    orderitem_set = OrderItemSerializer(many=True, read_only=True)
+    orderitem_set = OrderItemSerializer(many=True, read_only=True, source='order_item_set')
     
     class Meta:
         model = Order
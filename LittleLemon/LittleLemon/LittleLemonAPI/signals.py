@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User, Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_tokens
+from .cart import cart_writes_are_managed, refresh_cart_summary, subtract_from_cart_summary
+from .catalog import bump_catalog_version
+from .models import Category, MenuItem, Cart
+from .roles import invalidate_roles
+from .search import index_menu_items, remove_menu_items
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # pk_set is empty for clears, so remember who is affected before the rows go.
+        if reverse:
+            instance._littlelemon_cleared = list(instance.user_set.values_list('id', flat=True))
+        else:
+            instance._littlelemon_cleared = [instance.pk]
+        return
+    if action == 'post_clear':
+        invalidate_roles(getattr(instance, '_littlelemon_cleared', []))
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+
+    # group.user_set.add(user) is the reverse side: pk_set holds user ids.
+    if reverse:
+        invalidate_roles(pk_set or [])
+    else:
+        invalidate_roles([instance.pk])
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_roles(instance.user_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Group)
+def group_renamed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_roles(instance.user_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    # Bump after commit so a reader can't cache pre-commit rows under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    # Covers djoser's token logout, which deletes the token row.
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    # Cached tokens carry a copy of the user, so any save (e.g. is_active=False) drops them.
+    if not created:
+        invalidate_tokens(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=Cart)
+def cart_row_saved(sender, instance, **kwargs):
+    if not cart_writes_are_managed():
+        refresh_cart_summary(instance.user_id)
+
+
+@receiver(post_delete, sender=Cart)
+def cart_row_deleted(sender, instance, **kwargs):
+    if not cart_writes_are_managed():
+        subtract_from_cart_summary(instance.user_id, instance.quantity, instance.price)
+
+
+@receiver(post_save, sender=MenuItem)
+def menu_item_indexed(sender, instance, **kwargs):
+    index_menu_items([instance])
+
+
+@receiver(post_delete, sender=MenuItem)
+def menu_item_unindexed(sender, instance, **kwargs):
+    remove_menu_items([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_reindexed(sender, instance, created, **kwargs):
+    # The index stores the category title on every item row.
+    if not created:
+        index_menu_items(list(instance.menuitem_set.select_related('category')))
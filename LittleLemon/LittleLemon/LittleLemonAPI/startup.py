@@ -0,0 +1,81 @@
+"""
+Worker start-up.
+
+wsgi.py and asgi.py call these around building the application:
+
+- `skip_unused_imports()` runs before Django is set up, and only in the
+  API-only mode. It reads LITTLELEMON_API_ONLY from the environment, as
+  settings.py does, because touching settings here would load them before
+  the server has chosen its settings module. Management commands don't call
+  it: shell, migrate and the tests may well import these packages.
+  DRF imports several optional
+  packages whenever they are installed:
+  - requests (about 60 ms with urllib3 and charset_normalizer), for its test
+    client;
+  - yaml, uritemplate and inflection, for schema generation;
+  - markdown and pygments, for the browsable API.
+  The API never uses any of them, so they are marked as missing and DRF
+  falls back as it does when they are not installed.
+
+- `warm_up()` runs once the application is built (LITTLELEMON_WARM_UP, on by
+  default). It fills the caches that are otherwise filled by the first
+  requests of each worker:
+  - the URL resolver, with every route compiled;
+  - DRF's and djoser's lazily imported classes;
+  - the field maps of every model;
+  - the field layout of every serializer.
+  It makes no queries. Under a preloading server (`gunicorn --preload
+  LittleLemon.wsgi`) it runs in the master, and each forked worker starts
+  with the caches already filled. It ends with gc.freeze(), which moves
+  everything built so far out of the collector's reach; otherwise a
+  collection in a worker would write to those objects and copy the pages
+  they share with the master.
+"""
+import gc
+import os
+import sys
+
+DRF_OPTIONAL_IMPORTS = ('requests', 'yaml', 'uritemplate', 'inflection', 'markdown', 'pygments')
+
+
+def skip_unused_imports():
+    if os.environ.get('LITTLELEMON_API_ONLY') != '1':
+        return
+    for name in DRF_OPTIONAL_IMPORTS:
+        # An import of a module set to None in sys.modules raises ImportError.
+        sys.modules.setdefault(name, None)
+
+
+def warm_up(freeze=True):
+    from django.apps import apps
+    from django.conf import settings
+    from django.urls import get_resolver
+    from djoser.conf import settings as djoser_settings
+    from rest_framework import serializers as drf_serializers
+    from rest_framework.settings import IMPORT_STRINGS, api_settings
+    from . import serializers
+    from .fastpath import serializer_layout
+
+    if not getattr(settings, 'LITTLELEMON_WARM_UP', True):
+        return
+
+    # Imports every urlconf and view module and compiles every route.
+    get_resolver().reverse_dict
+
+    for name in IMPORT_STRINGS:
+        getattr(api_settings, name)
+    for name in djoser_settings.SERIALIZERS:
+        # Only djoser.social.urls, which aren't routed, use provider_auth.
+        if name != 'provider_auth':
+            getattr(djoser_settings.SERIALIZERS, name)
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    for serializer_class in vars(serializers).values():
+        if (isinstance(serializer_class, type) and issubclass(serializer_class, drf_serializers.ModelSerializer)
+                and serializer_class.__module__ == serializers.__name__):
+            serializer_layout(serializer_class)
+
+    if freeze:
+        gc.freeze()
@@ -1,3 +1,1262 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from decimal import Decimal
+from unittest import mock, skipIf
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, AsyncRequestFactory, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from . import async_views
+from . import analytics, assignment, changefeed, export
+from .archive import archive_orders
+from .assignment import assign_orders
+from .authentication import LRUCache, token_lru
+from .cart import resolve_menu_items, upsert_cart_items
+from .catalog import bump_catalog_version, get_catalog_version
+from .checkout import checkout_cart
+from .jobs import claim_jobs, enqueue, run_due_jobs, run_job, JobStats
+from .fastpath import serializer_layout
+from .menu_snapshot import menu_snapshot
+from .middleware import InstrumentationMiddleware, QueryRecorder, reads_from_replica
+from .renderers import msgpack
+from .roles import is_manager
+from .routers import ReadReplicaRouter, replica_reads
+from .search import rebuild_index
+from .startup import DRF_OPTIONAL_IMPORTS, skip_unused_imports, warm_up
+from .models import (
+    Category, MenuItem, Cart, CartSummary, Order, Order_Item, OrderEvent, ArchivedOrder, ArchivedOrderItem,
+    IdempotencyKey, Job, DailySales, DailyCrewSales, DailyMenuItemSales, DailyCategorySales
+)
+from .serializers import MenuItemSerializer, OrderSerializer
+from .throttling import SQLiteCounters, ScopedRateThrottle, UserRateThrottle
+from .management.commands import benchmark
+from .views import CartView, ItemOfTheDayView
 
-# Create your tests here.
+
+def real_queries(ctx):
+    return [q for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+
+
+class LittleLemonTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(slug='mains', title='Mains')
+        cls.items = MenuItem.objects.bulk_create([
+            MenuItem(title=f'Dish {i}', price=Decimal('5.00'), featured=False, category=cls.category)
+            for i in range(40)
+        ])
+        cls.manager_group = Group.objects.create(name='Manager')
+        cls.crew_group = Group.objects.create(name='DeliveryCrew')
+        cls.customer = User.objects.create_user(username='customer', password='pass')
+        cls.manager = User.objects.create_user(username='manager', password='pass')
+        cls.manager.groups.add(cls.manager_group)
+        cls.crew = User.objects.create_user(username='crew', password='pass')
+        cls.crew.groups.add(cls.crew_group)
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def fill_cart(self, user, size):
+        upsert_cart_items(user, {item: 2 for item in self.items[:size]})
+
+
+class CheckoutTests(LittleLemonTestCase):
+    def test_checkout_moves_cart_into_order(self):
+        self.fill_cart(self.customer, 3)
+        response = self.client_for(self.customer).post('/api/cart/orders', {'date': '2025-04-01'})
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['order_id'])
+        self.assertEqual(order.total, Decimal('30.00'))
+        self.assertEqual(Order_Item.objects.filter(order=order).count(), 3)
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+
+    def test_order_total_comes_from_the_summary(self):
+        self.fill_cart(self.customer, 2)
+        self.assertEqual(checkout_cart(self.customer, date(2025, 4, 1)).total, Decimal('20.00'))
+        self.fill_cart(self.customer, 2)
+        CartSummary.objects.filter(user=self.customer).update(subtotal=Decimal('1.00'))
+        with self.assertNoLogs('LittleLemonAPI.checkout', 'ERROR'):
+            self.assertEqual(checkout_cart(self.customer, date(2025, 4, 2)).total, Decimal('1.00'))
+
+    @override_settings(DEBUG=True)
+    def test_drifted_summary_is_logged_in_debug(self):
+        self.fill_cart(self.customer, 2)
+        CartSummary.objects.filter(user=self.customer).update(subtotal=Decimal('1.00'))
+        with self.assertLogs('LittleLemonAPI.checkout', 'ERROR') as logs:
+            checkout_cart(self.customer, date(2025, 4, 2))
+        self.assertIn('says 1.00, its rows add up to 20.00', logs.output[0])
+
+    def test_checkout_empty_cart(self):
+        response = self.client_for(self.customer).post('/api/cart/orders')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_query_count_does_not_grow_with_cart(self):
+        counts = []
+        for day, size in ((1, 1), (2, 40)):
+            self.fill_cart(self.customer, size)
+            client = self.client_for(self.customer)
+            # A fresh day each time, so both checkouts create their rollup rows
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.post('/api/cart/orders', {'date': f'2025-05-0{day}'})
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class IdempotencyTests(LittleLemonTestCase):
+    def checkout(self, key, **data):
+        return self.client_for(self.customer).post('/api/cart/orders', data, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_original_order(self):
+        self.fill_cart(self.customer, 3)
+        first = self.checkout('k1')
+        self.assertEqual(first.status_code, 201)
+        self.fill_cart(self.customer, 1)
+        retry = self.checkout('k1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), 1)
+        # The replay left the items added since in the cart
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 1)
+
+        second = self.checkout('k2')
+        self.assertNotEqual(second.data['order_id'], first.data['order_id'])
+        self.assertFalse(second.has_header('Idempotent-Replayed'))
+
+    def test_key_is_bound_to_the_request_and_the_user(self):
+        self.fill_cart(self.customer, 1)
+        self.checkout('k1', date='2025-01-01')
+        self.assertEqual(self.checkout('k1', date='2025-01-02').status_code, 422)
+        self.assertEqual(self.checkout('x' * 256).status_code, 400)
+        self.fill_cart(self.manager, 1)
+        response = self.client_for(self.manager).post('/api/cart/orders', {'date': '2025-01-01'}, HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.assertEqual(self.checkout('k1').status_code, 400)
+        self.fill_cart(self.customer, 1)
+        self.assertEqual(self.checkout('k1').status_code, 400)  # the stored "Cart is empty." answer
+        IdempotencyKey.objects.update(expires=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.checkout('k1').status_code, 201)
+
+        self.checkout('k2')
+        IdempotencyKey.objects.filter(key='k2').update(expires=timezone.now() - timedelta(seconds=1))
+        out = io.StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 expired', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['k1'])
+
+    def test_cart_writes_bump_the_version(self):
+        self.fill_cart(self.customer, 2)
+        self.fill_cart(self.customer, 1)
+        version = CartSummary.objects.get(user=self.customer).version
+        self.client_for(self.customer).post('/api/cart/orders')
+        summary = CartSummary.objects.get(user=self.customer)
+        self.assertEqual((summary.version, summary.item_count, summary.subtotal), (version + 1, 0, Decimal('0')))
+
+
+@skipIf(connection.vendor != 'sqlite', "The stress test drives SQLite files.")
+class CheckoutStressTests(SimpleTestCase):
+    def test_concurrent_retries_create_no_duplicates_and_lose_no_items(self):
+        # A separate process: the command forks clients against its own scratch database.
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'stress_checkout',
+             '--users', '2', '--clients', '3', '--checkouts', '8', '--items', '30'],
+            capture_output=True, text=True, timeout=300
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('No duplicate orders and no lost items.', result.stdout)
+
+
+class OrderListTests(LittleLemonTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for day in range(1, 13):
+            order = Order.objects.create(
+                user=cls.customer, total=Decimal('10.00'), date=f'2025-03-{day:02d}',
+                status=day % 2 == 0, delivery_crew=cls.crew if day <= 4 else None
+            )
+            Order_Item.objects.bulk_create([
+                Order_Item(order=order, menuitem=item, quantity=1, unit_price=item.price, price=item.price)
+                for item in cls.items[:3]
+            ])
+
+    def collect_pages(self, client, url):
+        ids = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_keyset_pages_cover_every_order_once(self):
+        ids = self.collect_pages(self.client_for(self.manager), '/api/orders')
+        expected = list(Order.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_query_count_is_bounded_per_page(self):
+        client = self.client_for(self.manager)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/orders')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(response.data['results'][0]['orderitem_set']), 3)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_filters(self):
+        client = self.client_for(self.manager)
+        ids = self.collect_pages(client, '/api/orders?status=true&date_from=2025-03-03&date_to=2025-03-08')
+        self.assertEqual(len(ids), 3)
+        ids = self.collect_pages(client, f'/api/orders?delivery_crew={self.crew.pk}')
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(client.get('/api/orders?date_from=yesterday').status_code, 400)
+        for crew in ('²', '1' * 25, '-1'):
+            self.assertEqual(client.get(f'/api/orders?delivery_crew={crew}').status_code, 400, crew)
+
+    def test_delivery_crew_only_sees_assigned_orders(self):
+        ids = self.collect_pages(self.client_for(self.crew), '/api/orders')
+        self.assertEqual(len(ids), 4)
+
+
+class RoleResolutionTests(LittleLemonTestCase):
+    def group_queries(self, ctx):
+        return [q for q in ctx.captured_queries if 'auth_group' in q['sql']]
+
+    def test_roles_are_cached_across_requests(self):
+        self.client_for(self.manager).get('/api/orders')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client_for(User.objects.get(pk=self.manager.pk)).get('/api/orders')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.group_queries(ctx), [])
+
+    def test_membership_change_invalidates_cache(self):
+        admin = User.objects.create_superuser(username='admin', password='pass')
+        customer_client = self.client_for(self.customer)
+        self.assertEqual(customer_client.get('/api/groups/deliverycrew/users').status_code, 403)
+
+        self.client_for(admin).post('/api/groups/manager/users', {'username': 'customer'})
+        customer_client = self.client_for(User.objects.get(pk=self.customer.pk))
+        self.assertEqual(customer_client.get('/api/groups/deliverycrew/users').status_code, 200)
+
+        self.client_for(admin).delete(f'/api/groups/manager/users/{self.customer.pk}')
+        customer_client = self.client_for(User.objects.get(pk=self.customer.pk))
+        self.assertEqual(customer_client.get('/api/groups/deliverycrew/users').status_code, 403)
+
+    def test_removal_in_another_worker_applies_once_the_local_entry_expires(self):
+        self.assertTrue(is_manager(User.objects.get(pk=self.manager.pk)))
+        # Another worker's removal doesn't clear this process's cache...
+        with mock.patch('LittleLemonAPI.signals.invalidate_roles'):
+            self.manager.groups.remove(self.manager_group)
+        self.assertTrue(is_manager(User.objects.get(pk=self.manager.pk)))
+        # ...but the entry only lives a few seconds in a per-process cache.
+        with mock.patch('time.time', return_value=time.time() + 6):
+            self.assertFalse(is_manager(User.objects.get(pk=self.manager.pk)))
+
+    def test_staff_can_view_other_users_order(self):
+        order = Order.objects.create(user=self.customer, total=Decimal('1.00'), date='2025-03-01')
+        self.assertEqual(self.client_for(self.manager).get(f'/api/orders/{order.pk}').status_code, 200)
+        self.assertEqual(self.client_for(self.crew).get(f'/api/orders/{order.pk}').status_code, 200)
+
+
+class CatalogCacheTests(LittleLemonTestCase):
+    def test_menu_list_is_served_from_cache(self):
+        client = self.client_for(self.customer)
+        first = client.get('/api/menu-items?page=2')
+        with CaptureQueriesContext(connection) as ctx:
+            second = client.get('/api/menu-items?page=2')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_catalog_write_invalidates_cache(self):
+        client = self.client_for(self.customer)
+        etag = client.get('/api/categories')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(slug='drinks', title='Drinks')
+        response = client.get('/api/categories', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_conditional_get_returns_not_modified(self):
+        client = self.client_for(self.customer)
+        response = client.get('/api/menu-items')
+        again = client.get('/api/menu-items', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        again = client.get('/api/menu-items', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_item_of_the_day_invalidates_cache(self):
+        client = self.client_for(self.manager)
+        etag = client.get('/api/menu-items')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'/api/menu-items/{self.items[0].pk}/set-item-of-the-day')
+        self.assertNotEqual(client.get('/api/menu-items')['ETag'], etag)
+
+
+class TokenCacheTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        token_lru.clear()
+        self.token = Token.objects.create(user=self.customer)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def token_queries(self, ctx):
+        return [q for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+
+    def test_repeat_requests_skip_token_lookup(self):
+        self.client.get('/api/cart/menu-items')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/cart/menu-items')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.token_queries(ctx), [])
+
+    def test_logout_invalidates_token(self):
+        self.client.get('/api/cart/menu-items')
+        self.assertEqual(self.client.post('/auth/token/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/api/cart/menu-items').status_code, 401)
+
+    def test_deactivation_invalidates_token(self):
+        self.client.get('/api/cart/menu-items')
+        self.customer.is_active = False
+        self.customer.save()
+        self.assertEqual(self.client.get('/api/cart/menu-items').status_code, 401)
+
+    def test_lru_evicts_oldest_entry(self):
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+
+
+class ItemOfTheDayTests(LittleLemonTestCase):
+    def test_switch_only_touches_previous_and_new_item(self):
+        client = self.client_for(self.manager)
+        first, second = self.items[0], self.items[1]
+        client.post(f'/api/menu-items/{first.pk}/set-item-of-the-day')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(f'/api/menu-items/{second.pk}/set-item-of-the-day')
+        self.assertEqual(response.status_code, 200)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all('WHERE' in sql for sql in updates))
+        self.assertEqual(list(MenuItem.objects.filter(item_of_the_day=True)), [second])
+
+    def test_missing_item_leaves_current_item_alone(self):
+        client = self.client_for(self.manager)
+        client.post(f'/api/menu-items/{self.items[0].pk}/set-item-of-the-day')
+        self.assertEqual(client.post('/api/menu-items/999999/set-item-of-the-day').status_code, 404)
+        self.assertTrue(MenuItem.objects.get(pk=self.items[0].pk).item_of_the_day)
+
+    def test_get_item_of_the_day(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get('/api/menu-items/item-of-the-day').status_code, 404)
+        MenuItem.objects.filter(pk=self.items[2].pk).update(item_of_the_day=True)
+        bump_catalog_version()  # queryset updates skip the catalog signals
+        response = client.get('/api/menu-items/item-of-the-day')
+        self.assertEqual(response.data['id'], self.items[2].pk)
+
+
+class CartTests(LittleLemonTestCase):
+    def test_adding_same_item_twice_updates_quantity(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.post('/api/cart/menu-items', {'menuitem': 'Dish 1', 'quantity': 1}).status_code, 201)
+        self.assertEqual(client.post('/api/cart/menu-items', {'menuitem': self.items[1].pk, 'quantity': 3}).status_code, 201)
+        row = Cart.objects.get(user=self.customer)
+        self.assertEqual((row.quantity, row.price), (3, Decimal('15.00')))
+
+    def test_unknown_title_is_not_found(self):
+        response = self.client_for(self.customer).post('/api/cart/menu-items', {'menuitem': 'Nope', 'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_upsert_resolves_in_constant_queries(self):
+        client = self.client_for(self.customer)
+        self.fill_cart(self.customer, 1)
+        rows = [{'menuitem': f'Dish {i}', 'quantity': 2} for i in range(10)]
+        rows += [{'menuitem': str(item.pk), 'quantity': 1} for item in self.items[10:20]]
+        rows.append({'menuitem': 'Dish 0', 'quantity': 4})
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post('/api/cart/menu-items/bulk', {'items': rows}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+        # menu lookup, summary lock, replaced totals, upsert, summary update, cart read
+        self.assertLessEqual(len(real_queries(ctx)), 6)
+        self.assertEqual(Cart.objects.get(user=self.customer, menuitem=self.items[0]).quantity, 4)
+
+    def test_bulk_rejects_unknown_items_without_writing(self):
+        rows = [{'menuitem': 'Dish 0', 'quantity': 1}, {'menuitem': 'Nope', 'quantity': 1}]
+        response = self.client_for(self.customer).post('/api/cart/menu-items/bulk', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['menuitems'], ['Nope'])
+        self.assertFalse(Cart.objects.exists())
+
+    def test_malformed_ids_are_rejected(self):
+        client = self.client_for(self.customer)
+        for ref in ('²', '1' * 25):
+            response = client.post('/api/cart/menu-items', {'menuitem': ref, 'quantity': 1})
+            self.assertEqual(response.status_code, 400, ref)
+            response = client.post('/api/cart/menu-items/bulk', [{'menuitem': ref, 'quantity': 1}], format='json')
+            self.assertEqual(response.status_code, 400, ref)
+        self.assertFalse(Cart.objects.exists())
+
+
+class MenuSnapshotTests(LittleLemonTestCase):
+    def test_detail_and_cart_reads_skip_the_database(self):
+        client = self.client_for(self.customer)
+        item = self.items[3]
+        self.assertEqual(client.get(f'/api/menu-items/{item.pk}').data, MenuItemSerializer(item).data)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(f'/api/menu-items/{item.pk}')
+            client.post('/api/cart/menu-items', {'menuitem': 'Dish 3', 'quantity': 2})
+        self.assertEqual(response.data['price'], '5.00')
+        self.assertFalse([q for q in ctx.captured_queries if 'LittleLemonAPI_menuitem' in q['sql']])
+        self.assertEqual(client.get('/api/menu-items/999999').status_code, 404)
+
+    def test_catalog_write_rebuilds_snapshot(self):
+        client = self.client_for(self.customer)
+        item = self.items[0]
+        client.get(f'/api/menu-items/{item.pk}')
+        with self.captureOnCommitCallbacks(execute=True):
+            item.price = Decimal('7.25')
+            item.save()
+        self.assertEqual(client.get(f'/api/menu-items/{item.pk}').data['price'], '7.25')
+        client.post('/api/cart/menu-items', {'menuitem': item.title, 'quantity': 2})
+        self.assertEqual(Cart.objects.get(user=self.customer).price, Decimal('14.50'))
+
+    def test_records_are_read_only(self):
+        record = menu_snapshot().by_id[self.items[0].pk]
+        with self.assertRaises(AttributeError):
+            record.price = Decimal('0')
+        self.assertIs(menu_snapshot().by_title['Dish 0'], record)
+
+    def test_other_workers_writes_are_seen_once_the_local_version_expires(self):
+        version, _ = get_catalog_version()
+        self.assertEqual(menu_snapshot().version, version)
+        # Another worker's repricing doesn't reach this process's cache...
+        MenuItem.objects.filter(pk=self.items[0].pk).update(price=Decimal('9.00'))
+        self.assertEqual(menu_snapshot().by_id[self.items[0].pk].price, Decimal('5.00'))
+        # ...until the version expires.
+        with mock.patch('time.time', return_value=time.time() + 6):
+            self.assertEqual(menu_snapshot().by_id[self.items[0].pk].price, Decimal('9.00'))
+
+    @override_settings(LITTLELEMON_MENU_SNAPSHOT_MAX_ITEMS=10)
+    def test_duplicate_title_resolves_to_the_oldest_item_without_a_snapshot(self):
+        MenuItem.objects.create(title='Dish 1', price=Decimal('1.00'), featured=False, category=self.category)
+        self.assertEqual(resolve_menu_items(['Dish 1'])['Dish 1'].pk, self.items[1].pk)
+
+    @override_settings(LITTLELEMON_MENU_SNAPSHOT_MAX_ITEMS=10)
+    def test_large_menu_falls_back_to_the_database(self):
+        self.assertIsNone(menu_snapshot())
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get(f'/api/menu-items/{self.items[20].pk}').data['title'], 'Dish 20')
+        self.assertEqual(client.post('/api/cart/menu-items', {'menuitem': 'Dish 20', 'quantity': 1}).status_code, 201)
+
+
+class CartSummaryTests(LittleLemonTestCase):
+    def summary(self):
+        return self.client_for(self.customer).get('/api/cart/summary').data
+
+    def test_summary_follows_cart_writes(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(self.summary()['item_count'], 0)
+        client.post('/api/cart/menu-items', {'menuitem': 'Dish 0', 'quantity': 2})
+        client.post('/api/cart/menu-items/bulk', [
+            {'menuitem': 'Dish 0', 'quantity': 1}, {'menuitem': 'Dish 1', 'quantity': 3}
+        ], format='json')
+        summary = self.summary()
+        self.assertEqual((summary['item_count'], summary['subtotal']), (4, '20.00'))
+        client.delete('/api/cart/menu-items')
+        self.assertEqual(self.summary()['item_count'], 0)
+
+    def test_checkout_resets_summary(self):
+        self.fill_cart(self.customer, 5)
+        self.client_for(self.customer).post('/api/cart/orders')
+        self.assertEqual(self.summary()['subtotal'], '0.00')
+
+    def test_writes_outside_cart_module_keep_summary_in_step(self):
+        self.fill_cart(self.customer, 3)
+        Cart.objects.create(user=self.customer, menuitem=self.items[5], quantity=1,
+                            unit_price=Decimal('5.00'), price=Decimal('5.00'))
+        self.assertEqual(self.summary()['item_count'], 7)
+        MenuItem.objects.filter(pk=self.items[0].pk).delete()
+        summary = CartSummary.objects.get(user=self.customer)
+        self.assertEqual((summary.item_count, summary.subtotal), (5, Decimal('25.00')))
+
+    def test_deleting_user_with_cart(self):
+        self.fill_cart(self.customer, 3)
+        self.customer.delete()
+        self.assertFalse(CartSummary.objects.exists())
+
+
+class AsyncReadTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        token_lru.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def call(self, handler, user, path, **kwargs):
+        token, _ = await Token.objects.aget_or_create(user=user)
+        request = self.factory.get(path, headers={'Authorization': f'Token {token.key}'})
+        response = await async_views.async_reads(handler, None)(request, **kwargs)
+        return response.status_code, json.loads(response.content) if response.content else None
+
+    async def test_menu_list_matches_sync_view(self):
+        status_code, data = await self.call(async_views.menu_item_list, self.customer, '/api/menu-items?page=2')
+        self.assertEqual(status_code, 200)
+        await cache.aclear()
+        expected = await sync_to_async(self.client_for(self.customer).get)('/api/menu-items?page=2')
+        self.assertEqual(data['results'], json.loads(json.dumps(expected.data['results'])))
+        self.assertEqual(data['count'], expected.data['count'])
+
+    async def test_menu_detail_and_missing_item(self):
+        status_code, data = await self.call(async_views.menu_item_detail, self.customer, '/', pk=self.items[3].pk)
+        self.assertEqual((status_code, data['title']), (200, 'Dish 3'))
+        status_code, _ = await self.call(async_views.menu_item_detail, self.customer, '/', pk=999999)
+        self.assertEqual(status_code, 404)
+
+    async def test_requires_token(self):
+        response = await async_views.async_reads(async_views.cart_items, None)(self.factory.get('/'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_order_detail_permissions(self):
+        order = await Order.objects.acreate(user=self.customer, total=Decimal('1.00'), date='2025-03-01')
+        other = await User.objects.acreate(username='other')
+        status_code, _ = await self.call(async_views.order_detail, self.manager, '/', order_id=order.pk)
+        self.assertEqual(status_code, 200)
+        status_code, _ = await self.call(async_views.order_detail, other, '/', order_id=order.pk)
+        self.assertEqual(status_code, 403)
+
+
+class InstrumentationTests(LittleLemonTestCase):
+    def test_server_timing_and_metrics(self):
+        response = self.client_for(self.customer).get('/api/cart/summary')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        with override_settings(LITTLELEMON_METRICS_TOKEN='scrape'):
+            metrics = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape').content.decode()
+        self.assertIn('littlelemon_request_duration_seconds_count{route="cart-summary",method="GET"}', metrics)
+        self.assertIn('littlelemon_db_queries_bucket{route="cart-summary",method="GET",le="+Inf"}', metrics)
+
+    @override_settings(LITTLELEMON_METRICS_TOKEN=None)
+    def test_metrics_need_the_token_or_staff(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        with override_settings(LITTLELEMON_METRICS_TOKEN='scrape'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+
+    async def test_async_requests_report_no_db_metrics(self):
+        async def view(request):
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get('/')
+        response = await InstrumentationMiddleware(view)(request)
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+$')
+
+    def test_repeated_sql_counts_as_duplicate(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for item in self.items[:3]:
+                MenuItem.objects.get(pk=item.pk)
+            Category.objects.count()
+        self.assertEqual((recorder.count, recorder.duplicates), (4, 2))
+
+    def test_slow_requests_dump_profile(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(LITTLELEMON_PROFILE_THRESHOLD_MS=0, LITTLELEMON_PROFILE_DIR=profile_dir):
+                self.client_for(self.customer).get('/api/cart/summary')
+            self.assertEqual(len(list(Path(profile_dir).glob('cart-summary-GET-*.prof'))), 1)
+
+
+class MenuSearchTests(LittleLemonTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        drinks = Category.objects.create(slug='drinks', title='Drinks')
+        MenuItem.objects.create(title='Lemon soda', price=Decimal('3.00'), featured=True, category=drinks)
+        MenuItem.objects.create(title='Lemonade', price=Decimal('12.00'), featured=False, category=drinks)
+        rebuild_index()
+
+    def test_search_matches_titles_and_categories_with_facets(self):
+        client = self.client_for(self.customer)
+        response = client.get('/api/menu-items/search?q=lemon')
+        self.assertEqual({row['title'] for row in response.data['results']}, {'Lemon soda', 'Lemonade'})
+        self.assertEqual(response.data['facets']['featured'], {'true': 1, 'false': 1})
+        self.assertEqual(response.data['facets']['price']['0-5'], 1)
+        response = client.get('/api/menu-items/search?q=drinks&featured=true')
+        self.assertEqual([row['title'] for row in response.data['results']], ['Lemon soda'])
+        self.assertEqual(response.data['facets']['featured'], {'true': 1, 'false': 1})
+
+    def test_index_follows_saves_and_deletes(self):
+        client = self.client_for(self.customer)
+        item = MenuItem.objects.create(title='Tiramisu', price=Decimal('6.00'), featured=False, category=self.category)
+        self.assertEqual(client.get('/api/menu-items/typeahead?q=tira').data, [{'id': item.pk, 'title': 'Tiramisu'}])
+        item.delete()
+        self.assertEqual(client.get('/api/menu-items/typeahead?q=tira').data, [])
+
+    def test_category_rename_reindexes_items(self):
+        self.category.title = 'Pasta'
+        self.category.save()
+        response = self.client_for(self.customer).get('/api/menu-items/search?q=pasta&limit=100')
+        self.assertEqual(len(response.data['results']), 40)
+
+    def test_limit_is_clamped_and_validated(self):
+        self.category.title = 'Pasta'
+        self.category.save()
+        client = self.client_for(self.customer)
+        self.assertEqual(len(client.get('/api/menu-items/search?q=pasta&limit=-1').data['results']), 1)
+        self.assertEqual(len(client.get('/api/menu-items/search?q=pasta&limit=500').data['results']), 40)
+        self.assertEqual(client.get('/api/menu-items/search?q=pasta&limit=many').status_code, 400)
+        manager = self.client_for(self.manager)
+        self.assertEqual(manager.get('/api/reports/top-items?limit=-1').status_code, 200)
+        self.assertEqual(manager.get('/api/reports/top-items?limit=1.5').status_code, 400)
+
+    def test_search_input_is_sanitized(self):
+        response = self.client_for(self.customer).get('/api/menu-items/search', {'q': '"lemon* OR NEAR('})
+        self.assertEqual(response.status_code, 200)
+
+
+class FastListTests(LittleLemonTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for day in (1, 2):
+            order = Order.objects.create(
+                user=cls.customer, total=Decimal('15.00'), date=f'2025-03-{day:02d}', delivery_crew=cls.crew
+            )
+            Order_Item.objects.bulk_create([
+                Order_Item(order=order, menuitem=item, quantity=day, unit_price=item.price, price=item.price * day)
+                for item in cls.items[:3]
+            ])
+
+    def test_values_rows_match_serializer_output(self):
+        client = self.client_for(self.manager)
+        response = client.get('/api/menu-items')
+        self.assertEqual(response.data['results'], MenuItemSerializer(self.items[:5], many=True).data)
+        response = client.get('/api/orders')
+        orders = Order.objects.order_by('-date', '-id')
+        self.assertEqual(response.data['results'], OrderSerializer(orders, many=True).data)
+
+    def test_sparse_fieldsets(self):
+        client = self.client_for(self.manager)
+        response = client.get('/api/menu-items?fields=id,price')
+        self.assertEqual(response.data['results'][0], {'id': self.items[0].pk, 'price': '5.00'})
+        response = client.get('/api/orders?fields=id,total')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'total'})
+        response = client.get('/api/categories?fields=title')
+        self.assertEqual(response.data['results'], [{'title': 'Mains'}])
+        self.assertEqual(client.get('/api/menu-items?fields=id,secret').status_code, 400)
+
+    @skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_is_selected_by_accept_header(self):
+        client = self.client_for(self.manager)
+        as_json = client.get('/api/orders')
+        as_msgpack = client.get('/api/orders', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+
+
+class OrderExportTests(LittleLemonTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for day in (3, 1, 2, 2):
+            order = Order.objects.create(user=cls.customer, total=Decimal('10.00'), date=f'2025-03-{day:02d}')
+            Order_Item.objects.bulk_create([
+                Order_Item(order=order, menuitem=item, quantity=1, unit_price=item.price, price=item.price)
+                for item in cls.items[:day]
+            ])
+        Order.objects.create(user=cls.customer, total=Decimal('0.00'), date='2025-03-04')
+
+    def expected(self, **filters):
+        orders = Order.objects.filter(**filters).order_by('date', 'id')
+        return json.loads(json.dumps(OrderSerializer(orders, many=True).data))
+
+    def test_ndjson_streams_orders_with_items(self):
+        response = self.client_for(self.manager).get('/api/orders/export.ndjson?date_from=2025-03-02')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected(date__gte='2025-03-02'))
+
+    def test_csv_has_one_row_per_item(self):
+        response = self.client_for(self.manager).get('/api/orders/export.csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        # 3 + 1 + 2 + 2 items, plus one row for the order without items
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[-1]['menuitem'], '')
+
+    def test_command_merges_items_across_chunks(self):
+        out = io.StringIO()
+        call_command('export_orders', '--chunk-size', '2', stdout=out)
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], self.expected())
+
+    def test_items_of_an_order_missing_from_the_order_stream_are_skipped(self):
+        # As if the earliest order were archived between the item and the order query.
+        missing = Order.objects.get(date='2025-03-01')
+        filter_by_date = export.filter_by_date
+
+        def orders_without_missing(queryset, prefix, *args):
+            queryset = filter_by_date(queryset, prefix, *args)
+            return queryset.exclude(id=missing.id) if not prefix else queryset
+
+        with mock.patch.object(export, 'filter_by_date', orders_without_missing):
+            orders = list(export.iter_orders(chunk_size=2))
+        self.assertEqual(json.loads(json.dumps(orders)), self.expected(id__in=Order.objects.exclude(id=missing.id)))
+        self.assertTrue(all(order['orderitem_set'] for order in orders[:-1]))
+
+    def test_manager_only_and_validated(self):
+        self.assertEqual(self.client_for(self.customer).get('/api/orders/export.csv').status_code, 403)
+        client = self.client_for(self.manager)
+        self.assertEqual(client.get('/api/orders/export.xml').status_code, 404)
+        self.assertEqual(client.get('/api/orders/export.csv?date_to=soon').status_code, 400)
+
+
+class AnalyticsTests(LittleLemonTestCase):
+    def snapshot(self):
+        return {
+            model.__name__: sorted(
+                tuple(value for key, value in row.items() if key != 'id') for row in model.objects.values()
+                if any(value for key, value in row.items() if key.endswith(('count', 'quantity', 'revenue')))
+            )
+            for model in (DailySales, DailyCrewSales, DailyMenuItemSales, DailyCategorySales)
+        }
+
+    def checkout(self, size, day):
+        self.fill_cart(self.customer, size)
+        response = self.client_for(self.customer).post('/api/cart/orders', {'date': day})
+        return response.data['order_id']
+
+    def test_rollups_follow_checkout_updates_and_deletes(self):
+        first = self.checkout(3, '2025-04-01')
+        second = self.checkout(1, '2025-04-01')
+        third = self.checkout(2, '2025-04-02')
+        manager = self.client_for(self.manager)
+        manager.patch(f'/api/orders/{first}', {'delivery_crew': self.crew.pk}, format='json')
+        manager.patch(f'/api/orders/{second}', {'delivery_crew': self.crew.pk}, format='json')
+        self.client_for(self.crew).patch(f'/api/orders/{first}', {'status': 'true'}, format='json')
+        manager.delete(f'/api/orders/{third}')
+        # Checkouts are counted by background jobs; the deltas add up in any order
+        self.assertEqual(run_due_jobs(), 3)
+
+        days = manager.get('/api/reports/daily-revenue').data
+        self.assertEqual(days, [
+            {'date': '2025-04-01', 'orders': 2, 'delivered': 1, 'items': 8, 'revenue': '40.00'},
+            {'date': '2025-04-02', 'orders': 0, 'delivered': 0, 'items': 0, 'revenue': '0.00'},
+        ])
+        crew = manager.get('/api/reports/delivery-crew').data
+        self.assertEqual(crew, [
+            {'crew': self.crew.pk, 'username': 'crew', 'orders': 2, 'delivered': 1, 'revenue': '40.00'},
+        ])
+        top = manager.get('/api/reports/top-items?limit=1').data
+        self.assertEqual(top, [{'menuitem': self.items[0].pk, 'title': 'Dish 0', 'quantity': 4, 'revenue': '20.00'}])
+        mix = manager.get('/api/reports/category-mix').data
+        self.assertEqual(mix[0]['share'], 1.0)
+
+        incremental = self.snapshot()
+        analytics.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_reports_are_manager_only(self):
+        self.assertEqual(self.client_for(self.customer).get('/api/reports/daily-revenue').status_code, 403)
+        response = self.client_for(self.manager).get('/api/reports/top-items?date_from=never')
+        self.assertEqual(response.status_code, 400)
+
+
+class ArchiveTests(LittleLemonTestCase):
+    def checkout(self, size, day, delivered):
+        self.fill_cart(self.customer, size)
+        order_id = self.client_for(self.customer).post('/api/cart/orders', {'date': day}).data['order_id']
+        Order.objects.filter(id=order_id).update(status=delivered)
+        return order_id
+
+    def test_moves_old_delivered_orders_with_their_items(self):
+        old = self.checkout(3, '2025-01-01', True)
+        open_order = self.checkout(1, '2025-01-01', False)
+        recent = self.checkout(2, '2025-05-30', True)
+        expected = json.loads(json.dumps(OrderSerializer(Order.objects.get(id=old)).data))
+
+        self.assertEqual(archive_orders(older_than_days=30, batch_size=1, today=date(2025, 6, 1)), 1)
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {open_order, recent})
+        self.assertFalse(Order_Item.objects.filter(order_id=old).exists())
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=old).count(), 3)
+
+        response = self.client_for(self.customer).get(f'/api/orders/{old}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected)
+        self.assertEqual(self.client_for(self.manager).get(f'/api/orders/{old}').status_code, 200)
+        self.assertEqual(archive_orders(older_than_days=30, today=date(2025, 6, 1)), 0)
+
+    def test_archived_orders_are_read_only_and_private(self):
+        old = self.checkout(1, '2025-01-01', True)
+        archive_orders(older_than_days=30, today=date(2025, 6, 1))
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        self.assertEqual(self.client_for(stranger).get(f'/api/orders/{old}').status_code, 403)
+        response = self.client_for(self.manager).patch(f'/api/orders/{old}', {'status': 'false'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client_for(self.manager).get('/api/orders/999999').status_code, 404)
+
+    def test_limit_reports_and_export(self):
+        for day in ('2025-01-01', '2025-01-02', '2025-01-03'):
+            self.checkout(2, day, True)
+        analytics.rebuild()  # checkout() marks orders delivered behind the rollups' back
+        before = self.client_for(self.manager).get('/api/reports/daily-revenue').data
+        out = io.StringIO()
+        call_command('archive_orders', '--older-than-days', '0', '--batch-size', '2', '--limit', '2', stdout=out)
+        self.assertIn('Archived 2 delivered orders', out.getvalue())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        self.assertEqual(Order.objects.count(), 1)
+
+        analytics.rebuild()
+        self.assertEqual(self.client_for(self.manager).get('/api/reports/daily-revenue').data, before)
+        self.assertEqual(sum(day['delivered'] for day in before), 3)
+
+        response = self.client_for(self.manager).get('/api/orders/export.ndjson?archived=true')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['date'] for line in lines], ['2025-01-01', '2025-01-02'])
+
+
+class JobTests(LittleLemonTestCase):
+    def checkout(self, size=2, day='2025-04-01'):
+        self.fill_cart(self.customer, size)
+        return self.client_for(self.customer).post('/api/cart/orders', {'date': day}).data['order_id']
+
+    def test_checkout_rollups_run_as_a_job(self):
+        self.checkout()
+        self.assertFalse(DailySales.objects.exists())
+        self.assertEqual(list(Job.objects.values_list('type', flat=True)), ['analytics.checkout'])
+        stats = JobStats()
+        self.assertEqual(run_due_jobs(stats=stats), 1)
+        self.assertEqual(DailySales.objects.get().revenue, Decimal('20.00'))
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(dict(stats.outcomes['analytics.checkout']), {'done': 1})
+
+    @override_settings(LITTLELEMON_JOB_MAX_ATTEMPTS=2, LITTLELEMON_JOB_BACKOFF=30)
+    def test_failures_back_off_then_give_up(self):
+        self.checkout()
+        with mock.patch('LittleLemonAPI.analytics.record_checkout', side_effect=RuntimeError('boom')):
+            with self.assertLogs('LittleLemonAPI.jobs', 'ERROR') as logs:
+                self.assertEqual(run_due_jobs(), 1)
+            self.assertEqual(len(logs.records), 1)
+            self.assertIn('failed on attempt 1', logs.records[0].getMessage())
+            self.assertEqual(str(logs.records[0].exc_info[1]), 'boom')
+            job = Job.objects.get()
+            self.assertEqual((job.attempts, job.lease, job.failed), (1, '', False))
+            self.assertIn('boom', job.last_error)
+            self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=25))
+            self.assertEqual(run_due_jobs(), 0)  # not due until the backoff is over
+
+            Job.objects.update(run_at=timezone.now())
+            with self.assertLogs('LittleLemonAPI.jobs', 'ERROR') as logs:
+                self.assertEqual(run_due_jobs(), 1)
+            self.assertIn('failed on attempt 2', logs.records[0].getMessage())
+        job = Job.objects.get()
+        self.assertEqual((job.attempts, job.failed), (2, True))
+        self.assertEqual(claim_jobs(10), [])
+        self.assertFalse(DailySales.objects.exists())
+
+    def test_expired_lease_is_not_applied_twice(self):
+        self.checkout()
+        stalled, = claim_jobs(1)
+        # The first worker stalls past its visibility timeout; another takes over
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        taken, = claim_jobs(1)
+        self.assertEqual(run_job(taken), 'done')
+        self.assertEqual(run_job(stalled), 'expired')
+        self.assertEqual(DailySales.objects.get().order_count, 1)
+
+    @override_settings(LITTLELEMON_JOBS_EAGER=True, LITTLELEMON_AUTO_ASSIGN=True)
+    def test_eager_mode_runs_jobs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order_id = self.checkout()
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(DailySales.objects.get().order_count, 1)
+        self.assertEqual(Order.objects.get(id=order_id).delivery_crew, self.crew)
+
+    def test_unknown_job_type(self):
+        with self.assertRaises(ValueError):
+            enqueue('nope', {})
+
+
+@skipIf(connection.vendor != 'sqlite', "The worker is run against a scratch SQLite file.")
+class JobWorkerTests(SimpleTestCase):
+    def test_worker_threads_drain_the_queue(self):
+        # The test database is in-memory, which the worker's threads can't share.
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_jobs', '--checkouts', '12', '--threads', '3'],
+            capture_output=True, text=True, timeout=300
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertRegex(result.stdout, r'analytics\.checkout +12 +0 +0 .* 0 +0\n')
+        self.assertRegex(result.stdout, r'assignment\.assign +12 +0 +0 ')
+
+
+class MenuImportTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+
+    def test_json_import_reports_rows_and_writes_in_bulk(self):
+        rows = [
+            {'id': self.items[0].pk, 'price': '7.25'},
+            {'title': 'Dish 1', 'featured': True},
+            {'title': 'Lemon tart', 'price': '4.50', 'featured': False, 'category': 'mains'},
+            {'id': self.items[2].pk, 'price': 'cheap'},
+            {'title': 'Dish 3', 'category': 'desserts'},
+            {'title': 'Granita', 'price': '3.00'},
+            {'id': self.items[4].pk, 'price': '5.00'},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client_for(self.admin).post('/api/menu-items/import', rows, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['created'], response.data['updated'], response.data['unchanged']), (1, 2, 1)
+        )
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5, 6])
+        self.assertIn('category', response.data['errors'][2]['errors'])
+        self.assertEqual(MenuItem.objects.get(pk=self.items[0].pk).price, Decimal('7.25'))
+        self.assertTrue(MenuItem.objects.get(pk=self.items[1].pk).featured)
+        self.assertLessEqual(len(real_queries(ctx)), 8)
+        typeahead = self.client_for(self.customer).get('/api/menu-items/typeahead?q=lemon t').data
+        self.assertEqual([row['title'] for row in typeahead], ['Lemon tart'])
+
+    def test_csv_import_and_manager_limits(self):
+        body = f"id,title,price,featured,category\n{self.items[0].pk},,9.00,,\n,Sorbet,3.00,false,mains\n"
+        response = self.client_for(self.manager).post('/api/menu-items/import', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertFalse(MenuItem.objects.filter(title='Sorbet').exists())
+        self.assertEqual(self.client_for(self.customer).post('/api/menu-items/import', [], format='json').status_code, 403)
+
+    def test_command_dry_run_writes_nothing(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump([{'id': self.items[0].pk, 'price': '1.00'}], handle)
+        out = io.StringIO()
+        call_command('import_menu', handle.name, '--dry-run', stdout=out, stderr=io.StringIO())
+        Path(handle.name).unlink()
+        self.assertIn('updated 1', out.getvalue())
+        self.assertEqual(MenuItem.objects.get(pk=self.items[0].pk).price, Decimal('5.00'))
+
+
+class AssignmentTests(LittleLemonTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.crew2 = User.objects.create_user(username='crew2', password='pass')
+        cls.crew2.groups.add(cls.crew_group)
+        for n in range(2):
+            Order.objects.create(user=cls.customer, total=Decimal('10.00'), date='2025-03-01', delivery_crew=cls.crew)
+        Order.objects.create(user=cls.customer, total=Decimal('10.00'), date='2025-03-01', status=True)
+        cls.pending = [
+            Order.objects.create(user=cls.customer, total=Decimal('10.00'), date=f'2025-03-0{day}').pk
+            for day in (5, 4, 3, 2, 2)
+        ]
+
+    def open_loads(self):
+        return {
+            crew.username: Order.objects.filter(delivery_crew=crew, status=False).count()
+            for crew in (self.crew, self.crew2)
+        }
+
+    def test_orders_go_to_the_least_loaded_member(self):
+        assigned, _ = assign_orders(batch_size=2)
+        self.assertEqual(assigned, 5)
+        self.assertEqual(self.open_loads(), {'crew': 4, 'crew2': 3})
+        # Oldest orders first: the two from March 2nd went to the idle member
+        self.assertEqual(set(Order.objects.filter(date='2025-03-02').values_list('delivery_crew', flat=True)), {self.crew2.pk})
+        self.assertIsNone(Order.objects.get(status=True).delivery_crew)
+        rollup = DailyCrewSales.objects.get(crew=self.crew2, date='2025-03-02')
+        self.assertEqual((rollup.order_count, rollup.revenue), (2, Decimal('20.00')))
+
+    def test_orders_assigned_by_hand_meanwhile_are_left_alone(self):
+        # The oldest pending order is assigned by hand after assign_orders read it.
+        manual = Order.objects.filter(pk__in=self.pending).order_by('date', 'id').first()
+        write = assignment.write_assignments
+
+        def assigned_meanwhile(orders):
+            Order.objects.filter(pk=manual.pk).update(delivery_crew=self.crew)
+            return write(orders)
+
+        with mock.patch.object(assignment, 'write_assignments', assigned_meanwhile):
+            assigned, crew = assign_orders()
+        self.assertEqual(assigned, 4)
+        self.assertEqual(Order.objects.get(pk=manual.pk).delivery_crew, self.crew)
+        # It was planned for the idle member, who gets it back in the loads.
+        self.assertEqual(crew.loads(), {self.crew.pk: 4, self.crew2.pk: 2})
+        self.assertEqual(
+            sum(DailyCrewSales.objects.filter(date__gte='2025-03-02').values_list('order_count', flat=True)), 4
+        )
+        self.assertFalse(OrderEvent.objects.filter(order_id=manual.pk).exists())
+
+    def test_max_open_leaves_the_rest_unassigned(self):
+        assigned, crew = assign_orders(max_open=3)
+        self.assertEqual(assigned, 4)
+        self.assertEqual(crew.loads(), {self.crew.pk: 3, self.crew2.pk: 3})
+        self.assertEqual(Order.objects.filter(pk__in=self.pending, delivery_crew=None).count(), 1)
+
+
+@override_settings(LITTLELEMON_CHANGES_POLL_INTERVAL=0.05)
+class ChangeFeedTests(LittleLemonTestCase):
+    def changes(self, user, since, **params):
+        response = self.client_for(user).get('/api/orders/changes', {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_feed_delivers_only_visible_deltas_after_the_cursor(self):
+        start = self.client_for(self.customer).get('/api/orders/changes').data['cursor']
+        self.fill_cart(self.customer, 2)
+        order_id = self.client_for(self.customer).post('/api/cart/orders').data['order_id']
+        crew2 = User.objects.create_user(username='crew2')
+        crew2.groups.add(self.crew_group)
+        manager = self.client_for(self.manager)
+        manager.patch(f'/api/orders/{order_id}', {'delivery_crew': self.crew.pk}, format='json')
+        manager.patch(f'/api/orders/{order_id}', {'delivery_crew': self.crew.pk}, format='json')  # no change
+        manager.patch(f'/api/orders/{order_id}', {'delivery_crew': crew2.pk}, format='json')
+
+        feed = self.changes(self.customer, start)
+        self.assertEqual([change['kind'] for change in feed['changes']], ['created', 'updated', 'updated'])
+        self.assertEqual(feed['changes'][-1]['delivery_crew'], crew2.pk)
+        # The first crew member hears about being assigned and unassigned
+        self.assertEqual([change['delivery_crew'] for change in self.changes(self.crew, start)['changes']],
+                         [self.crew.pk, crew2.pk])
+        self.assertEqual(self.changes(self.customer, feed['cursor'])['changes'], [])
+        other = User.objects.create_user(username='other')
+        self.assertEqual(self.changes(other, start)['changes'], [])
+
+    def test_long_poll_times_out_with_the_same_cursor(self):
+        feed = self.changes(self.customer, 0, wait='0.2')
+        self.assertEqual(feed, {'changes': [], 'cursor': '0', 'more': False})
+        response = self.client_for(self.customer).get('/api/orders/changes?since=latest')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_cursor_and_wait_are_rejected(self):
+        client = self.client_for(self.customer)
+        for query in ('since=²', f'since={10 ** 25}', 'since=0&wait=nan', 'since=0&wait=inf', 'since=0&wait=soon'):
+            self.assertEqual(client.get(f'/api/orders/changes?{query}').status_code, 400, query)
+
+
+@override_settings(LITTLELEMON_CHANGES_POLL_INTERVAL=0.05)
+class AsyncChangeFeedTests(LittleLemonTestCase):
+    async def test_event_stream_and_long_poll(self):
+        order = await Order.objects.acreate(user=self.customer, total=Decimal('1.00'), date='2025-03-01')
+        await sync_to_async(changefeed.record_event)(order, 'created')
+        token, _ = await Token.objects.aget_or_create(user=self.customer)
+        factory = AsyncRequestFactory()
+        headers = {'Authorization': f'Token {token.key}'}
+
+        view = async_views.async_reads(async_views.order_changes, None)
+        response = await view(factory.get('/?since=0&wait=1', headers=headers))
+        self.assertEqual(json.loads(response.content)['changes'][0]['order'], order.pk)
+
+        view = async_views.async_reads(async_views.order_change_stream, None)
+        response = await view(factory.get('/', headers={**headers, 'Last-Event-ID': '0'}))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        event = (await anext(chunks)).decode()
+        self.assertIn('event: order', event)
+        self.assertEqual(json.loads(event.split('data: ')[1])['order'], order.pk)
+        await chunks.aclose()
+
+        for last_event_id in ('²', str(10 ** 25)):
+            response = await view(factory.get('/', headers={**headers, 'Last-Event-ID': last_event_id}))
+            self.assertEqual(response.status_code, 400)
+        response = await view(factory.get('/?wait=nan', headers=headers))
+        self.assertEqual(response.status_code, 400)
+
+
+class DatabaseProfileTests(LittleLemonTestCase):
+    def test_production_profile_connection(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            wrapper = connections['default'].__class__({
+                **connection.settings_dict, 'NAME': str(Path(scratch) / 'profile.sqlite3'),
+                **settings.LITTLELEMON_DB_PROFILES['production'],
+            }, alias='profile-test')
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+            finally:
+                wrapper.close()
+
+    def test_only_marked_reads_go_to_the_replica(self):
+        router = ReadReplicaRouter()
+        replicated = {
+            'default': SimpleNamespace(settings_dict={'NAME': 'db.sqlite3'}),
+            'replica': SimpleNamespace(settings_dict={'NAME': 'replica.sqlite3'}),
+        }
+        with override_settings(LITTLELEMON_READ_REPLICA='replica'), \
+                mock.patch('LittleLemonAPI.routers.connections', replicated):
+            self.assertIsNone(router.db_for_read(MenuItem))
+            with replica_reads():
+                self.assertEqual(router.db_for_read(MenuItem), 'replica')
+                self.assertEqual(router.db_for_write(MenuItem), 'default')
+                # Test runs mirror the replica onto the primary's database.
+                replicated['replica'].settings_dict['NAME'] = 'db.sqlite3'
+                self.assertIsNone(router.db_for_read(MenuItem))
+        with replica_reads():
+            self.assertIsNone(router.db_for_read(MenuItem))
+
+    def test_replica_routes(self):
+        factory = RequestFactory()
+        # Cached under the catalog version, so built from the primary.
+        self.assertFalse(reads_from_replica(factory.get('/api/menu-items')))
+        self.assertFalse(reads_from_replica(factory.get('/api/categories')))
+        self.assertTrue(reads_from_replica(factory.get(f'/api/menu-items/{self.items[0].pk}')))
+        self.assertTrue(reads_from_replica(factory.get('/api/reports/daily-revenue')))
+        self.assertFalse(reads_from_replica(factory.post('/api/menu-items')))
+        self.assertFalse(reads_from_replica(factory.get('/api/cart/menu-items')))
+        self.assertFalse(reads_from_replica(factory.get('/api/orders/changes')))
+        self.assertFalse(reads_from_replica(factory.get('/api/nowhere')))
+
+
+class ThrottleTests(LittleLemonTestCase):
+    def throttle(self, base, rate, now):
+        return type('Throttle', (base,), {'THROTTLE_RATES': {'user': rate, 'cart': rate}, 'timer': lambda self: now})()
+
+    def test_fixed_window_counts_and_resets(self):
+        request = SimpleNamespace(user=self.customer)
+        results = [self.throttle(UserRateThrottle, '3/min', 120.5).allow_request(request, None) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+        throttle = self.throttle(UserRateThrottle, '3/min', 150.5)
+        self.assertFalse(throttle.allow_request(request, None))
+        self.assertEqual(throttle.wait(), 29.5)
+        self.assertTrue(self.throttle(UserRateThrottle, '3/min', 180.0).allow_request(request, None))
+        # One integer per client and window, however many requests were counted
+        self.assertEqual(cache.get(f'throttle_user_{self.customer.pk}:2'), 5)
+
+    def test_scoped_rates_follow_the_view(self):
+        request = SimpleNamespace(user=self.customer)
+        for _ in range(2):
+            self.assertTrue(self.throttle(ScopedRateThrottle, '2/min', 10).allow_request(request, CartView))
+        self.assertFalse(self.throttle(ScopedRateThrottle, '2/min', 10).allow_request(request, CartView))
+        self.assertTrue(self.throttle(ScopedRateThrottle, '2/min', 10).allow_request(request, ItemOfTheDayView))
+
+    def test_throttled_request_gets_retry_after(self):
+        client = self.client_for(self.customer)
+        with mock.patch.object(UserRateThrottle, 'THROTTLE_RATES', {'user': '2/day'}):
+            statuses = [client.get('/api/cart/summary').status_code for _ in range(3)]
+            response = client.get('/api/cart/summary')
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertIn('Retry-After', response)
+
+    def test_sqlite_counters_are_shared_and_exact(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            path = Path(scratch) / 'throttle.sqlite3'
+            workers = [SQLiteCounters(path) for _ in range(4)]
+
+            def hammer(counters):
+                for _ in range(100):
+                    counters.incr('throttle_user_1:0', 60)
+
+            threads = [threading.Thread(target=hammer, args=(counters,)) for counters in workers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(workers[0].incr('throttle_user_1:0', 60), 401)
+
+
+class BenchmarkGateTests(SimpleTestCase):
+    baseline = {'GET menuitem-list': {'queries': 2}}
+    timings = {'GET menuitem-list': {'p95': 10.0}}
+    options = {'tolerance': 2.0, 'min_delta': 2.0}
+
+    def compare(self, queries, p95):
+        out = io.StringIO()
+        benchmark.Command(stdout=out).compare(
+            {'GET menuitem-list': {'queries': queries, 'p95': p95}}, self.baseline, self.timings, self.options
+        )
+        return out.getvalue()
+
+    def test_extra_queries_fail(self):
+        with self.assertRaisesMessage(CommandError, 'GET menuitem-list: 3 queries (baseline 2)'):
+            self.compare(3, 10.0)
+
+    def test_p95_past_tolerance_and_min_delta_fails(self):
+        with self.assertRaisesMessage(CommandError, 'GET menuitem-list: p95 25.00 ms (baseline 10.00 ms)'):
+            self.compare(2, 25.0)
+
+    def test_results_inside_tolerance_pass(self):
+        self.assertIn('No regressions', self.compare(2, 19.9))
+        self.assertIn('No regressions', self.compare(1, 8.0))
+
+    def test_p95_is_not_compared_without_local_timings(self):
+        self.timings = {}
+        self.assertIn('No regressions', self.compare(2, 500.0))
+
+
+class StartupTests(SimpleTestCase):
+    # SimpleTestCase rejects database queries, and warm-up must make none.
+    def test_warm_up_fills_caches_without_queries(self):
+        serializer_layout.cache_clear()
+        warm_up(freeze=False)
+        self.assertGreater(serializer_layout.cache_info().currsize, 0)
+
+    @override_settings(LITTLELEMON_WARM_UP=False)
+    def test_warm_up_can_be_turned_off(self):
+        serializer_layout.cache_clear()
+        warm_up(freeze=False)
+        self.assertEqual(serializer_layout.cache_info().currsize, 0)
+
+    def test_unused_imports_are_only_skipped_api_only(self):
+        with mock.patch.dict(sys.modules):
+            for name in DRF_OPTIONAL_IMPORTS:
+                sys.modules.pop(name, None)
+            with mock.patch.dict(os.environ, {'LITTLELEMON_API_ONLY': '0'}):
+                skip_unused_imports()
+            self.assertFalse(any(name in sys.modules for name in DRF_OPTIONAL_IMPORTS))
+            with mock.patch.dict(os.environ, {'LITTLELEMON_API_ONLY': '1'}):
+                skip_unused_imports()
+            self.assertTrue(all(sys.modules[name] is None for name in DRF_OPTIONAL_IMPORTS))
+
+
+@skipIf(connection.vendor != 'sqlite', "Workers are served from a scratch SQLite file.")
+class StartupBenchmarkTests(SimpleTestCase):
+    def test_cold_and_forked_workers_answer_in_both_settings(self):
+        # Fresh interpreters, so the import profile isn't skewed by this process.
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_startup', '--repeat', '1', '--top', '3'],
+            capture_output=True, text=True, timeout=300
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertRegex(result.stdout, r'\nrest_framework\.authtoken +[\d.]+ ')
+        for row in ('full +off', 'full +on', 'api-only +off', 'api-only +on'):
+            self.assertRegex(result.stdout, rf'\n +{row} +[\d.]+ +[\d.]+ +[\d.]+\n')
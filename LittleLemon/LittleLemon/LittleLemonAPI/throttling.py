@@ -0,0 +1,130 @@
+"""
+Fixed-window rate throttles.
+
+DRF's SimpleRateThrottle keeps, for every client, a list of request
+timestamps in the cache, and rewrites the whole list on every request. The
+list grows to the full rate (1000 entries for 1000/day), and with a
+per-process cache every worker counts separately.
+
+These throttles keep a single integer per client, scope and window instead.
+A check is one atomic increment whatever the rate, and a counter expires
+with its window. The trade-off is the usual fixed-window one: a client can
+spend one window's allowance at the end of a window and the next window's at
+the start of it.
+
+Counters live in LITTLELEMON_THROTTLE_CACHE (default 'default'). Increments
+are atomic in the local-memory and Redis caches, but the file cache
+increments with a read and a write, so workers sharing LITTLELEMON_CACHE_DIR
+can lose a count when they hit the same key at the same moment. For an exact
+count shared across processes without Redis, set LITTLELEMON_THROTTLE_DB to
+the path of a SQLite file. Counters are then kept there, one upsert per
+check, away from the main database's write lock.
+"""
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import throttling
+
+
+class CacheCounters:
+    def __init__(self, cache):
+        self.cache = cache
+
+    def incr(self, key, timeout):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # First request of the window, unless another worker just created it.
+            if self.cache.add(key, 1, timeout):
+                return 1
+            return self.cache.incr(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class SQLiteCounters:
+    """Counters in a side SQLite file; each increment is one atomic upsert."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            # Counters are disposable, so durability is traded for speed.
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_counter '
+                '(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL) WITHOUT ROWID'
+            )
+            self.local.db = db
+        return db
+
+    def incr(self, key, timeout):
+        db = self.connection()
+        now = time.time()
+        count, = db.execute(
+            'INSERT INTO throttle_counter (key, count, expires) VALUES (?, 1, ?) '
+            'ON CONFLICT (key) DO UPDATE SET count = count + 1 RETURNING count',
+            (key, now + timeout)
+        ).fetchone()
+        if count == 1:
+            # A new window started; drop the counters of windows that have ended.
+            db.execute('DELETE FROM throttle_counter WHERE expires < ?', (now,))
+        return count
+
+    def clear(self):
+        self.connection().execute('DELETE FROM throttle_counter')
+
+
+_counters = {}
+
+
+def throttle_counters():
+    path = getattr(settings, 'LITTLELEMON_THROTTLE_DB', None)
+    if path:
+        if path not in _counters:
+            _counters[path] = SQLiteCounters(path)
+        return _counters[path]
+    return CacheCounters(caches[getattr(settings, 'LITTLELEMON_THROTTLE_CACHE', 'default')])
+
+
+class FixedWindowRateThrottle(throttling.SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.window_end = (window + 1) * self.duration
+        # The window number is part of the key, so nothing has to be reset and
+        # the counter can simply expire with its window.
+        count = throttle_counters().incr(f'{self.key}:{window}', self.duration)
+        if count > self.num_requests:
+            return self.throttle_failure()
+        return True
+
+    def wait(self):
+        return max(self.window_end - self.now, 0)
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, FixedWindowRateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, FixedWindowRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, FixedWindowRateThrottle):
+    """Per-view rates: views set `throttle_scope` (e.g. 'cart', 'orders')."""
@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
-    MenuItemViewSet, CategoryViewSet,
+    MenuItemViewSet, CategoryViewSet, MenuImportView, MenuSearchView, MenuTypeaheadView,
     ManagerUserView, DeliveryCrewUserView,
-    SetItemOfTheDayView, CartView,
-    OrderListCreateView, OrderDetailView
+    SetItemOfTheDayView, ItemOfTheDayView, CartView, CartBatchView, CartSummaryView,
+    OrderListCreateView, OrderExportView, OrderChangesView, OrderDetailView,
+    DailyRevenueReportView, DeliveryCrewReportView, TopMenuItemsReportView, CategoryMixReportView
 )
 
 # Custom ViewSet routing without trailing slashes
@@ -29,14 +31,38 @@ category_detail = CategoryViewSet.as_view({
     'delete': 'destroy'
 })
 
+cart_items = CartView.as_view()
+order_detail = OrderDetailView.as_view()
+order_changes = OrderChangesView.as_view()
+extra_patterns = []
+
+# Under ASGI the hot read endpoints answer GET with the async ORM
+if getattr(settings, 'LITTLELEMON_ASYNC_READS', False):
+    from . import async_views
+    menuitem_list = async_views.async_reads(async_views.menu_item_list, menuitem_list)
+    menuitem_detail = async_views.async_reads(async_views.menu_item_detail, menuitem_detail)
+    category_list = async_views.async_reads(async_views.category_list, category_list)
+    cart_items = async_views.async_reads(async_views.cart_items, cart_items)
+    order_detail = async_views.async_reads(async_views.order_detail, order_detail)
+    order_changes = async_views.async_reads(async_views.order_changes, order_changes)
+    # Server-Sent Events need a server that can hold many idle streams
+    extra_patterns.append(path(
+        "orders/changes/stream",
+        async_views.async_reads(async_views.order_change_stream, None),
+        name="order-change-stream",
+    ))
+
 urlpatterns = [
     # Menu items
-    path("menu-items", MenuItemViewSet.as_view({'get': 'list', 'post': 'create'}), name="menuitem-list"),
-    path("menu-items/<int:pk>", MenuItemViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name="menuitem-detail"),
+    path("menu-items", menuitem_list, name="menuitem-list"),
+    path("menu-items/<int:pk>", menuitem_detail, name="menuitem-detail"),
+    path("menu-items/import", MenuImportView.as_view(), name="menuitem-import"),
+    path("menu-items/search", MenuSearchView.as_view(), name="menuitem-search"),
+    path("menu-items/typeahead", MenuTypeaheadView.as_view(), name="menuitem-typeahead"),
 
     # Categories
-    path("categories", CategoryViewSet.as_view({'get': 'list', 'post': 'create'}), name="category-list"),
-    path("categories/<int:pk>", CategoryViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name="category-detail"),
+    path("categories", category_list, name="category-list"),
+    path("categories/<int:pk>", category_detail, name="category-detail"),
 
     # Group management
     path("groups/manager/users", ManagerUserView.as_view(), name="manager-users"),
@@ -45,16 +71,27 @@ urlpatterns = [
     path("groups/deliverycrew/users/<int:user_id>", DeliveryCrewUserView.as_view(), name="delivery-crew-user-detail"),
 
     # Item of the Day
+    path("menu-items/item-of-the-day", ItemOfTheDayView.as_view(), name="item-of-the-day"),
     path("menu-items/<int:item_id>/set-item-of-the-day", SetItemOfTheDayView.as_view(), name="set-item-of-the-day"),
 
     # Cart
-    path("cart/menu-items", CartView.as_view(), name="cart-items"),
+    path("cart/menu-items", cart_items, name="cart-items"),
+    path("cart/menu-items/bulk", CartBatchView.as_view(), name="cart-items-bulk"),
+    path("cart/summary", CartSummaryView.as_view(), name="cart-summary"),
 
     # Orders for customers
     path("cart/orders", OrderListCreateView.as_view(), name="cart-orders"),
-    path("cart/orders/<int:order_id>", OrderDetailView.as_view(), name="cart-order-detail"),
+    path("cart/orders/<int:order_id>", order_detail, name="cart-order-detail"),
 
     # Orders for managers and delivery crew
     path("orders", OrderListCreateView.as_view(), name="orders"),
-    path("orders/<int:order_id>", OrderDetailView.as_view(), name="order-detail"),
-]
+    path("orders/export.<str:fmt>", OrderExportView.as_view(), name="order-export"),
+    path("orders/changes", order_changes, name="order-changes"),
+    path("orders/<int:order_id>", order_detail, name="order-detail"),
+
+    # Sales reports for managers
+    path("reports/daily-revenue", DailyRevenueReportView.as_view(), name="report-daily-revenue"),
+    path("reports/delivery-crew", DeliveryCrewReportView.as_view(), name="report-delivery-crew"),
+    path("reports/top-items", TopMenuItemsReportView.as_view(), name="report-top-items"),
+    path("reports/category-mix", CategoryMixReportView.as_view(), name="report-category-mix"),
+] + extra_patterns
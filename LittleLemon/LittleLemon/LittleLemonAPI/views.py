@@ -1,22 +1,59 @@
 from django.shortcuts import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
 from rest_framework import viewsets, status, filters, generics
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
 from django.contrib.auth.models import User, Group
-from django.db import transaction
-from .models import MenuItem, Category, Cart, Order, Order_Item
-from .serializers import MenuItemSerializer, CategorySerializer, CartSerializer, OrderSerializer, OrderItemSerializer, UserSerializer
+from django.db import transaction, IntegrityError
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from .models import MenuItem, Category, Cart, CartSummary, Order, Order_Item
+from .serializers import MAX_ID, MenuItemSerializer, CategorySerializer, CartSerializer, CartBatchItemSerializer, CartSummarySerializer, OrderSerializer, OrderItemSerializer, UserSerializer
 from .permissions import IsManager, IsDeliveryCrew
+from .roles import MANAGER, DELIVERY_CREW, get_roles, is_manager, is_delivery_crew
+from .cart import resolve_menu_items, upsert_cart_items, clear_cart
+from .checkout import checkout_cart, EmptyCartError
+from .pagination import OrderKeysetPagination
+from .catalog import CatalogCacheMixin, bump_catalog_version
+from .fastpath import FastListMixin, all_fields, requested_fields, value_columns, render_rows
+from .search import search_menu, typeahead
+from .menu_import import import_menu, payload_rows
+from .menu_snapshot import menu_snapshot
+from .parsers import CSVParser
+from .export import EXPORT_FORMATS, iter_orders
+from .changefeed import (
+    record_event, record_update, visible_events, parse_changes_params,
+    changes_query, latest_query, changes_response, changes_poll_interval
+)
+from .models import OrderEvent
+from .archive import archived_order
+from .idempotency import idempotency_key, request_fingerprint, claim_key, save_response, IdempotencyKeyReused
+from .analytics import (
+    record_order_change, record_order_removed,
+    daily_revenue, crew_report, top_menu_items, category_mix
+)
+import time
 from datetime import date
+from decimal import Decimal, InvalidOperation
 
-class MenuItemViewSet(viewsets.ModelViewSet):
-    queryset = MenuItem.objects.all()
+class MenuItemViewSet(CatalogCacheMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = MenuItem.objects.order_by('id')
     serializer_class = MenuItemSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['category__title']
     ordering_fields = ['price']
 
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = menu_snapshot()
+        if snapshot is None:
+            return super().retrieve(request, *args, **kwargs)
+        record = snapshot.by_id.get(int(kwargs['pk']))
+        if record is None:
+            raise Http404("No MenuItem matches the given query.")
+        return Response(render_rows(MenuItemSerializer, all_fields(MenuItemSerializer), [record])[0])
+
     def get_permissions(self):
         if self.request.method in ['POST', 'PUT', 'DELETE']:
             return [IsAdminUser()]  # Only admins (or managers if adjusted) can write
@@ -24,8 +61,49 @@ class MenuItemViewSet(viewsets.ModelViewSet):
             return [IsManager()]  # Only admins (or managers if adjusted) can write
         return [IsAuthenticated()]  # Any logged-in user can view
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+class MenuImportView(APIView):
+    # Managers may update existing items; creating items stays admin-only, as on POST menu-items
+    permission_classes = [IsAuthenticated, IsAdminUser | IsManager]
+    parser_classes = [JSONParser, CSVParser]
+
+    def post(self, request):
+        rows = payload_rows(request.data)
+        dry_run = request.query_params.get('dry_run', '').lower() in ['true', '1']
+        report = import_menu(rows, dry_run=dry_run, allow_create=request.user.is_staff)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+class MenuSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        filters = {}
+        for name in ('price_min', 'price_max'):
+            if params.get(name) not in (None, ''):
+                try:
+                    filters[name] = Decimal(params[name])
+                except InvalidOperation:
+                    raise ValidationError({name: "Expected a number."})
+        featured = params.get('featured')
+        if featured is not None:
+            if featured.lower() not in ['true', 'false']:
+                raise ValidationError({"featured": "Expected true or false."})
+            filters['featured'] = featured.lower() == 'true'
+
+        ids, facets = search_menu(params.get('q', ''), limit=limit_param(params, 20), **filters)
+        items = MenuItem.objects.in_bulk(ids)
+        results = MenuItemSerializer([items[pk] for pk in ids if pk in items], many=True).data
+        return Response({"results": results, "facets": facets}, status=status.HTTP_200_OK)
+
+class MenuTypeaheadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        matches = typeahead(request.query_params.get('q', ''))
+        return Response([{"id": pk, "title": title} for pk, title in matches], status=status.HTTP_200_OK)
+
+class CategoryViewSet(CatalogCacheMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.order_by('id')
     serializer_class = CategorySerializer
 
     def get_permissions(self):
@@ -35,6 +113,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 class CartView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'cart'
 
     def get(self, request):
         items = Cart.objects.filter(user=request.user)
@@ -42,103 +121,240 @@ class CartView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
-        data = request.data.copy()
+        serializer = CartBatchItemSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        menuitem_value = data.get("menuitem")
-        if menuitem_value and not menuitem_value.isdigit():
-            try:
-                menu = MenuItem.objects.get(title=menuitem_value)
-                data["menuitem"] = menu.pk
-            except MenuItem.DoesNotExist:
-                return Response({"error": "Menu item not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = CartSerializer(data=data)
-        if serializer.is_valid():
-            menu_item = serializer.validated_data['menuitem']
-            quantity = serializer.validated_data['quantity']
-            unit_price = menu_item.price
-            total_price = unit_price * quantity
-            Cart.objects.create(
-                user=request.user,
-                menuitem=menu_item,
-                quantity=quantity,
-                unit_price=unit_price,
-                price=total_price
-            )
-            return Response({"message": "Item added to cart."}, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        reference = serializer.validated_data['menuitem']
+        menu_item = resolve_menu_items([reference]).get(reference)
+        if menu_item is None:
+            return Response({"error": "Menu item not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        upsert_cart_items(request.user, {menu_item: serializer.validated_data['quantity']})
+        return Response({"message": "Item added to cart."}, status=status.HTTP_201_CREATED)
 
     def delete(self, request):
-        Cart.objects.filter(user=request.user).delete()
+        clear_cart(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class OrderListCreateView(APIView):
+class CartSummaryView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'cart'
 
     def get(self, request):
-        user = request.user
-        if user.groups.filter(name='Manager').exists():
+        summary = CartSummary.objects.filter(user=request.user).first() or CartSummary(user=request.user)
+        return Response(CartSummarySerializer(summary).data, status=status.HTTP_200_OK)
+
+class CartBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'cart'
+
+    def post(self, request):
+        rows = request.data.get('items') if isinstance(request.data, dict) else request.data
+        serializer = CartBatchItemSerializer(data=rows, many=True)
+        if not serializer.is_valid():
+            return Response({"items": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        references = [row['menuitem'] for row in serializer.validated_data]
+        menu_items = resolve_menu_items(references)
+        missing = sorted({ref for ref in references if ref not in menu_items})
+        if missing:
+            return Response({"error": "Menu items not found.", "menuitems": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Later rows for the same item win, so one statement never touches a row twice.
+        quantities = {}
+        for row in serializer.validated_data:
+            quantities[menu_items[row['menuitem']]] = row['quantity']
+        upsert_cart_items(request.user, quantities)
+
+        items = Cart.objects.filter(user=request.user)
+        return Response(CartSerializer(items, many=True).data, status=status.HTTP_200_OK)
+
+def date_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Expected a date as YYYY-MM-DD."})
+    return parsed
+
+def limit_param(params, default, maximum=100):
+    """`?limit=` clamped to 1..maximum; a negative LIMIT would mean no limit at all to SQLite."""
+    try:
+        limit = int(params.get('limit', default))
+    except ValueError:
+        raise ValidationError({"limit": "Expected an integer."})
+    return max(1, min(limit, maximum))
+
+class OrderListCreateView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'orders'
+    serializer_class = OrderSerializer
+    pagination_class = OrderKeysetPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        if is_manager(user):
             orders = Order.objects.all()
-        elif user.groups.filter(name='DeliveryCrew').exists():
+        elif is_delivery_crew(user):
             orders = Order.objects.filter(delivery_crew=user)
         else:
             orders = Order.objects.filter(user=user)
-        
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        return self.filter_orders(orders)
+
+    def list(self, request, *args, **kwargs):
+        fields = requested_fields(request, OrderSerializer)
+        # The paginator needs date and id for the cursor, the items lookup needs id
+        rows = self.get_queryset().values(*value_columns(OrderSerializer, fields, required=('id', 'date')))
+        page = self.paginate_queryset(rows)
+
+        nested = {}
+        if 'orderitem_set' in fields:
+            # One extra query per page for the nested items instead of one per order
+            item_fields = all_fields(OrderItemSerializer)
+            items = {row['id']: [] for row in page}
+            item_rows = Order_Item.objects.filter(order_id__in=items).order_by('id').values(
+                *value_columns(OrderItemSerializer, item_fields)
+            )
+            for item in render_rows(OrderItemSerializer, item_fields, item_rows):
+                items[item['order']].append(item)
+            nested['orderitem_set'] = lambda row: items[row['id']]
+
+        return self.get_paginated_response(render_rows(OrderSerializer, fields, page, nested))
+
+    def filter_orders(self, orders):
+        params = self.request.query_params
+
+        status_value = params.get('status')
+        if status_value is not None:
+            if status_value.lower() not in ['true', 'false', '1', '0']:
+                raise ValidationError({"status": "Expected true or false."})
+            orders = orders.filter(status=status_value.lower() in ['true', '1'])
+
+        for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+            parsed = date_param(params, param)
+            if parsed is not None:
+                orders = orders.filter(**{lookup: parsed})
+
+        crew_value = params.get('delivery_crew')
+        if crew_value is not None:
+            # isdecimal(), not isdigit(): int() rejects digits like '²'.
+            if not crew_value.isdecimal() or int(crew_value) > MAX_ID:
+                raise ValidationError({"delivery_crew": "Expected a user id."})
+            orders = orders.filter(delivery_crew_id=int(crew_value))
+
+        return orders
     
-    @transaction.atomic
     def post(self, request):
-        cart_items = Cart.objects.filter(user=request.user)
-        if not cart_items:
-            return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        total = sum(item.price for item in cart_items)
+        key = idempotency_key(request)
+        if key is None:
+            return self.checkout(request)
+        with transaction.atomic():
+            try:
+                earlier = claim_key(request.user, key, request_fingerprint(request))
+            except IdempotencyKeyReused:
+                return Response(
+                    {"detail": "This Idempotency-Key was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if earlier is not None:
+                return Response(earlier.response, status=earlier.status_code, headers={'Idempotent-Replayed': 'true'})
+            response = self.checkout(request)
+            save_response(request.user, key, response)
+        return response
+
+    def checkout(self, request):
         order_date = request.data.get("date", date.today())
-        order = Order.objects.create(user=request.user, total=total, date=order_date)
-
-        
-        for item in cart_items:
-            Order_Item.objects.create(
-                order=order,
-                menuitem=item.menuitem,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                price=item.price
-            )
-        cart_items.delete()
+        try:
+            order = checkout_cart(request.user, order_date)
+        except EmptyCartError:
+            return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"order_id": order.id}, status=status.HTTP_201_CREATED)
 
+class OrderExportView(APIView):
+    permission_classes = [IsAuthenticated, IsManager]
+
+    def get(self, request, fmt):
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported export format '{fmt}'."}, status=status.HTTP_404_NOT_FOUND)
+        content_type, write_lines = EXPORT_FORMATS[fmt]
+        params = request.query_params
+        archived = params.get('archived', '').lower() in ['true', '1']
+        orders = iter_orders(date_param(params, 'date_from'), date_param(params, 'date_to'), archived=archived)
+        response = StreamingHttpResponse(write_lines(orders), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders.{fmt}"'
+        return response
+
+class OrderChangesView(APIView):
+    # Long polls hold a worker for up to `wait` seconds; under ASGI the async
+    # version in async_views.py serves this route without blocking a thread.
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since, wait = parse_changes_params(request.query_params)
+        if since is None:
+            latest = list(latest_query())
+            return Response({"changes": [], "cursor": str(latest[0] if latest else 0), "more": False})
+
+        events = visible_events(request.user, get_roles(request.user))
+        deadline = time.monotonic() + wait
+        while True:
+            rows = list(changes_query(events, since))
+            remaining = deadline - time.monotonic()
+            if rows or remaining <= 0:
+                break
+            time.sleep(min(changes_poll_interval(), remaining))
+        return Response(changes_response(rows, since), status=status.HTTP_200_OK)
+
 class OrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'orders'
     
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id)
-        if order.user != request.user and not request.user.groups.filter(name_in=['Manager', 'Delivery crew']).exists():
+        order = Order.objects.filter(id=order_id).first()
+        if order is not None:
+            owner_id, data = order.user_id, None
+        else:
+            # Archived orders stay readable under their id
+            data = archived_order(order_id)
+            if data is None:
+                raise Http404("No Order matches the given query.")
+            owner_id = data['user']
+        if owner_id != request.user.pk and not (is_manager(request.user) or is_delivery_crew(request.user)):
             return Response({"detail": "You do not have permission to view this order."}, status=status.HTTP_403_FORBIDDEN)
-        serializer = OrderSerializer(order)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if data is None:
+            data = OrderSerializer(order).data
+        return Response(data, status=status.HTTP_200_OK)
     
+    @transaction.atomic
     def patch(self, request, order_id):
-        order = get_object_or_404(Order, pk=order_id)
+        order = get_object_or_404(Order.objects.select_for_update(), pk=order_id)
+        previous_crew_id, previous_status = order.delivery_crew_id, order.status
         user = request.user
         
-        if user.groups.filter(name__iexact='manager').exists():
+        if is_manager(user):
             delivery_crew_id = request.data.get('delivery_crew')
             status_update = request.data.get('status')
             
             if delivery_crew_id:
                 crew_user = get_object_or_404(User, id=delivery_crew_id)
-                if not crew_user.groups.filter(name='DeliveryCrew').exists():
+                if not is_delivery_crew(crew_user):
                     return Response({"error": "User is not in delivery crew"}, status=status.HTTP_400_BAD_REQUEST)
                 order.delivery_crew = crew_user
             
             if status_update is not None:
                 order.status = status_update
             order.save()
+            record_order_change(order, previous_crew_id, previous_status)
+            record_update(order, previous_crew_id, previous_status)
             return Response({"detail": "Order updated successfully."}, status=status.HTTP_200_OK)
         
-        elif user.groups.filter(name="DeliveryCrew").exists():
+        elif is_delivery_crew(user):
             if order.delivery_crew != user:
                 return Response({"detail": "You do not have permission to update this order."}, status=status.HTTP_403_FORBIDDEN)
 
@@ -153,36 +369,88 @@ class OrderDetailView(APIView):
                 return Response({"error": "Invalid status value."}, status=status.HTTP_400_BAD_REQUEST)
 
             order.save()
+            record_order_change(order, previous_crew_id, previous_status)
+            record_update(order, previous_crew_id, previous_status)
             return Response({"detail": "Delivery status updated."}, status=status.HTTP_200_OK)
 
         
         return Response(status=status.HTTP_403_FORBIDDEN)
     
+    @transaction.atomic
     def delete(self, request, order_id):
-        if not request.user.groups.filter(name='Manager').exists():
+        if not is_manager(request.user):
             return Response({"detail": "You do not have permission to delete this order."}, status=status.HTTP_403_FORBIDDEN)
-        order = get_object_or_404(Order, pk=order_id)
+        order = get_object_or_404(Order.objects.select_for_update(), pk=order_id)
+        record_order_removed(order)
+        record_event(order, OrderEvent.DELETED)
         order.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class ReportView(APIView):
+    # Reports read the daily rollups in analytics.py, never the order tables
+    permission_classes = [IsAuthenticated, IsManager]
+
+    def get(self, request):
+        params = request.query_params
+        rows = self.build(date_param(params, 'date_from'), date_param(params, 'date_to'), params)
+        return Response(rows, status=status.HTTP_200_OK)
+
+class DailyRevenueReportView(ReportView):
+    def build(self, date_from, date_to, params):
+        return daily_revenue(date_from, date_to)
+
+class DeliveryCrewReportView(ReportView):
+    def build(self, date_from, date_to, params):
+        return crew_report(date_from, date_to)
+
+class TopMenuItemsReportView(ReportView):
+    def build(self, date_from, date_to, params):
+        return top_menu_items(date_from, date_to, limit_param(params, 10))
+
+class CategoryMixReportView(ReportView):
+    def build(self, date_from, date_to, params):
+        return category_mix(date_from, date_to)
+
 class SetItemOfTheDayView(APIView):
     permission_classes = [IsAuthenticated, IsManager]
 
     def post(self, request, item_id):
         try:
-            MenuItem.objects.update(item_of_the_day=False)  # Reset all to False
-            item = MenuItem.objects.get(id=item_id)
-            item.item_of_the_day = True
-            item.save()
-            return Response({"detail": f"'{item.title}' is now the item of the day."}, status=status.HTTP_200_OK)
+            with transaction.atomic():
+                item = MenuItem.objects.select_for_update().get(id=item_id)
+                if not item.item_of_the_day:
+                    # Only the previous and the new item are written; the partial
+                    # unique index keeps the previous-item lookup to a single row.
+                    MenuItem.objects.filter(item_of_the_day=True).update(item_of_the_day=False)
+                    MenuItem.objects.filter(pk=item.pk).update(item_of_the_day=True)
+                    # Queryset updates skip model signals, so bump the catalog explicitly.
+                    transaction.on_commit(bump_catalog_version)
         except MenuItem.DoesNotExist:
             return Response({"error": "Menu item not found."}, status=status.HTTP_404_NOT_FOUND)
+        except IntegrityError:
+            return Response({"error": "Item of the day was changed concurrently, try again."}, status=status.HTTP_409_CONFLICT)
+        return Response({"detail": f"'{item.title}' is now the item of the day."}, status=status.HTTP_200_OK)
+
+class ItemOfTheDayView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        snapshot = menu_snapshot()
+        if snapshot is None:
+            item = MenuItem.objects.filter(item_of_the_day=True).first()
+            data = MenuItemSerializer(item).data if item is not None else None
+        else:
+            item = snapshot.item_of_the_day
+            data = render_rows(MenuItemSerializer, all_fields(MenuItemSerializer), [item])[0] if item is not None else None
+        if data is None:
+            return Response({"error": "No item of the day is set."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
 
 class ManagerUserView(APIView): 
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        users = Group.objects.get(name='Manager').user_set.all()
+        users = Group.objects.get(name=MANAGER).user_set.all()
         return Response(UserSerializer(users, many=True).data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -195,14 +463,14 @@ class ManagerUserView(APIView):
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        manager_group = Group.objects.get(name='Manager')
+        manager_group = Group.objects.get(name=MANAGER)
         manager_group.user_set.add(user)
         return Response({"message": "User added to the manager group"}, status=status.HTTP_200_OK)
 
     def delete(self, request, user_id):
         try:
             user = User.objects.get(pk=user_id)
-            Group.objects.get(name='Manager').user_set.remove(user)
+            Group.objects.get(name=MANAGER).user_set.remove(user)
             return Response({"message": "User removed from the manager group"}, status=status.HTTP_200_OK)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -211,7 +479,7 @@ class DeliveryCrewUserView(APIView):
     permission_classes = [IsAuthenticated, IsManager]
 
     def get(self, request):
-        users = Group.objects.get(name='DeliveryCrew').user_set.all()
+        users = Group.objects.get(name=DELIVERY_CREW).user_set.all()
         return Response(UserSerializer(users, many=True).data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -224,11 +492,11 @@ class DeliveryCrewUserView(APIView):
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        crew_group = Group.objects.get(name='DeliveryCrew')
+        crew_group = Group.objects.get(name=DELIVERY_CREW)
         crew_group.user_set.add(user)
         return Response({"message": "User added to the delivery crew group"}, status=status.HTTP_200_OK)
 
     def delete(self, request, user_id):
         user = User.objects.get(pk=user_id)
-        Group.objects.get(name='DeliveryCrew').user_set.remove(user)
+        Group.objects.get(name=DELIVERY_CREW).user_set.remove(user)
         return Response(status=status.HTTP_200_OK)